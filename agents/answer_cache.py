@@ -0,0 +1,299 @@
+"""Exact-match answer cache in front of the orchestrator.
+
+Many questions repeat verbatim or nearly so ("What is the front setback in
+A1?" / "what is the front setback in A1").  A hit returns the earlier validated
+answer without running any agent, so it costs no tokens.
+
+The key is the normalised question plus a *version* made of
+
+* the agent configuration – names, instructions, models, tools, vector store
+  ids and guardrails of the orchestrator and every specialist it can hand off to;
+* the SHA-256 of the zoning ordinance PDF;
+* ``ANSWER_CACHE_VERSION`` – bump it when the vector store contents change
+  under the same id.
+
+Changing any of these starts a fresh key space; old entries simply expire.
+Backends (``ANSWER_CACHE``): ``redis`` (shared by all workers/hosts, default
+when ``REDIS_URL`` is set), ``local`` (per-process LRU) or ``off``.
+
+With ``ANSWER_CACHE_SEMANTIC=1`` an exact miss falls back to the most similar
+earlier question (``semantic_cache.SemanticIndex``) whose cosine similarity is
+at least ``ANSWER_CACHE_SIMILARITY``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+from typing import Any, NamedTuple, Protocol
+
+import redis
+from prometheus_client import Counter
+
+from .pdf_text_store import DEFAULT_PDF_PATH, pdf_sha256
+from .semantic_cache import SemanticIndex
+from .serialization import dumps, loads, to_primitive
+from .ttl_cache import MISSING, TTLCache
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv("REDIS_URL")
+_BACKEND = os.getenv("ANSWER_CACHE", "redis" if REDIS_URL else "local")
+_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL", "86400"))
+_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+_VERSION_SALT = os.getenv("ANSWER_CACHE_VERSION", "")
+_SEMANTIC = os.getenv("ANSWER_CACHE_SEMANTIC", "0").lower() in ("1", "true", "yes")
+_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.8"))
+
+ANSWER_CACHE = Counter("answer_cache_total", "Answer cache lookups by outcome", ["outcome"])
+
+_PUNCT = re.compile(r"[^\w§.\-/]+")
+
+
+def normalize_question(question: str) -> str:
+    """Case-, width- and whitespace-insensitive form of a question.
+
+    Section numbers such as ``17.3.B`` and district codes like ``A1`` survive;
+    surrounding punctuation (``?``, quotes, trailing ``.``) does not.
+    """
+
+    text = unicodedata.normalize("NFKC", question).casefold()
+    return " ".join(_PUNCT.sub(" ", text).split()).strip(" .")
+
+
+# ---------------------------------------------------------------------------
+# Version – what the answer depends on besides the question
+# ---------------------------------------------------------------------------
+
+
+def _name(obj: Any) -> str:
+    return getattr(obj, "name", None) or getattr(obj, "__name__", None) or type(obj).__name__
+
+
+def _tool_fingerprint(tool: Any) -> dict[str, Any]:
+    # Only stable, identifying fields: a tool's repr can contain function addresses.
+    return {
+        "name": _name(tool),
+        "vector_store_ids": to_primitive(getattr(tool, "vector_store_ids", None)),
+        "filters": to_primitive(getattr(tool, "filters", None)),
+    }
+
+
+def _guardrail_name(guardrail: Any) -> str:
+    return getattr(guardrail, "name", None) or _name(getattr(guardrail, "guardrail_function", guardrail))
+
+
+def agent_fingerprint(agent: Any, _seen: set[str] | None = None) -> dict[str, Any]:
+    """Deterministic description of an agent and the agents it can hand off to."""
+
+    seen = _seen if _seen is not None else set()
+    seen.add(agent.name)
+    instructions = agent.instructions
+    model = getattr(agent, "model", None)
+    handoffs = []
+    for target in getattr(agent, "handoffs", None) or []:
+        target = getattr(target, "agent", target)  # Handoff wrapper or the agent itself
+        if target.name in seen:
+            handoffs.append({"name": target.name})
+        else:
+            handoffs.append(agent_fingerprint(target, seen))
+    return {
+        "name": agent.name,
+        "instructions": instructions if isinstance(instructions, str) else _name(instructions),
+        "model": model if isinstance(model, str) or model is None else getattr(model, "model", _name(model)),
+        "model_settings": to_primitive(getattr(agent, "model_settings", None)),
+        "output_type": _name(getattr(agent, "output_type", None)),
+        "tools": [_tool_fingerprint(t) for t in getattr(agent, "tools", None) or []],
+        "input_guardrails": [_guardrail_name(g) for g in getattr(agent, "input_guardrails", None) or []],
+        "output_guardrails": [_guardrail_name(g) for g in getattr(agent, "output_guardrails", None) or []],
+        "handoffs": handoffs,
+    }
+
+
+def cache_version(agent: Any, pdf_path: str = DEFAULT_PDF_PATH, salt: str = _VERSION_SALT) -> str:
+    try:
+        ordinance = pdf_sha256(pdf_path)
+    except OSError:
+        logger.warning("zoning PDF %s not found; answer cache keyed on agent config only", pdf_path)
+        ordinance = None
+    blob = json.dumps([agent_fingerprint(agent), ordinance, salt], sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode()).hexdigest()[:16]
+
+
+# ---------------------------------------------------------------------------
+# Backends
+# ---------------------------------------------------------------------------
+
+
+class _Backend(Protocol):
+    def get(self, key: str) -> bytes | None: ...
+
+    def set(self, key: str, value: bytes, ttl: float) -> None: ...
+
+
+class LocalBackend:
+    """Per-process LRU with TTL."""
+
+    def __init__(self, maxsize: int = _MAX_ENTRIES):
+        self._cache: TTLCache[bytes] = TTLCache(maxsize)
+
+    def get(self, key: str) -> bytes | None:
+        value = self._cache.get(key)
+        return None if value is MISSING else value
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._cache.set(key, value, ttl)
+
+
+class RedisBackend:
+    """Shared by every worker and host pointing at the same Redis."""
+
+    def __init__(self, client: redis.Redis, prefix: str = "answer"):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key: str) -> bytes | None:
+        try:
+            return self.client.get(f"{self.prefix}:{key}")
+        except redis.RedisError:
+            logger.warning("answer cache read failed", exc_info=True)
+            return None
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        try:
+            self.client.set(f"{self.prefix}:{key}", value, ex=max(int(ttl), 1))
+        except redis.RedisError:
+            logger.warning("answer cache write failed", exc_info=True)
+
+
+# ---------------------------------------------------------------------------
+# Cache
+# ---------------------------------------------------------------------------
+
+
+class AnswerCache:
+    def __init__(
+        self,
+        backend: _Backend,
+        *,
+        version: str,
+        ttl_seconds: float = _TTL_SECONDS,
+        semantic: SemanticIndex | None = None,
+    ):
+        self.backend = backend
+        self.version = version
+        self.ttl_seconds = ttl_seconds
+        self.semantic = semantic
+
+    def key(self, question: str) -> str:
+        digest = hashlib.sha256(normalize_question(question).encode()).hexdigest()
+        return f"{self.version}:{digest}"
+
+    def get(self, question: str, *, specialist: str | None = None) -> dict[str, Any] | None:
+        """``{"answer", "run_id", "run_result_path", "cached_at"}`` of an earlier run, or None.
+
+        Semantic hits also carry ``matched_question`` and ``similarity``; they can
+        be restricted to answers given by ``specialist``.
+        """
+
+        raw = self.backend.get(self.key(question))
+        if raw is not None:
+            ANSWER_CACHE.labels("hit").inc()
+            return loads(raw)
+        match = self.semantic.search(question, specialist=specialist) if self.semantic is not None else None
+        raw = self.backend.get(match.key) if match is not None else None
+        if raw is None:
+            ANSWER_CACHE.labels("miss").inc()
+            return None
+        ANSWER_CACHE.labels("semantic_hit").inc()
+        return {**loads(raw), "matched_question": match.question, "similarity": round(match.similarity, 4)}
+
+    def put(
+        self,
+        question: str,
+        answer: Any,
+        *,
+        run_id: str | None = None,
+        run_result_path: str | None = None,
+        specialist: str | None = None,
+    ) -> None:
+        entry = {
+            "answer": to_primitive(answer),
+            "run_id": run_id,
+            "run_result_path": run_result_path,
+            "cached_at": time.time(),
+        }
+        key = self.key(question)
+        self.backend.set(key, dumps(entry), self.ttl_seconds)
+        if self.semantic is not None:
+            self.semantic.add(key, question, specialist=specialist, ttl=self.ttl_seconds)
+
+
+class CacheMode(NamedTuple):
+    read: bool = True
+    write: bool = True
+
+
+def cache_mode(cache_control: str | None) -> CacheMode:
+    """``Cache-Control: no-cache`` skips the answer cache lookup (the fresh answer
+    is still stored); ``no-store`` bypasses the cache entirely."""
+
+    directives = {d.strip().lower() for d in (cache_control or "").split(",")}
+    no_store = "no-store" in directives
+    return CacheMode(read=not no_store and "no-cache" not in directives, write=not no_store)
+
+
+_cache: AnswerCache | None = None
+_cache_lock = threading.Lock()
+
+
+def _similarity_by_specialist() -> dict[str, float]:
+    # Per-specialist thresholds, e.g. '{"EBR Definitions Specialist": 0.9}'.
+    raw = os.getenv("ANSWER_CACHE_SIMILARITY_BY_SPECIALIST", "{}")
+    try:
+        return {str(name): float(value) for name, value in json.loads(raw).items()}
+    except (ValueError, TypeError, AttributeError):
+        logger.warning("ignoring malformed ANSWER_CACHE_SIMILARITY_BY_SPECIALIST=%r", raw)
+        return {}
+
+
+def get_answer_cache(agent: Any) -> AnswerCache | None:
+    """Process-wide cache for answers of ``agent`` (None when ``ANSWER_CACHE=off``)."""
+
+    global _cache
+    if _BACKEND == "off":
+        return None
+    with _cache_lock:
+        if _cache is None:
+            if _BACKEND == "redis":
+                if not REDIS_URL:
+                    raise RuntimeError("ANSWER_CACHE=redis requires REDIS_URL")
+                backend: _Backend = RedisBackend(redis.Redis.from_url(REDIS_URL))
+            else:
+                backend = LocalBackend()
+            semantic = (
+                SemanticIndex(capacity=_MAX_ENTRIES, threshold=_SIMILARITY, thresholds=_similarity_by_specialist())
+                if _SEMANTIC
+                else None
+            )
+            _cache = AnswerCache(backend, version=cache_version(agent), semantic=semantic)
+        return _cache
+
+
+__all__ = [
+    "AnswerCache",
+    "CacheMode",
+    "LocalBackend",
+    "RedisBackend",
+    "agent_fingerprint",
+    "cache_mode",
+    "cache_version",
+    "get_answer_cache",
+    "normalize_question",
+]
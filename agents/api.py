@@ -1,17 +1,66 @@
 from __future__ import annotations
 
 import asyncio
+import logging
 import os
-from typing import Any
+from contextlib import asynccontextmanager
+from typing import Annotated, Any, AsyncIterator
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.responses import StreamingResponse
+from gpc_agents.src.agents import InputGuardrailTripwireTriggered, OutputGuardrailTripwireTriggered
 from pydantic import BaseModel, Field
 
+from .answer_cache import CacheMode, cache_mode, get_answer_cache
+from .citation_verifier import warm_citation_index
 from .master_orchestrator_agent import ORCHESTRATOR
-from .usage_monitor import BudgetExceededError, run_with_budget
-from .persistence import persist_run_result
+from .usage_monitor import (
+    BudgetedStream,
+    BudgetExceededError,
+    batch_reservation,
+    close_ledger,
+    run_streamed_with_budget,
+    run_with_budget,
+)
+from .judge_queue import drain_judge_queue, get_judge_queue
+from .persistence import (
+    persist_run_result,
+    persist_tripped_run,
+    plan_judging,
+    plan_tripped_judging,
+    run_flags,
+    tripped_answer,
+)
+from .qa_log_writer import shutdown_writer
+from .run_store import RunLocation
+from .serialization import dumps, to_primitive
+from .streaming import format_sse, run_events
+from .tools import aclose_clients
 
-app = FastAPI(title="EBR Zoning Code Assistant")
+logger = logging.getLogger(__name__)
+
+_BATCH_CONCURRENCY = int(os.getenv("ASK_BATCH_CONCURRENCY", "4"))
+_BATCH_MAX_QUESTIONS = int(os.getenv("ASK_BATCH_MAX_QUESTIONS", "100"))
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    # Startup: load the zoning PDF text and section index before the first request,
+    # so the citation guardrail only reads (a cold store is extracted here, once).
+    try:
+        await asyncio.to_thread(warm_citation_index)
+    except OSError:
+        logger.warning("zoning PDF text unavailable; citation checks will load it on first use", exc_info=True)
+    yield
+    # Shutdown: finish queued judge scoring first (it still needs the ledger), then
+    # release pooled GIS / Redis connections and flush queued Q&A and usage rows.
+    await drain_judge_queue()
+    await aclose_clients()
+    await asyncio.to_thread(shutdown_writer)
+    await asyncio.to_thread(close_ledger)
+
+
+app = FastAPI(title="EBR Zoning Code Assistant", lifespan=lifespan)
 
 
 class AskRequest(BaseModel):
@@ -20,22 +69,229 @@ class AskRequest(BaseModel):
 
 class AskResponse(BaseModel):
     answer: Any
+    run_id: str | None = None
+    run_result_path: str | None = None  # "<segment>:<offset>" in the run store
+    cached: bool = False  # answered from the answer cache; run_id is the original run
+
+
+class AskBatchRequest(BaseModel):
+    questions: list[str] = Field(..., min_length=1, max_length=_BATCH_MAX_QUESTIONS)
+    stream: bool = Field(False, description="NDJSON, one line per question as it finishes")
+
+
+class AskBatchItem(BaseModel):
+    index: int  # position in the request
+    question: str
+    answer: Any = None
+    run_id: str | None = None
     run_result_path: str | None = None
+    cached: bool = False
+    error: dict[str, Any] | None = None  # set instead of answer when the question failed
+
+
+class AskBatchResponse(BaseModel):
+    results: list[AskBatchItem]  # in request order
+
+
+async def _cached_answer(question: str, mode: CacheMode) -> dict[str, Any] | None:
+    if not mode.read:
+        return None
+    cache = await asyncio.to_thread(get_answer_cache, ORCHESTRATOR)
+    return await asyncio.to_thread(cache.get, question) if cache is not None else None
 
 
 @app.post("/ask", response_model=AskResponse)
-async def ask(req: AskRequest):
+async def ask(req: AskRequest, cache_control: Annotated[str | None, Header()] = None):
+    mode = cache_mode(cache_control)
+    cached = await _cached_answer(req.question, mode)
+    if cached is not None:
+        return AskResponse(
+            answer=cached["answer"], run_id=cached["run_id"], run_result_path=cached["run_result_path"], cached=True
+        )
     try:
         result = await run_with_budget(starting_agent=ORCHESTRATOR, input=req.question)
     except BudgetExceededError as e:
         raise HTTPException(status_code=429, detail=str(e))
+    except (InputGuardrailTripwireTriggered, OutputGuardrailTripwireTriggered) as e:
+        await _persist_tripped(req.question, e)
+        raise
+
+    location = await _persist(req.question, result, cache_write=mode.write)
+    return AskResponse(answer=result.final_output, run_id=location.run_id, run_result_path=str(location))
+
+
+async def _persist(question: str, result: Any, *, cache_write: bool = True) -> RunLocation:
+    # Written immediately; a sampled / flagged run is scored in the background,
+    # a repeated answer reuses its cached score.
+    plan = await asyncio.to_thread(plan_judging, result)
+    location = await asyncio.to_thread(persist_run_result, result, judge=False, plan=plan)
+    if plan.needs_judge:
+        await get_judge_queue().submit(location.run_id, question, result.final_output, cache_key=plan.cache_key)
+    # Only clean answers are reused: nothing flagged by a guardrail or uncited.
+    if cache_write and not run_flags(result):
+        cache = await asyncio.to_thread(get_answer_cache, ORCHESTRATOR)
+        if cache is not None:
+            await asyncio.to_thread(
+                cache.put,
+                question,
+                result.final_output,
+                run_id=location.run_id,
+                run_result_path=str(location),
+                specialist=result.last_agent.name,
+            )
+    return location
+
+
+async def _persist_tripped(question: str, exc: Exception) -> None:
+    # Kept for audit and ``run_store query --guardrail tripped``; a rejected
+    # answer is always judged (the "guardrail" flag) but never cached.
+    if not isinstance(exc, (InputGuardrailTripwireTriggered, OutputGuardrailTripwireTriggered)):
+        return
+    try:
+        plan = await asyncio.to_thread(plan_tripped_judging, question, exc)
+        location = await asyncio.to_thread(persist_tripped_run, question, exc, judge=False, plan=plan)
+        if plan is not None and plan.needs_judge:
+            await get_judge_queue().submit(location.run_id, question, tripped_answer(exc), cache_key=plan.cache_key)
+    except Exception:
+        logger.exception("could not store tripped run")
+
+
+def _error_payload(exc: Exception) -> dict[str, Any]:
+    """Client-facing description of a failed run."""
+
+    if isinstance(exc, (InputGuardrailTripwireTriggered, OutputGuardrailTripwireTriggered)):
+        gr = exc.guardrail_result
+        return {
+            "type": "guardrail_tripped",
+            "guardrail": gr.guardrail.get_name(),
+            "info": to_primitive(gr.output.output_info),
+        }
+    if isinstance(exc, BudgetExceededError):
+        return {"type": "budget_exceeded", "detail": str(exc)}
+    logger.error("run failed", exc_info=exc)
+    return {"type": type(exc).__name__, "detail": str(exc)}
+
+
+async def _cached_events(cached: dict[str, Any]) -> AsyncIterator[bytes]:
+    yield format_sse(
+        "answer",
+        {
+            "answer": cached["answer"],
+            "run_id": cached["run_id"],
+            "run_result_path": cached["run_result_path"],
+            "cached": True,
+        },
+    )
+
+
+async def _ask_events(question: str, stream: BudgetedStream, mode: CacheMode) -> AsyncIterator[bytes]:
+    try:
+        async for event, data in run_events(stream.result):
+            yield format_sse(event, data)
+        # The stream only ends after the output guardrails passed.
+        await stream.settle()
+        location = await _persist(question, stream.result, cache_write=mode.write)
+        yield format_sse(
+            "answer",
+            {
+                "answer": to_primitive(stream.result.final_output),
+                "run_id": location.run_id,
+                "run_result_path": str(location),
+            },
+        )
+    except Exception as e:
+        await _persist_tripped(question, e)
+        yield format_sse("error", _error_payload(e))
+    finally:
+        # Also reached when the client disconnects: stop the run, settle the budget.
+        await asyncio.shield(stream.settle())
+
+
+@app.post("/ask/stream")
+async def ask_stream(req: AskRequest, cache_control: Annotated[str | None, Header()] = None):
+    """Stream the run as Server-Sent Events: ``handoff``, ``tool`` and ``delta``
+    while it runs, then one ``answer`` (validated AnswerWithCitations, run_id,
+    run_result_path) or ``error`` event."""
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    mode = cache_mode(cache_control)
+    cached = await _cached_answer(req.question, mode)
+    if cached is not None:
+        return StreamingResponse(_cached_events(cached), media_type="text/event-stream", headers=headers)
+    try:
+        stream = await run_streamed_with_budget(starting_agent=ORCHESTRATOR, input=req.question)
+    except BudgetExceededError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return StreamingResponse(_ask_events(req.question, stream, mode), media_type="text/event-stream", headers=headers)
+
+
+async def _ask_one(
+    index: int, question: str, sem: asyncio.Semaphore, reservation, mode: CacheMode
+) -> AskBatchItem:
+    async with sem:
+        try:
+            cached = await _cached_answer(question, mode)
+            if cached is not None:
+                return AskBatchItem(
+                    index=index,
+                    question=question,
+                    answer=cached["answer"],
+                    run_id=cached["run_id"],
+                    run_result_path=cached["run_result_path"],
+                    cached=True,
+                )
+            result = await run_with_budget(starting_agent=ORCHESTRATOR, input=question, reservation=reservation)
+            location = await _persist(question, result, cache_write=mode.write)
+        except Exception as e:  # one failed question must not fail the batch
+            await _persist_tripped(question, e)
+            return AskBatchItem(index=index, question=question, error=_error_payload(e))
+    return AskBatchItem(
+        index=index,
+        question=question,
+        answer=to_primitive(result.final_output),
+        run_id=location.run_id,
+        run_result_path=str(location),
+    )
+
+
+async def _run_batch(questions: list[str], mode: CacheMode) -> AsyncIterator[AskBatchItem]:
+    """Answer ``questions`` concurrently, yielding items as they finish."""
+
+    sem = asyncio.Semaphore(_BATCH_CONCURRENCY)
+    async with batch_reservation(questions) as reservation:
+        tasks = [asyncio.create_task(_ask_one(i, q, sem, reservation, mode)) for i, q in enumerate(questions)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # Client went away (NDJSON) – stop the runs still waiting or in flight.
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def _ndjson(questions: list[str], mode: CacheMode) -> AsyncIterator[bytes]:
+    async for item in _run_batch(questions, mode):
+        yield dumps(item.model_dump()) + b"\n"
+
+
+@app.post("/ask/batch", response_model=AskBatchResponse)
+async def ask_batch(req: AskBatchRequest, cache_control: Annotated[str | None, Header()] = None):
+    """Answer a checklist of questions, ``ASK_BATCH_CONCURRENCY`` at a time.
+
+    The batch shares one budget reservation.  A question that fails (guardrail,
+    budget, error) gets an ``error`` instead of an ``answer``; the rest continue.
+    """
 
-    path = persist_run_result(result)
-    return AskResponse(answer=result.final_output, run_result_path=path)
+    mode = cache_mode(cache_control)
+    if req.stream:
+        return StreamingResponse(_ndjson(req.questions, mode), media_type="application/x-ndjson")
+    items = [item async for item in _run_batch(req.questions, mode)]
+    return AskBatchResponse(results=sorted(items, key=lambda item: item.index))
 
 
 if __name__ == "__main__":
     port = int(os.getenv("PORT", "8000"))
     import uvicorn
 
-    uvicorn.run("agents.api:app", host="0.0.0.0", port=port, workers=2) 
\ No newline at end of file
+    uvicorn.run("agents.api:app", host="0.0.0.0", port=port, workers=2) 
@@ -0,0 +1 @@
+"""Micro-benchmarks for hot paths; run each module with ``python -m agents.benchmarks.<name>``."""
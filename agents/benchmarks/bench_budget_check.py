@@ -0,0 +1,94 @@
+"""Latency of the daily budget check with a large ``usage`` history.
+
+Compares the original ``SUM(cost_usd) WHERE ts >= ?`` query (unindexed and
+indexed) with the in-memory rolling ``SpendWindow``.
+
+    python -m agents.benchmarks.bench_budget_check --rows 1000000 --days 90
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from agents.spend_window import SpendWindow
+
+
+def _populate(conn: sqlite3.Connection, rows: int, days: int) -> None:
+    conn.execute(
+        "CREATE TABLE usage (ts TEXT NOT NULL, prompt_tokens INTEGER NOT NULL, "
+        "completion_tokens INTEGER NOT NULL, cost_usd REAL NOT NULL)"
+    )
+    now = datetime.utcnow()
+    step = timedelta(days=days) / rows
+    rnd = random.Random(0)
+
+    def gen():
+        for i in range(rows):
+            ts = now - timedelta(days=days) + step * i
+            p, c = rnd.randint(200, 3000), rnd.randint(50, 800)
+            yield ts.isoformat(), p, c, (p + c) / 1000 * 0.005
+
+    conn.executemany("INSERT INTO usage VALUES (?, ?, ?, ?)", gen())
+    conn.commit()
+
+
+def _time(fn, repeat: int) -> tuple[float, float]:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1e6)
+    return statistics.median(samples), max(samples)
+
+
+def _legacy_check(conn: sqlite3.Connection) -> float:
+    since = datetime.utcnow() - timedelta(days=1)
+    row = conn.execute("SELECT SUM(cost_usd) FROM usage WHERE ts >= ?", (since.isoformat(),)).fetchone()
+    return float(row[0] or 0.0)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--days", type=int, default=90, help="History span the rows are spread over")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as root:
+        conn = sqlite3.connect(os.path.join(root, "usage.sqlite3"))
+        started = time.perf_counter()
+        _populate(conn, args.rows, args.days)
+        print(f"populated {args.rows:,} rows over {args.days} days in {time.perf_counter() - started:.1f}s\n")
+
+        results = [("SUM query, no index", *_time(lambda: _legacy_check(conn), args.repeat))]
+
+        conn.execute("CREATE INDEX idx_usage_ts ON usage(ts)")
+        results.append(("SUM query, idx_usage_ts", *_time(lambda: _legacy_check(conn), args.repeat)))
+
+        window = SpendWindow()
+        started = time.perf_counter()
+        window.seed(conn)
+        seed_ms = (time.perf_counter() - started) * 1e3
+        results.append(("SpendWindow.total()", *_time(window.total, args.repeat)))
+
+        # The window rounds to whole minutes on the conservative side (≤ 1 extra minute).
+        expected = _legacy_check(conn)
+        assert window.total() >= expected - 1e-9, (window.total(), expected)
+
+        print(f"{'budget check':<28}{'median µs':>12}{'max µs':>12}")
+        for name, median, worst in results:
+            print(f"{name:<28}{median:>12,.1f}{worst:>12,.1f}")
+        print(f"\nSpendWindow seed (startup, once): {seed_ms:.1f} ms")
+        print(f"24 h spend: query ${expected:.4f} vs window ${window.total():.4f}")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Rows/second of ``log_qa`` persistence: per-call connection vs. batched writer.
+
+    python -m agents.benchmarks.bench_log_qa --rows 5000 --domains 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+
+from agents.qa_log_writer import QALogWriter
+
+
+def _legacy_log_qa(db_path: str, question: str, answer: str) -> None:
+    # Mirrors the original implementation: connect, DDL, insert, commit, close per row.
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS qa_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            question TEXT NOT NULL,
+            answer TEXT NOT NULL,
+            timestamp TEXT NOT NULL
+        )
+        """
+    )
+    conn.execute(
+        "INSERT INTO qa_log (question, answer, timestamp) VALUES (?, ?, ?)",
+        (question, answer, datetime.utcnow().isoformat()),
+    )
+    conn.commit()
+    conn.close()
+
+
+def _rows(n: int, domains: int, root: str):
+    answer = "Per Sec. 17.3.B, restaurants require 1 space per 100 sq ft of gross floor area. " * 4
+    for i in range(n):
+        yield os.path.join(root, f"domain{i % domains}.sqlite3"), f"question {i}", answer
+
+
+def bench_legacy(n: int, domains: int) -> float:
+    with tempfile.TemporaryDirectory() as root:
+        started = time.perf_counter()
+        for db_path, q, a in _rows(n, domains, root):
+            _legacy_log_qa(db_path, q, a)
+        return n / (time.perf_counter() - started)
+
+
+def bench_writer(n: int, domains: int) -> float:
+    with tempfile.TemporaryDirectory() as root:
+        writer = QALogWriter(max_queue=max(n, 1))
+        started = time.perf_counter()
+        for db_path, q, a in _rows(n, domains, root):
+            writer.submit(db_path, q, a, datetime.utcnow().isoformat())
+        writer.flush()
+        rate = n / (time.perf_counter() - started)
+        writer.close()
+        return rate
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--domains", type=int, default=4)
+    args = parser.parse_args(argv)
+
+    legacy = bench_legacy(args.rows, args.domains)
+    batched = bench_writer(args.rows, args.domains)
+    print(f"{'implementation':<24}{'rows/s':>12}")
+    print(f"{'per-call connection':<24}{legacy:>12,.0f}")
+    print(f"{'batched WAL writer':<24}{batched:>12,.0f}")
+    print(f"speed-up: {batched / legacy:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Filtering a month of stored runs: index query vs. scanning one JSON file per run.
+
+    python -m agents.benchmarks.bench_run_query --runs 20000 --days 30
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from agents.run_store import RunStore
+
+_SPECIALISTS = ["parking", "signage", "zoning_districts", "dimensional_standards", "environmental"]
+
+
+def _fill(store: RunStore, runs: int, days: int) -> None:
+    rng = random.Random(0)
+    start = datetime(2025, 5, 1)
+    answer = "Per Sec. 17.3.B, restaurants require 1 space per 100 sq ft of gross floor area. " * 8
+    for i in range(runs):
+        ts = (start + timedelta(seconds=i * days * 86400 / runs)).isoformat()
+        specialist = rng.choice(_SPECIALISTS)
+        score = rng.randint(1, 5)
+        guardrail = rng.choices(["passed", "flagged", "tripped"], [90, 8, 2])[0]
+        store.append(
+            {"input": f"question {i}", "final_output": {"answer": answer}, "specialist": specialist, "guardrail": guardrail},
+            run_id=f"run{i:07d}",
+            trace_id=f"trace_{i}",
+            ts=ts,
+            quality_score=score,
+            quality_status="scored",
+            specialist=specialist,
+            guardrail=guardrail,
+        )
+    store.rotate()
+
+
+def _write_legacy(root: str, store: RunStore) -> None:
+    # The previous layout: one JSON file per run.
+    for summary in store.query():
+        with open(os.path.join(root, f"{summary.run_id}.json"), "w") as fp:
+            json.dump({**store.get(summary.run_id), "ts": summary.ts}, fp, indent=2)
+
+
+def _scan_legacy(root: str) -> int:
+    n = 0
+    for path in glob.glob(os.path.join(root, "*.json")):
+        with open(path) as fp:
+            record = json.load(fp)
+        n += record["specialist"] == "parking" and record["guardrail"] == "tripped"
+    return n
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20000)
+    parser.add_argument("--days", type=int, default=30)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as root, tempfile.TemporaryDirectory() as legacy_root:
+        store = RunStore(root, compression="none")
+        _fill(store, args.runs, args.days)
+        _write_legacy(legacy_root, store)
+        queries = {
+            "one week, one specialist": dict(since="2025-05-08", until="2025-05-15", specialist="parking"),
+            "low scores, month": dict(since="2025-05-01", until="2025-06-01", max_score=1, limit=100),
+            "tripped guardrail": dict(guardrail="tripped", specialist="parking"),
+        }
+        print(f"{args.runs:,} runs over {args.days} days")
+        print(f"{'query':<28}{'rows':>8}{'ms':>10}")
+        for name, filters in queries.items():
+            started = time.perf_counter()
+            rows = store.query(**filters)
+            print(f"{name:<28}{len(rows):>8}{(time.perf_counter() - started) * 1000:>10.2f}")
+        started = time.perf_counter()
+        matches = _scan_legacy(legacy_root)
+        print(f"{'tripped, *.json scan':<28}{matches:>8}{(time.perf_counter() - started) * 1000:>10.2f}")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""Precision/recall and lookup latency of the semantic answer cache.
+
+    python -m agents.benchmarks.bench_semantic_cache [--db agents/data/query_history.db] [--dim 1024] [--entries 1000 10000]
+
+Labels come from the front-ends' ``query_history`` table: questions that got the
+same answer text are paraphrases of each other.  The first question of every
+such group is cached and the others are looked up; a hit is correct when it
+returns that group's answer.  Questions with a unique answer are split between
+the cache and the lookups, where they should miss.  Without a history database
+(or with too few repeated answers) a small built-in labelled set is used.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sqlite3
+import time
+from collections import defaultdict
+
+import numpy as np
+
+from agents.answer_cache import normalize_question
+from agents.semantic_cache import HashedNgramEmbedder, SemanticIndex
+
+_DEFAULT_DB = os.path.join(os.path.dirname(__file__), "..", "data", "query_history.db")
+_THRESHOLDS = (0.6, 0.7, 0.75, 0.8, 0.85, 0.9)
+
+# (answer id, question) – same id means same answer.
+_SAMPLE = [
+    ("restaurant", "How many parking spaces does a restaurant need?"),
+    ("restaurant", "how many parking spaces are required for a restaurant"),
+    ("restaurant", "Restaurant parking requirement?"),
+    ("restaurant", "parking for a restaurant"),
+    ("church", "How many parking spaces does a church need?"),
+    ("a1-front", "What is the front setback in A1?"),
+    ("a1-front", "front yard setback for A1 district"),
+    ("a1-front", "A1 front setback"),
+    ("a2-front", "What is the front setback in A2?"),
+    ("c2-sign", "What is the maximum sign height in C2?"),
+    ("c2-sign", "maximum height of a sign in the C2 district"),
+    ("c2-building", "What is the maximum building height in C2?"),
+    ("rezoning", "How do I apply for a rezoning?"),
+    ("rezoning", "What is the process to rezone my property?"),
+    ("rezoning", "rezoning application process"),
+    ("variance", "How do I request a variance?"),
+    ("nonconforming", "Can I expand a nonconforming structure?"),
+    ("nonconforming", "is expansion of a nonconforming building allowed"),
+    ("abandonment", "When is a nonconforming use considered abandoned?"),
+    ("flood", "What are the floodplain development requirements?"),
+    ("flood", "requirements for building in a floodplain"),
+    ("tree", "Do I need a permit to remove a tree?"),
+    ("tree", "tree removal permit requirements"),
+    ("buffer", "What landscape buffer is required between commercial and residential?"),
+    ("accessory", "What is the definition of an accessory structure?"),
+    ("accessory", "define accessory structure"),
+    ("plat", "What is required for a minor subdivision plat?"),
+    ("historic", "Do I need a certificate of appropriateness to replace windows in a historic district?"),
+]
+
+
+def _load_history(path: str) -> list[tuple[str, str]]:
+    if not os.path.exists(path):
+        return []
+    with sqlite3.connect(path) as conn:
+        rows = conn.execute("SELECT answer, question FROM query_history ORDER BY id").fetchall()
+    return [(" ".join(answer.split()), question) for answer, question in rows]
+
+
+def _split(rows: list[tuple[str, str]], seed: int = 0):
+    """(cached, lookups) lists of (answer, question); a lookup expects its answer or a miss."""
+
+    groups: dict[str, list[str]] = defaultdict(list)
+    seen = set()
+    for answer, question in rows:
+        norm = normalize_question(question)
+        if norm not in seen:  # exact repeats are the exact-match cache's job
+            seen.add(norm)
+            groups[answer].append(question)
+    rng = random.Random(seed)
+    cached, lookups = [], []
+    for answer, questions in groups.items():
+        if len(questions) > 1:
+            cached.append((answer, questions[0]))
+            lookups.extend((answer, q) for q in questions[1:])
+        elif rng.random() < 0.5:
+            cached.append((answer, questions[0]))
+        else:
+            lookups.append((answer, questions[0]))
+    return cached, lookups
+
+
+def _quality(cached, lookups, dim: int) -> None:
+    answers = {answer for answer, _ in cached}
+    positives = sum(answer in answers for answer, _ in lookups)
+    print(f"{len(cached)} cached questions, {len(lookups)} lookups ({positives} paraphrases, "
+          f"{len(lookups) - positives} should miss)")
+    print(f"{'threshold':>10}{'hits':>7}{'correct':>9}{'precision':>11}{'recall':>8}")
+    for threshold in _THRESHOLDS:
+        index = SemanticIndex(capacity=len(cached), threshold=threshold, embedder=HashedNgramEmbedder(dim))
+        for answer, question in cached:
+            index.add(answer, question, ttl=3600)  # the key is the answer it maps to
+        hits = correct = 0
+        for answer, question in lookups:
+            match = index.search(question)
+            if match is not None:
+                hits += 1
+                correct += match.key == answer
+        precision = correct / hits if hits else 1.0
+        recall = correct / positives if positives else 0.0
+        print(f"{threshold:>10.2f}{hits:>7}{correct:>9}{precision:>11.2%}{recall:>8.2%}")
+
+
+def _latency(questions: list[str], entries: int, dim: int, lookups: int = 2000) -> None:
+    rng = random.Random(entries)
+    index = SemanticIndex(capacity=entries, threshold=0.8, embedder=HashedNgramEmbedder(dim))
+    for i in range(entries):
+        index.add(f"k{i}", f"{rng.choice(questions)} {i}", ttl=3600)
+    probes = [rng.choice(questions) for _ in range(lookups)]
+
+    started = time.perf_counter()
+    vectors = [index.embedder.embed(q) for q in probes]
+    embed_us = (time.perf_counter() - started) / lookups * 1e6
+
+    timings = np.empty(lookups)
+    for i, question in enumerate(probes):
+        started = time.perf_counter()
+        index.search(question)
+        timings[i] = time.perf_counter() - started
+    search_only = np.empty(lookups)
+    for i, vec in enumerate(vectors):
+        started = time.perf_counter()
+        index._vectors @ vec
+        search_only[i] = time.perf_counter() - started
+    p50, p99 = np.percentile(timings, [50, 99]) * 1e6
+    print(f"{entries:>9,}{embed_us:>10.1f}{np.median(search_only) * 1e6:>10.1f}{p50:>10.1f}{p99:>10.1f}")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=_DEFAULT_DB, help="query_history database")
+    parser.add_argument("--dim", type=int, default=HashedNgramEmbedder().dim, help="embedding buckets")
+    parser.add_argument("--entries", type=int, nargs="+", default=[1000, 10000])
+    args = parser.parse_args(argv)
+
+    cached, lookups = _split(_load_history(args.db))
+    if sum(answer in {a for a, _ in cached} for answer, _ in lookups) < 10:
+        print(f"fewer than 10 paraphrases in {args.db}; using the built-in sample")
+        cached, lookups = _split(_SAMPLE)
+    _quality(cached, lookups, args.dim)
+
+    print()
+    print(f"{'entries':>9}{'embed us':>10}{'matmul us':>10}{'p50 us':>10}{'p99 us':>10}")
+    questions = [q for _, q in cached + lookups]
+    for entries in args.entries:
+        _latency(questions, entries, args.dim)
+
+
+if __name__ == "__main__":
+    main()
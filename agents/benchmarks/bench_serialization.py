@@ -0,0 +1,184 @@
+"""Run-result serialisation: ``asdict`` + indented ``json`` vs. ``agents.serialization``.
+
+The synthetic run mirrors a typical ``/ask``: the orchestrator hands off to a
+specialist, which calls file search a few times and answers with citations.
+Items and responses use the SDK's shapes (dataclass items holding the agent and
+a pydantic raw item).
+
+    python -m agents.benchmarks.bench_serialization --runs 500 --handoffs 3
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from dataclasses import asdict, dataclass, field, is_dataclass
+from typing import Any
+
+from pydantic import BaseModel
+
+from agents import serialization
+from agents.structures import AnswerWithCitations, Citation
+
+
+@dataclass
+class _Agent:
+    name: str
+    instructions: str
+    model: str = "gpt-4o-mini"
+    tools: list[Any] = field(default_factory=list)
+    handoffs: list[Any] = field(default_factory=list)
+
+
+class _Content(BaseModel):
+    type: str = "output_text"
+    text: str
+    annotations: list[dict] = []
+
+
+class _Message(BaseModel):
+    id: str
+    type: str = "message"
+    role: str = "assistant"
+    status: str = "completed"
+    content: list[_Content]
+
+
+class _FunctionCall(BaseModel):
+    id: str
+    type: str = "function_call"
+    call_id: str
+    name: str
+    arguments: str
+
+
+@dataclass
+class _Item:
+    agent: _Agent
+    raw_item: Any
+    type: str
+
+
+@dataclass
+class _OutputItem(_Item):
+    output: Any = None
+
+
+@dataclass
+class _Usage:
+    requests: int
+    input_tokens: int
+    output_tokens: int
+    total_tokens: int
+
+
+@dataclass
+class _ModelResponse:
+    output: list[Any]
+    usage: _Usage
+    response_id: str
+
+
+def _legacy_to_serialisable(obj: Any) -> Any:
+    # The previous persistence implementation.
+    if is_dataclass(obj):
+        return asdict(obj)
+    if isinstance(obj, (list, tuple)):
+        return [_legacy_to_serialisable(i) for i in obj]
+    if isinstance(obj, dict):
+        return {k: _legacy_to_serialisable(v) for k, v in obj.items()}
+    return obj
+
+
+def build_run(handoffs: int, tool_calls: int = 3) -> dict[str, Any]:
+    """Fields ``persist_run_result`` reads from a RunResult, for a multi-handoff run."""
+
+    passage = "Sec. 17.3.B: restaurants require one space per 100 sq ft of gross floor area. " * 12
+    specialists = [_Agent(f"specialist_{i}", "You answer questions about one chapter. " * 40) for i in range(handoffs)]
+    orchestrator = _Agent("orchestrator", "Route each question to a specialist. " * 40, handoffs=specialists)
+    for agent in specialists:
+        agent.tools = [{"type": "file_search", "vector_store_ids": ["vs_123"]}] * 4
+
+    items: list[Any] = []
+    responses: list[Any] = []
+    current = orchestrator
+    for h, target in enumerate(specialists):
+        call = _FunctionCall(id=f"fc_h{h}", call_id=f"call_h{h}", name=f"transfer_to_{target.name}", arguments="{}")
+        items.append(_Item(current, call, "handoff_call_item"))
+        items.append(_OutputItem(current, {"call_id": call.call_id, "output": target.name}, "handoff_output_item"))
+        responses.append(_ModelResponse([call], _Usage(1, 1800, 40, 1840), f"resp_h{h}"))
+        current = target
+        for t in range(tool_calls):
+            call = _FunctionCall(
+                id=f"fc_{h}_{t}", call_id=f"call_{h}_{t}", name="file_search", arguments='{"query": "parking"}'
+            )
+            items.append(_Item(current, call, "tool_call_item"))
+            items.append(_OutputItem(current, {"call_id": call.call_id}, "tool_call_output_item", output=passage))
+            responses.append(_ModelResponse([call], _Usage(1, 2400, 60, 2460), f"resp_{h}_{t}"))
+    message = _Message(id="msg_final", content=[_Content(text="Restaurants need one space per 100 sq ft. " * 6)])
+    items.append(_Item(current, message, "message_output_item"))
+    responses.append(_ModelResponse([message], _Usage(1, 5200, 320, 5520), "resp_final"))
+
+    return {
+        "input": "How many parking spaces does a 3,000 sq ft restaurant in C2 need?",
+        "final_output": AnswerWithCitations(message.content[0].text, [Citation("§17.3.B", "212")]),
+        "new_items": items,
+        "raw_responses": responses,
+    }
+
+
+def legacy(run: dict[str, Any]) -> bytes:
+    payload = {
+        "input": run["input"],
+        "final_output": _legacy_to_serialisable(run["final_output"]),
+        "new_items": _legacy_to_serialisable(run["new_items"]),
+        "token_usage": _legacy_to_serialisable(run["raw_responses"]),
+    }
+    return json.dumps(payload, indent=2, default=str).encode()
+
+
+def fast(run: dict[str, Any], raw_responses: bool = False) -> bytes:
+    payload = {
+        "input": run["input"],
+        "final_output": serialization.to_primitive(run["final_output"]),
+        "new_items": serialization.to_primitive(run["new_items"]),
+        "token_usage": [
+            serialization.to_primitive(r) if raw_responses else serialization.select(r, ("output",))
+            for r in run["raw_responses"]
+        ],
+    }
+    return serialization.dumps(payload)
+
+
+def _time(fn, run: dict[str, Any], n: int) -> tuple[float, int]:
+    size = len(fn(run))
+    started = time.perf_counter()
+    for _ in range(n):
+        fn(run)
+    return (time.perf_counter() - started) / n * 1000, size
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=500)
+    parser.add_argument("--handoffs", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    serialization.register(_Agent, lambda agent: agent.name)
+    run = build_run(args.handoffs)
+    rows = [
+        ("asdict + json indent", _time(legacy, run, args.runs)),
+        ("fast, raw responses", _time(lambda r: fast(r, raw_responses=True), run, args.runs)),
+        ("fast, usage only", _time(fast, run, args.runs)),
+    ]
+    backend = "orjson" if serialization.orjson is not None else "json"
+    print(f"{len(run['new_items'])} items, {len(run['raw_responses'])} responses, backend: {backend}")
+    print(f"{'implementation':<24}{'ms/run':>10}{'bytes':>12}")
+    for name, (ms, size) in rows:
+        print(f"{name:<24}{ms:>10.3f}{size:>12,}")
+    print(f"speed-up: {rows[0][1][0] / rows[-1][1][0]:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
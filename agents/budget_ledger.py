@@ -0,0 +1,449 @@
+"""Concurrency-safe daily budget accounting (reserve → commit → release).
+
+A run first *reserves* its estimated cost; the reservation succeeds only if
+``spend over the last 24 h + outstanding reservations + estimate`` stays within the
+budget.  The check and the insert happen inside one ``BEGIN IMMEDIATE``
+transaction on the shared SQLite file, so concurrent requests in any uvicorn
+worker are serialised and cannot all pass the check together.  After the run the
+actual usage is *committed* (logged and deducted from the reservation) and the
+remainder *released*.  Reservations left behind by a crashed worker expire;
+a holder that outlives ``BUDGET_RESERVATION_TTL`` (a batch) ``extend``s its own.
+
+``SQLiteLedger`` is per host.  When the API is scaled out across hosts,
+``RedisLedger`` keeps the same state in Redis instead: spend in self-expiring
+time-bucket keys and reservations in a hash, with the check-and-reserve done by a
+single Lua script.  Committed usage is written behind to the local SQLite
+``usage`` table for auditing.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Sequence
+
+import redis
+
+from .cost_attribution import SCHEMA as _ATTRIBUTION_SCHEMA
+from .cost_attribution import UsageEvent, record_events
+from .spend_window import SpendWindow
+
+logger = logging.getLogger(__name__)
+
+_RESERVATION_TTL_SECONDS = float(os.getenv("BUDGET_RESERVATION_TTL", "900"))
+_REDIS_BUCKET_SECONDS = int(os.getenv("BUDGET_REDIS_BUCKET_SECONDS", "300"))
+_WRITE_BEHIND_SECONDS = float(os.getenv("BUDGET_WRITE_BEHIND_SECONDS", "30"))
+
+# Rough token model for up-front estimates; tune per deployment.
+_CHARS_PER_TOKEN = 4
+_EST_CONTEXT_TOKENS_PER_TURN = int(os.getenv("BUDGET_EST_CONTEXT_TOKENS", "2000"))
+_EST_COMPLETION_TOKENS_PER_TURN = int(os.getenv("BUDGET_EST_COMPLETION_TOKENS", "500"))
+
+
+class BudgetExceededError(RuntimeError):
+    """Raised when the daily OpenAI spend would exceed budget."""
+
+
+@dataclass
+class Reservation:
+    id: str
+    amount: float  # USD still held
+    created_at: float = field(default_factory=time.time)
+
+
+def estimate_tokens(input_text: str, max_turns: int) -> int:
+    """Upper-bound token estimate: every turn re-sends the input plus context."""
+
+    input_tokens = len(input_text) // _CHARS_PER_TOKEN + 1
+    per_turn = input_tokens + _EST_CONTEXT_TOKENS_PER_TURN + _EST_COMPLETION_TOKENS_PER_TURN
+    return per_turn * max(max_turns, 1)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS usage (
+    ts TEXT NOT NULL,
+    prompt_tokens INTEGER NOT NULL,
+    completion_tokens INTEGER NOT NULL,
+    cost_usd REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_usage_ts ON usage(ts);
+CREATE TABLE IF NOT EXISTS budget_reservations (
+    id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    amount_usd REAL NOT NULL
+);
+"""
+
+
+def _connect(db_path: str) -> sqlite3.Connection:
+    # Autocommit mode: transactions are explicit BEGIN IMMEDIATE … COMMIT.
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(_SCHEMA + _ATTRIBUTION_SCHEMA)
+    return conn
+
+
+# ---------------------------------------------------------------------------
+# Single host – SQLite
+# ---------------------------------------------------------------------------
+
+
+class SQLiteLedger:
+    """Budget ledger on the shared ``usage.sqlite3`` file."""
+
+    def __init__(
+        self,
+        db_path: str | Path,
+        budget_usd: float,
+        *,
+        window: SpendWindow | None = None,
+        reservation_ttl: float = _RESERVATION_TTL_SECONDS,
+    ):
+        self.db_path = str(db_path)
+        self.budget_usd = budget_usd
+        self.reservation_ttl = reservation_ttl
+        self.window = window or SpendWindow()
+        self._lock = threading.Lock()
+        self._conn = _connect(self.db_path)
+        self.window.seed(self._conn)
+
+    def _begin(self) -> None:
+        self._conn.execute("BEGIN IMMEDIATE")
+        # Inside the write lock: apply rows other processes committed meanwhile.
+        self.window.sync(self._conn)
+
+    def _reserved(self, now: float) -> float:
+        self._conn.execute("DELETE FROM budget_reservations WHERE expires_at < ?", (now,))
+        row = self._conn.execute("SELECT COALESCE(SUM(amount_usd), 0) FROM budget_reservations").fetchone()
+        return float(row[0])
+
+    # -- public API ------------------------------------------------------------
+
+    def spent(self) -> float:
+        """Committed spend over the trailing 24 h."""
+
+        with self._lock:
+            self.window.sync(self._conn)
+            return self.window.total()
+
+    def reserve(self, amount: float) -> Reservation:
+        """Atomically hold ``amount`` USD or raise ``BudgetExceededError``."""
+
+        with self._lock:
+            now = time.time()
+            self._begin()
+            try:
+                spent = self.window.total(now)
+                reserved = self._reserved(now)
+                if spent + reserved + amount > self.budget_usd:
+                    raise BudgetExceededError(
+                        f"Daily OpenAI budget exceeded: spent ${spent:.4f} + reserved ${reserved:.4f} "
+                        f"+ estimate ${amount:.4f} > ${self.budget_usd:.2f}; aborting run."
+                    )
+                res = Reservation(uuid.uuid4().hex, amount, now)
+                self._conn.execute(
+                    "INSERT INTO budget_reservations (id, created_at, expires_at, amount_usd) VALUES (?, ?, ?, ?)",
+                    (res.id, now, now + self.reservation_ttl, amount),
+                )
+                self._conn.execute("COMMIT")
+                return res
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def commit(
+        self,
+        res: Reservation | None,
+        prompt_tokens: int,
+        completion_tokens: int,
+        cost_usd: float,
+        events: Sequence[UsageEvent] = (),
+    ) -> None:
+        """Record actual usage and deduct it from the reservation in one transaction.
+
+        Actual spend is always recorded, even if it overshoots the reservation – the
+        tokens have been consumed; later reservations see the higher total.  ``res``
+        is ``None`` for usage that was not reserved up front (e.g. the judge).
+        Per-response ``events`` are stored and rolled up in the same transaction.
+        """
+
+        with self._lock:
+            self._begin()
+            try:
+                self._conn.execute(
+                    "INSERT INTO usage (ts, prompt_tokens, completion_tokens, cost_usd) VALUES (?, ?, ?, ?)",
+                    (datetime.utcnow().isoformat(), prompt_tokens, completion_tokens, cost_usd),
+                )
+                record_events(self._conn, events)
+                if res is not None:
+                    self._conn.execute(
+                        "UPDATE budget_reservations SET amount_usd = MAX(amount_usd - ?, 0) WHERE id = ?",
+                        (cost_usd, res.id),
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self.window.sync(self._conn)
+            if res is not None:
+                res.amount = max(res.amount - cost_usd, 0.0)
+
+    def release(self, res: Reservation) -> None:
+        """Return whatever is left of the reservation to the budget."""
+
+        with self._lock:
+            self._conn.execute("DELETE FROM budget_reservations WHERE id = ?", (res.id,))
+            res.amount = 0.0
+
+    def extend(self, res: Reservation) -> bool:
+        """Push the expiry of a held reservation to ``reservation_ttl`` from now.
+
+        Returns False when it has already expired (and was freed for others).
+        """
+
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE budget_reservations SET expires_at = ? WHERE id = ? AND expires_at >= ?",
+                (time.time() + self.reservation_ttl, res.id, time.time()),
+            )
+            return cur.rowcount > 0
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+# ---------------------------------------------------------------------------
+# Multi host – Redis
+# ---------------------------------------------------------------------------
+
+# KEYS[1] reservation amounts (hash), KEYS[2] reservation expiries (zset),
+# KEYS[3..] spend buckets covering the window.
+# ARGV: now, amount, budget, reservation id, reservation ttl
+_RESERVE_LUA = """
+local now = tonumber(ARGV[1])
+local expired = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', now)
+if #expired > 0 then
+  redis.call('HDEL', KEYS[1], unpack(expired))
+  redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', now)
+end
+local spent = 0
+for i = 3, #KEYS do
+  spent = spent + (tonumber(redis.call('GET', KEYS[i])) or 0)
+end
+local reserved = 0
+for _, v in ipairs(redis.call('HVALS', KEYS[1])) do
+  reserved = reserved + tonumber(v)
+end
+local amount = tonumber(ARGV[2])
+if spent + reserved + amount > tonumber(ARGV[3]) then
+  return {0, tostring(spent), tostring(reserved)}
+end
+redis.call('HSET', KEYS[1], ARGV[4], ARGV[2])
+redis.call('ZADD', KEYS[2], now + tonumber(ARGV[5]), ARGV[4])
+return {1, tostring(spent), tostring(reserved)}
+"""
+
+# KEYS[1] reservation amounts, KEYS[2] current spend bucket
+# ARGV: cost, reservation id, bucket ttl
+_COMMIT_LUA = """
+redis.call('INCRBYFLOAT', KEYS[2], ARGV[1])
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+local held = redis.call('HGET', KEYS[1], ARGV[2])
+if held then
+  local left = tonumber(held) - tonumber(ARGV[1])
+  if left < 0 then left = 0 end
+  redis.call('HSET', KEYS[1], ARGV[2], tostring(left))
+end
+return 1
+"""
+
+# KEYS[1] reservation amounts, KEYS[2] reservation expiries
+# ARGV: now, reservation id, reservation ttl
+_EXTEND_LUA = """
+local expires = redis.call('ZSCORE', KEYS[2], ARGV[2])
+if not expires or tonumber(expires) < tonumber(ARGV[1]) or redis.call('HEXISTS', KEYS[1], ARGV[2]) == 0 then
+  return 0
+end
+redis.call('ZADD', KEYS[2], tonumber(ARGV[1]) + tonumber(ARGV[3]), ARGV[2])
+return 1
+"""
+
+
+class RedisLedger:
+    """Budget ledger shared by every host pointing at the same Redis.
+
+    Spend is summed in ``<prefix>:spend:<bucket>`` keys of ``bucket_seconds`` each;
+    a bucket expires once it can no longer fall inside the window, so nothing has
+    to be pruned.  Usage rows are buffered and appended to the local SQLite
+    ``usage`` table every ``write_behind_seconds`` (and on ``close``).
+    """
+
+    def __init__(
+        self,
+        client: "redis.Redis",
+        budget_usd: float,
+        *,
+        db_path: str | Path | None = None,
+        prefix: str = "budget",
+        window_seconds: int = 86400,
+        bucket_seconds: int = _REDIS_BUCKET_SECONDS,
+        reservation_ttl: float = _RESERVATION_TTL_SECONDS,
+        write_behind_seconds: float = _WRITE_BEHIND_SECONDS,
+    ):
+        self.client = client
+        self.budget_usd = budget_usd
+        self.prefix = prefix
+        self.bucket_seconds = bucket_seconds
+        self.reservation_ttl = reservation_ttl
+        # Conservative like SpendWindow: one extra bucket for the partial oldest one.
+        self._n = -(-window_seconds // bucket_seconds) + 1
+        self._bucket_ttl = self._n * bucket_seconds
+        self._res_amounts = f"{prefix}:reservations"
+        self._res_expiry = f"{prefix}:reservations:expiry"
+        self._reserve = client.register_script(_RESERVE_LUA)
+        self._commit = client.register_script(_COMMIT_LUA)
+        self._extend = client.register_script(_EXTEND_LUA)
+
+        self._pending: list[tuple[tuple[str, int, int, float], Sequence[UsageEvent]]] = []
+        self._pending_lock = threading.Lock()
+        self._conn = _connect(str(db_path)) if db_path is not None else None
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        if self._conn is not None and write_behind_seconds > 0:
+            self._thread = threading.Thread(
+                target=self._write_behind_loop, args=(write_behind_seconds,), name="budget-write-behind", daemon=True
+            )
+            self._thread.start()
+
+    def _bucket_key(self, bucket: int) -> str:
+        return f"{self.prefix}:spend:{bucket}"
+
+    def _window_keys(self, now: float) -> list[str]:
+        head = int(now // self.bucket_seconds)
+        return [self._bucket_key(b) for b in range(head - self._n + 1, head + 1)]
+
+    # -- public API ------------------------------------------------------------
+
+    def spent(self) -> float:
+        """Committed spend over the trailing 24 h, across all hosts."""
+
+        values = self.client.mget(self._window_keys(time.time()))
+        return sum(float(v) for v in values if v is not None)
+
+    def reserve(self, amount: float) -> Reservation:
+        """Atomically hold ``amount`` USD or raise ``BudgetExceededError``."""
+
+        now = time.time()
+        res = Reservation(uuid.uuid4().hex, amount, now)
+        ok, spent, reserved = self._reserve(
+            keys=[self._res_amounts, self._res_expiry, *self._window_keys(now)],
+            args=[now, repr(amount), self.budget_usd, res.id, self.reservation_ttl],
+        )
+        if not int(ok):
+            raise BudgetExceededError(
+                f"Daily OpenAI budget exceeded: spent ${float(spent):.4f} + reserved ${float(reserved):.4f} "
+                f"+ estimate ${amount:.4f} > ${self.budget_usd:.2f}; aborting run."
+            )
+        return res
+
+    def commit(
+        self,
+        res: Reservation | None,
+        prompt_tokens: int,
+        completion_tokens: int,
+        cost_usd: float,
+        events: Sequence[UsageEvent] = (),
+    ) -> None:
+        """Add actual usage to the current bucket and deduct it from the reservation."""
+
+        now = time.time()
+        self._commit(
+            keys=[self._res_amounts, self._bucket_key(int(now // self.bucket_seconds))],
+            args=[repr(cost_usd), res.id if res is not None else "", self._bucket_ttl],
+        )
+        if res is not None:
+            res.amount = max(res.amount - cost_usd, 0.0)
+        if self._conn is not None:
+            row = (datetime.utcnow().isoformat(), prompt_tokens, completion_tokens, cost_usd)
+            with self._pending_lock:
+                self._pending.append((row, events))
+
+    def release(self, res: Reservation) -> None:
+        """Return whatever is left of the reservation to the budget."""
+
+        pipe = self.client.pipeline()
+        pipe.hdel(self._res_amounts, res.id)
+        pipe.zrem(self._res_expiry, res.id)
+        pipe.execute()
+        res.amount = 0.0
+
+    def extend(self, res: Reservation) -> bool:
+        """Push the expiry of a held reservation to ``reservation_ttl`` from now.
+
+        Returns False when it has already expired (and was freed for others).
+        """
+
+        ok = self._extend(
+            keys=[self._res_amounts, self._res_expiry], args=[time.time(), res.id, self.reservation_ttl]
+        )
+        return bool(int(ok))
+
+    def flush(self) -> int:
+        """Write buffered usage rows to SQLite. Returns the number written."""
+
+        if self._conn is None:
+            return 0
+        with self._pending_lock:
+            rows, self._pending = self._pending, []
+        if not rows:
+            return 0
+        try:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.executemany(
+                "INSERT INTO usage (ts, prompt_tokens, completion_tokens, cost_usd) VALUES (?, ?, ?, ?)",
+                [row for row, _ in rows],
+            )
+            record_events(self._conn, [e for _, events in rows for e in events])
+            self._conn.execute("COMMIT")
+        except sqlite3.Error:
+            if self._conn.in_transaction:
+                self._conn.execute("ROLLBACK")
+            # Keep the rows for the next attempt rather than losing the audit trail.
+            with self._pending_lock:
+                self._pending[:0] = rows
+            raise
+        return len(rows)
+
+    def _write_behind_loop(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            try:
+                self.flush()
+            except sqlite3.Error:
+                logger.exception("budget usage write-behind failed; will retry")
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self._conn is not None:
+            self.flush()
+            self._conn.close()
+            self._conn = None
+
+
+__all__ = [
+    "BudgetExceededError",
+    "RedisLedger",
+    "Reservation",
+    "SQLiteLedger",
+    "estimate_tokens",
+]
@@ -1,25 +1,97 @@
 from __future__ import annotations
 
+import asyncio
 import os
+import re
 from functools import lru_cache
-from typing import Any, List
-
-from pypdf import PdfReader
+from typing import Any, Dict, FrozenSet, Sequence
 
 from gpc_agents.src.agents import GuardrailFunctionOutput, output_guardrail
 
+from .pdf_text_store import load_page_store
 from .structures import AnswerWithCitations
 
 _PDF_PATH = os.path.join(os.path.dirname(__file__), "data", "EastBatonRouge_Zoning.pdf")
 
+# Section identifiers as they appear in the ordinance text and in model citations:
+# "§8.5.2", "§ 8.5.2", "Sec. 8.5.2", "Section 8.5.2", "8.5.2", "17.3.B". A bare
+# integer only counts as a section when it carries an explicit § / Sec. prefix,
+# otherwise every page number and table value would end up in the index.
+_SECTION_PATTERN = re.compile(
+    r"(?:(?P<prefix>§+|\bsec(?:tion)?s?\b\.?)\s*|(?<![\w.]))"
+    r"(?P<number>\d+(?:\.\d+)*(?:\.[A-Za-z]\b)?)(?![\d])",
+    re.IGNORECASE,
+)
+
+# How far (in pages) from the cited page we look when suggesting a correction.
+_SUGGEST_WINDOW = int(os.getenv("CITATION_SUGGEST_WINDOW", "5"))
+
+
+@lru_cache(maxsize=1)
+def _load_pdf_text() -> Sequence[str]:
+    # Memory-mapped page text, extracted once per PDF version and shared by all
+    # processes (see pdf_text_store); rebuilt automatically when the PDF changes.
+    return load_page_store(_PDF_PATH)
+
+
+def _iter_section_ids(text: str):
+    for match in _SECTION_PATTERN.finditer(text):
+        number = match.group("number").rstrip(".")
+        if "." not in number and not match.group("prefix"):
+            continue
+        yield number.upper()
+
+
+def normalize_section(section: str) -> str | None:
+    """Return the canonical identifier for a cited section, e.g. ``"Sec. 8.5.2"`` → ``"8.5.2"``.
+
+    Returns ``None`` when the citation does not contain a recognisable section
+    number.  A bare integer needs a § / Sec. prefix, as in the index: "Chapter 8"
+    or "Table 8" are free-form citations.
+    """
+
+    for number in _iter_section_ids(section):
+        return number
+    return None
+
 
 @lru_cache(maxsize=1)
-def _load_pdf_text() -> List[str]:
-    reader = PdfReader(_PDF_PATH)
-    pages_text = []
-    for page in reader.pages:
-        pages_text.append(page.extract_text() or "")
-    return pages_text
+def _section_index() -> Dict[str, FrozenSet[int]]:
+    """Map every normalised section identifier to the (0-indexed) pages it appears on.
+
+    Built once per process from ``_load_pdf_text()`` so that citation checks are a
+    dictionary lookup instead of a substring scan over full page text.
+    """
+
+    index: Dict[str, set[int]] = {}
+    for page_num, text in enumerate(_load_pdf_text()):
+        for number in _iter_section_ids(text):
+            index.setdefault(number, set()).add(page_num)
+    return {number: frozenset(pages) for number, pages in index.items()}
+
+
+def warm_citation_index() -> None:
+    """Load the page text and build the section index (blocking; call at startup)."""
+
+    _section_index()
+
+
+async def _loaded_section_index() -> Dict[str, FrozenSet[int]]:
+    # The first build may extract the whole PDF – never on the event loop.
+    if _section_index.cache_info().currsize:
+        return _section_index()
+    return await asyncio.to_thread(_section_index)
+
+
+def _suggest_page(pages: FrozenSet[int], page_num: int) -> int | None:
+    """Closest page (1-indexed) to ``page_num`` that mentions the section, if any is near."""
+
+    if not pages:
+        return None
+    nearest = min(pages, key=lambda p: (abs(p - page_num), p))
+    if abs(nearest - page_num) > _SUGGEST_WINDOW:
+        return None
+    return nearest + 1
 
 
 @output_guardrail
@@ -30,20 +102,33 @@ async def verify_citations(_, __, output: Any) -> GuardrailFunctionOutput:  # ty
         # Only verify when structured
         return GuardrailFunctionOutput(output_info="non-structured", tripwire_triggered=False)
 
-    pages = _load_pdf_text()
+    index = await _loaded_section_index()
     failures: list[str] = []
+    suggestions: dict[str, int] = {}
 
     for cit in output.citations:
         try:
             page_num = int(cit.page.split("-")[0]) - 1  # pages are 1-indexed in PDF
-            if page_num < 0 or page_num >= len(pages):
-                failures.append(cit.section)
+            section_id = normalize_section(cit.section)
+            if section_id is None:
+                # Free-form citation (e.g. a table title) – fall back to a plain substring check.
+                pages = _load_pdf_text()
+                if page_num < 0 or page_num >= len(pages) or cit.section not in pages[page_num]:
+                    failures.append(cit.section)
                 continue
-            if cit.section not in pages[page_num]:
+
+            found_on = index.get(section_id, frozenset())
+            if page_num not in found_on:
                 failures.append(cit.section)
+                suggested = _suggest_page(found_on, page_num)
+                if suggested is not None:
+                    suggestions[cit.section] = suggested
         except Exception:
             failures.append(cit.section)
 
-    return GuardrailFunctionOutput(output_info={"invalid_citations": failures}, tripwire_triggered=bool(failures))
+    return GuardrailFunctionOutput(
+        output_info={"invalid_citations": failures, "suggested_pages": suggestions},
+        tripwire_triggered=bool(failures),
+    )
 
-__all__ = ["verify_citations"] 
\ No newline at end of file
+__all__ = ["verify_citations", "normalize_section", "warm_citation_index"]
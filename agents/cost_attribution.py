@@ -0,0 +1,197 @@
+"""Per-response cost attribution with incrementally maintained rollups.
+
+Every model response is recorded in ``usage_events`` with the agent that made it,
+the model, prompt vs completion tokens and a cost from a per-model price table.
+In the same transaction the events are folded into ``usage_hourly`` and
+``usage_daily`` with UPSERTs, so dashboards read small pre-aggregated tables
+instead of scanning raw rows.
+
+    python -m agents.cost_attribution report --period daily --days 7
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sqlite3
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Iterable
+
+# USD per 1K tokens as (prompt, completion).  Dated snapshots such as
+# ``gpt-4.1-mini-2025-04-14`` match by longest prefix.
+_DEFAULT_PRICING: dict[str, tuple[float, float]] = {
+    "gpt-4o-mini": (0.00015, 0.0006),
+    "gpt-4o": (0.0025, 0.01),
+    "gpt-4.1-nano": (0.0001, 0.0004),
+    "gpt-4.1-mini": (0.0004, 0.0016),
+    "gpt-4.1": (0.002, 0.008),
+}
+
+# Unknown models fall back to the flat rate usage_monitor has always used.
+_FALLBACK_PER_1K = float(os.getenv("OPENAI_COST_PER_1K", "0.005"))
+
+
+def _load_pricing() -> dict[str, tuple[float, float]]:
+    pricing = dict(_DEFAULT_PRICING)
+    # OPENAI_PRICING='{"my-model": [0.001, 0.002]}' adds or overrides entries.
+    override = os.getenv("OPENAI_PRICING")
+    if override:
+        pricing.update({model: (float(p), float(c)) for model, (p, c) in json.loads(override).items()})
+    return pricing
+
+
+MODEL_PRICING = _load_pricing()
+
+
+def model_price(model: str) -> tuple[float, float]:
+    """(prompt, completion) USD per 1K tokens for ``model``."""
+
+    best = max((m for m in MODEL_PRICING if model.startswith(m)), key=len, default=None)
+    if best is None:
+        return _FALLBACK_PER_1K, _FALLBACK_PER_1K
+    return MODEL_PRICING[best]
+
+
+def price(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    prompt_rate, completion_rate = model_price(model)
+    return (prompt_tokens * prompt_rate + completion_tokens * completion_rate) / 1000
+
+
+@dataclass
+class UsageEvent:
+    agent: str
+    model: str
+    prompt_tokens: int
+    completion_tokens: int
+    cost_usd: float
+    ts: str = field(default_factory=lambda: datetime.utcnow().isoformat())
+
+    @classmethod
+    def priced(cls, agent: str, model: str, prompt_tokens: int, completion_tokens: int) -> "UsageEvent":
+        return cls(agent, model, prompt_tokens, completion_tokens, price(model, prompt_tokens, completion_tokens))
+
+
+# ---------------------------------------------------------------------------
+# Storage
+# ---------------------------------------------------------------------------
+
+_ROLLUP_COLUMNS = """
+    agent TEXT NOT NULL,
+    model TEXT NOT NULL,
+    responses INTEGER NOT NULL,
+    prompt_tokens INTEGER NOT NULL,
+    completion_tokens INTEGER NOT NULL,
+    cost_usd REAL NOT NULL
+"""
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS usage_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts TEXT NOT NULL,
+    agent TEXT NOT NULL,
+    model TEXT NOT NULL,
+    prompt_tokens INTEGER NOT NULL,
+    completion_tokens INTEGER NOT NULL,
+    cost_usd REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_usage_events_ts ON usage_events(ts);
+CREATE TABLE IF NOT EXISTS usage_hourly (
+    hour TEXT NOT NULL,{_ROLLUP_COLUMNS},
+    PRIMARY KEY (hour, agent, model)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS usage_daily (
+    day TEXT NOT NULL,{_ROLLUP_COLUMNS},
+    PRIMARY KEY (day, agent, model)
+) WITHOUT ROWID;
+"""
+
+# Bucket keys are prefixes of the ISO timestamp: "YYYY-MM-DDTHH" and "YYYY-MM-DD".
+_ROLLUPS = {"usage_hourly": ("hour", 13), "usage_daily": ("day", 10)}
+
+
+def record_events(conn: sqlite3.Connection, events: Iterable[UsageEvent]) -> None:
+    """Insert raw events and fold them into the rollups.
+
+    Runs inside the caller's transaction so events and aggregates never diverge.
+    """
+
+    events = list(events)
+    if not events:
+        return
+    conn.executemany(
+        "INSERT INTO usage_events (ts, agent, model, prompt_tokens, completion_tokens, cost_usd) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        [(e.ts, e.agent, e.model, e.prompt_tokens, e.completion_tokens, e.cost_usd) for e in events],
+    )
+    for table, (column, width) in _ROLLUPS.items():
+        # Pre-aggregate so each (bucket, agent, model) is one UPSERT.
+        sums: dict[tuple[str, str, str], list[float]] = defaultdict(lambda: [0, 0, 0, 0.0])
+        for e in events:
+            acc = sums[(e.ts[:width], e.agent, e.model)]
+            acc[0] += 1
+            acc[1] += e.prompt_tokens
+            acc[2] += e.completion_tokens
+            acc[3] += e.cost_usd
+        conn.executemany(
+            f"INSERT INTO {table} ({column}, agent, model, responses, prompt_tokens, completion_tokens, cost_usd) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?) "
+            f"ON CONFLICT({column}, agent, model) DO UPDATE SET "
+            "responses = responses + excluded.responses, "
+            "prompt_tokens = prompt_tokens + excluded.prompt_tokens, "
+            "completion_tokens = completion_tokens + excluded.completion_tokens, "
+            "cost_usd = cost_usd + excluded.cost_usd",
+            [(*key, *acc) for key, acc in sums.items()],
+        )
+
+
+def rollup(conn: sqlite3.Connection, period: str = "daily", since: str | None = None) -> list[dict]:
+    """Rows of ``usage_<period>`` newer than ``since`` (an ISO prefix), costliest first."""
+
+    table = f"usage_{period}"
+    column, width = _ROLLUPS[table]
+    cur = conn.execute(
+        f"SELECT * FROM {table} WHERE {column} >= ? ORDER BY {column} DESC, cost_usd DESC", ((since or "")[:width],)
+    )
+    cols = [c[0] for c in cur.description]
+    return [dict(zip(cols, row)) for row in cur.fetchall()]
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+
+def main(argv: list[str] | None = None) -> None:
+    default_db = os.path.join(os.path.dirname(__file__), "data", "usage.sqlite3")
+    parser = argparse.ArgumentParser(description="Report per-agent / per-model spend from the usage rollups")
+    parser.add_argument("--db", default=default_db, help="usage SQLite path")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rep = sub.add_parser("report", help="Print hourly or daily rollups as JSON")
+    rep.add_argument("--period", choices=["hourly", "daily"], default="daily")
+    rep.add_argument("--days", type=float, default=7)
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(f"file:{args.db}?mode=ro", uri=True)
+    try:
+        since = (datetime.utcnow() - timedelta(days=args.days)).isoformat()
+        print(json.dumps(rollup(conn, args.period, since), indent=2))
+    finally:
+        conn.close()
+
+
+__all__ = [
+    "MODEL_PRICING",
+    "SCHEMA",
+    "UsageEvent",
+    "model_price",
+    "price",
+    "record_events",
+    "rollup",
+]
+
+
+if __name__ == "__main__":
+    main()
@@ -4,7 +4,8 @@ import sys
 import argparse
 import sqlite3
 from datetime import datetime
-from master_orchestrator_agent import route_question
+from .answer_cache import CacheMode
+from .master_orchestrator_agent import route_question
 
 # Path to the history database
 HISTORY_DB_PATH = os.path.join(os.path.dirname(__file__), "data", "query_history.db")
@@ -47,7 +48,7 @@ def get_history(limit=10):
     conn.close()
     return history
 
-def interactive_mode():
+def interactive_mode(use_cache=True):
     """Run the CLI in interactive mode."""
     print("East Baton Rouge Zoning Code Assistant")
     print("======================================")
@@ -79,7 +80,7 @@ def interactive_mode():
             
             # Route the question to the appropriate agent
             print("\nProcessing your question...")
-            answer = route_question(question)
+            answer = route_question(question, mode=CacheMode(read=use_cache, write=use_cache))
             
             # Save to history
             save_to_history(question, answer)
@@ -112,6 +113,7 @@ def main():
     parser.add_argument("question", nargs="*", help="The question to ask (if not in interactive mode)")
     parser.add_argument("-i", "--interactive", action="store_true", help="Run in interactive mode")
     parser.add_argument("--history", action="store_true", help="Show recent query history")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the answer cache")
     
     args = parser.parse_args()
     
@@ -128,12 +130,12 @@ def main():
     
     # Run in interactive mode if requested or if no question provided
     if args.interactive or not args.question:
-        interactive_mode()
+        interactive_mode(use_cache=not args.no_cache)
         return
     
     # Process a single question from command line arguments
     question = " ".join(args.question)
-    answer = route_question(question)
+    answer = route_question(question, mode=CacheMode(read=not args.no_cache, write=not args.no_cache))
     save_to_history(question, answer)
     print(answer)
 
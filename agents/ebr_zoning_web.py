@@ -3,7 +3,8 @@ import os
 import sqlite3
 from datetime import datetime
 from flask import Flask, render_template, request, jsonify
-from master_orchestrator_agent import route_question
+from .answer_cache import cache_mode
+from .master_orchestrator_agent import route_question
 
 app = Flask(__name__)
 
@@ -62,7 +63,7 @@ def ask():
         return jsonify({'error': 'Question cannot be empty'})
     
     try:
-        answer = route_question(question)
+        answer = route_question(question, mode=cache_mode(request.headers.get("Cache-Control")))
         save_to_history(question, answer)
         return jsonify({'answer': answer})
     except Exception as e:
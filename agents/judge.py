@@ -1,8 +1,13 @@
 from dataclasses import dataclass
+from typing import List
 
 from gpc_agents.src.agents import Agent, ModelSettings
 from .config import DEFAULT_MODEL
 
+_RUBRIC = (
+    "You are an impartial quality judge. Rate the given assistant answer on accuracy, citation quality, and completeness on a scale of 1 (poor) to 5 (excellent). "
+)
+
 @dataclass
 class Score:
     rating: int  # 1-5
@@ -11,12 +16,37 @@ class Score:
 JUDGE = Agent(
     name="LLM Judge",
     instructions=(
-        "You are an impartial quality judge. Rate the given assistant answer on accuracy, citation quality, and completeness on a scale of 1 (poor) to 5 (excellent). "
-        "Return JSON with `rating` (int 1-5) and `rationale` (short string)."
+        _RUBRIC + "Return JSON with `rating` (int 1-5) and `rationale` (short string)."
     ),
     model=DEFAULT_MODEL,
     output_type=Score,
     model_settings=ModelSettings(temperature=0.0),
 )
 
-__all__ = ["JUDGE", "Score"] 
\ No newline at end of file
+
+@dataclass
+class ItemScore:
+    id: int
+    rating: int  # 1-5
+    rationale: str
+
+
+@dataclass
+class BatchScores:
+    scores: List[ItemScore]
+
+
+# Same rubric as JUDGE, several answers per request – used by offline sweeps.
+BATCH_JUDGE = Agent(
+    name="LLM Batch Judge",
+    instructions=(
+        _RUBRIC + "You receive a JSON list of items, each with `id`, `question` and `assistant_answer`. "
+        "Judge every item independently. Return JSON with `scores`: one entry per item with its `id`, "
+        "`rating` (int 1-5) and `rationale` (short string)."
+    ),
+    model=DEFAULT_MODEL,
+    output_type=BatchScores,
+    model_settings=ModelSettings(temperature=0.0),
+)
+
+__all__ = ["BATCH_JUDGE", "BatchScores", "ItemScore", "JUDGE", "Score"]
@@ -0,0 +1,160 @@
+"""Offline batch scoring of stored runs with the LLM judge.
+
+Instead of one judge request per answer, ``BATCH_JUDGE`` scores ``--batch-size``
+(question, answer) pairs per request and up to ``--concurrency`` requests run at
+once.  Scores are written back to the run store and the shared score cache;
+answers already in the cache are annotated without a model call.  Items a batch
+response leaves out are retried once in a smaller batch, then marked failed.
+
+    python -m agents.judge_batch --batch-size 10 --concurrency 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+from dataclasses import dataclass
+from typing import Any
+
+from gpc_agents.src.agents import Runner
+
+from .judge import BATCH_JUDGE, BatchScores, Score
+from .judge_policy import get_score_cache
+from .persistence import annotate_run_result, judge_cache_key
+from .run_store import RunStore, get_run_store
+from .usage_monitor import record_usage
+
+logger = logging.getLogger(__name__)
+
+# Runs in these states have no usable score yet.
+UNSCORED = frozenset({"pending", "unsampled", "skipped", "failed"})
+
+
+@dataclass
+class _Item:
+    run_id: str
+    question: Any
+    answer: Any
+    cache_key: str
+
+
+def _load_items(store: RunStore, statuses: frozenset[str] | None, since: str | None) -> list[_Item]:
+    items = []
+    for loc in store.find(statuses=statuses, since=since):
+        try:
+            record = store.read(loc.segment, loc.offset, loc.length)
+        except (OSError, json.JSONDecodeError):
+            logger.warning("skipping unreadable run %s at %s", loc.run_id, loc)
+            continue
+        question, answer = record.get("input"), record.get("final_output")
+        items.append(_Item(loc.run_id, question, answer, judge_cache_key(question, answer)))
+    return items
+
+
+async def _judge_batch(batch: list[_Item]) -> dict[int, Score]:
+    request = json.dumps(
+        [
+            {
+                "id": i,
+                "question": item.question if isinstance(item.question, str) else "",
+                "assistant_answer": item.answer,
+            }
+            for i, item in enumerate(batch)
+        ],
+        ensure_ascii=False,
+        default=str,
+    )
+    result = await Runner.run(BATCH_JUDGE, request)
+    await asyncio.to_thread(record_usage, result)
+    output: BatchScores = result.final_output  # type: ignore[assignment]
+    return {s.id: Score(rating=s.rating, rationale=s.rationale) for s in output.scores if 0 <= s.id < len(batch)}
+
+
+async def _score_batch(batch: list[_Item], sem: asyncio.Semaphore, stats: dict[str, int], retry: bool = True) -> None:
+    async with sem:
+        try:
+            scores = await _judge_batch(batch)
+        except Exception:
+            logger.exception("batch judge request failed for %d runs", len(batch))
+            scores = {}
+
+    missing = [item for i, item in enumerate(batch) if i not in scores]
+    for i, score in scores.items():
+        item = batch[i]
+        await asyncio.to_thread(get_score_cache().put, item.cache_key, score.rating, score.rationale)
+        await asyncio.to_thread(annotate_run_result, item.run_id, score)
+        stats["scored"] += 1
+
+    if missing and retry:
+        # Retry what the model dropped (or the whole failed batch) once, in halves.
+        mid = (len(missing) + 1) // 2
+        await asyncio.gather(
+            *(_score_batch(part, sem, stats, retry=False) for part in (missing[:mid], missing[mid:]) if part)
+        )
+        return
+    for item in missing:
+        await asyncio.to_thread(annotate_run_result, item.run_id, None, error="batch judge returned no score")
+        stats["failed"] += 1
+
+
+async def score_runs(
+    *,
+    since: str | None = None,
+    batch_size: int = 10,
+    concurrency: int = 4,
+    statuses: frozenset[str] | None = UNSCORED,
+    use_cache: bool = True,
+) -> dict[str, int]:
+    """Score stored runs in batches; returns counts of scored / cached / failed runs."""
+
+    items = await asyncio.to_thread(_load_items, get_run_store(), statuses, since)
+    stats = {"runs": len(items), "scored": 0, "cached": 0, "failed": 0}
+
+    todo: list[_Item] = []
+    cache = get_score_cache()
+    for item in items:
+        cached = await asyncio.to_thread(cache.get, item.cache_key) if use_cache else None
+        if cached is None:
+            todo.append(item)
+            continue
+        await asyncio.to_thread(
+            annotate_run_result, item.run_id, Score(rating=cached.rating, rationale=cached.rationale), status="cached"
+        )
+        stats["cached"] += 1
+
+    sem = asyncio.Semaphore(concurrency)
+    batches = [todo[i : i + batch_size] for i in range(0, len(todo), batch_size)]
+    await asyncio.gather(*(_score_batch(batch, sem, stats) for batch in batches))
+    return stats
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Batch-score stored runs with the LLM judge")
+    parser.add_argument("--since", help="Only runs at or after this ISO timestamp")
+    parser.add_argument("--batch-size", type=int, default=10, help="Answers per judge request")
+    parser.add_argument("--concurrency", type=int, default=4, help="Judge requests in flight")
+    parser.add_argument("--all", action="store_true", help="Re-score runs that already have a score")
+    args = parser.parse_args(argv)
+
+    stats = asyncio.run(
+        score_runs(
+            since=args.since,
+            batch_size=args.batch_size,
+            concurrency=args.concurrency,
+            statuses=None if args.all else UNSCORED,
+            use_cache=not args.all,
+        )
+    )
+    print(json.dumps(stats, indent=2))
+
+
+__all__ = [
+    "UNSCORED",
+    "score_runs",
+]
+
+
+if __name__ == "__main__":
+    main()
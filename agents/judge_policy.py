@@ -0,0 +1,149 @@
+"""When to run the LLM judge, and a cache of scores it already produced.
+
+Judging every run doubles model spend.  ``SamplingPolicy`` judges a fixed share
+of runs (deterministically by trace id, so a re-persisted run gets the same
+decision) and always judges runs flagged for review, e.g. when a guardrail
+reported a problem or the answer carries no citations.  ``ScoreCache`` stores
+scores keyed by a hash of (question, answer, judge model, judge instructions),
+so a repeated answer reuses its score and a changed judge starts afresh.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Iterable, NamedTuple
+
+_DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+CACHE_DB = os.getenv("JUDGE_CACHE_DB", os.path.join(_DATA_DIR, "judge_cache.sqlite3"))
+
+_SAMPLE_RATE = float(os.getenv("JUDGE_SAMPLE_RATE", "0.25"))
+# Flags that force judging regardless of the sample rate.
+_ALWAYS_JUDGE = frozenset(
+    f.strip() for f in os.getenv("JUDGE_ALWAYS", "guardrail,low_confidence").split(",") if f.strip()
+)
+_CACHE_TTL_SECONDS = float(os.getenv("JUDGE_CACHE_TTL_DAYS", "30")) * 86400
+
+
+class CachedScore(NamedTuple):
+    rating: int
+    rationale: str
+
+
+@dataclass
+class JudgePlan:
+    """Outcome of the sampling policy + cache lookup for one run."""
+
+    cache_key: str
+    reason: str | None = None  # why it will be judged: a flag or "sampled"
+    cached: CachedScore | None = None
+
+    @property
+    def needs_judge(self) -> bool:
+        return self.cached is None and self.reason is not None
+
+    @property
+    def status(self) -> str:
+        if self.cached is not None:
+            return "cached"
+        return "pending" if self.reason else "unsampled"
+
+
+@dataclass
+class SamplingPolicy:
+    rate: float = _SAMPLE_RATE
+    always: frozenset[str] = _ALWAYS_JUDGE
+
+    def decide(self, flags: Iterable[str], sample_key: str | None = None) -> str | None:
+        """Return the reason to judge (a forcing flag or ``"sampled"``), or None to skip."""
+
+        for flag in flags:
+            if flag in self.always:
+                return flag
+        if self.rate >= 1:
+            return "sampled"
+        if self.rate <= 0:
+            return None
+        if sample_key is None:
+            draw = random.random()
+        else:
+            draw = int(hashlib.sha256(sample_key.encode()).hexdigest()[:8], 16) / 0x100000000
+        return "sampled" if draw < self.rate else None
+
+
+def cache_key(question: Any, answer: Any, judge_model: Any, judge_instructions: Any) -> str:
+    blob = json.dumps(
+        [question, answer, str(judge_model), str(judge_instructions)],
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+class ScoreCache:
+    """SQLite-backed judge score cache shared by all workers on the host."""
+
+    def __init__(self, db_path: str = CACHE_DB, ttl_seconds: float = _CACHE_TTL_SECONDS):
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS judge_scores ("
+            "key TEXT PRIMARY KEY, rating INTEGER NOT NULL, rationale TEXT NOT NULL, "
+            "created_at REAL NOT NULL, hits INTEGER NOT NULL DEFAULT 0) WITHOUT ROWID"
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> CachedScore | None:
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT rating, rationale FROM judge_scores WHERE key = ? AND created_at >= ?",
+                (key, time.time() - self.ttl_seconds),
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE judge_scores SET hits = hits + 1 WHERE key = ?", (key,))
+        return CachedScore(*row)
+
+    def put(self, key: str, rating: int, rationale: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO judge_scores (key, rating, rationale, created_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET rating = excluded.rating, rationale = excluded.rationale, "
+                "created_at = excluded.created_at",
+                (key, rating, rationale, time.time()),
+            )
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+_cache: ScoreCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_score_cache() -> ScoreCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ScoreCache()
+        return _cache
+
+
+__all__ = [
+    "CachedScore",
+    "JudgePlan",
+    "SamplingPolicy",
+    "ScoreCache",
+    "cache_key",
+    "get_score_cache",
+]
@@ -0,0 +1,184 @@
+"""Background LLM-judge scoring for persisted runs.
+
+The ``/ask`` handler stores the run immediately (``quality_status:
+"pending"``) and hands the answer to this queue; a small pool of asyncio workers
+runs the judge and attaches the score to the stored run when it arrives.  Failed judge
+calls are retried with exponential backoff.  The queue is bounded: when it is
+full ``submit`` returns False and the run is marked ``"skipped"`` instead of
+holding requests back.  ``drain`` waits for outstanding work at shutdown.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+
+from gpc_agents.src.agents import Runner
+from prometheus_client import Counter, Gauge
+
+from .judge import JUDGE, Score
+from .judge_policy import get_score_cache
+from .persistence import annotate_run_result, judge_input
+from .usage_monitor import record_usage
+
+logger = logging.getLogger(__name__)
+
+_WORKERS = int(os.getenv("JUDGE_WORKERS", "2"))
+_MAX_PENDING = int(os.getenv("JUDGE_MAX_PENDING", "100"))
+_MAX_ATTEMPTS = int(os.getenv("JUDGE_MAX_ATTEMPTS", "3"))
+_RETRY_BASE_DELAY = float(os.getenv("JUDGE_RETRY_BASE_DELAY", "1.0"))
+_DRAIN_TIMEOUT = float(os.getenv("JUDGE_DRAIN_TIMEOUT", "30"))
+
+JUDGE_QUEUE_DEPTH = Gauge("judge_queue_depth", "Runs waiting for an LLM-judge score")
+JUDGE_JOBS = Counter("judge_jobs_total", "LLM-judge jobs by outcome", ["outcome"])
+
+
+@dataclass
+class JudgeJob:
+    run_id: str
+    question: Any
+    answer: Any
+    cache_key: str | None = None
+    attempt: int = 0
+
+
+async def _run_judge(job: JudgeJob) -> Score:
+    result = await Runner.run(JUDGE, judge_input(job.question, job.answer))
+    await asyncio.to_thread(record_usage, result)
+    return result.final_output  # type: ignore[return-value]
+
+
+class JudgeQueue:
+    """Bounded asyncio queue + worker pool; must be used from one event loop."""
+
+    def __init__(
+        self,
+        *,
+        workers: int = _WORKERS,
+        max_pending: int = _MAX_PENDING,
+        max_attempts: int = _MAX_ATTEMPTS,
+        retry_base_delay: float = _RETRY_BASE_DELAY,
+        score: Callable[[JudgeJob], Awaitable[Score]] = _run_judge,
+    ):
+        self._n_workers = workers
+        self._max_attempts = max_attempts
+        self._retry_base_delay = retry_base_delay
+        self._score = score
+        self._queue: asyncio.Queue[JudgeJob] = asyncio.Queue(maxsize=max_pending)
+        self._workers: list[asyncio.Task] = []
+        self._closed = False
+        JUDGE_QUEUE_DEPTH.set_function(self._queue.qsize)
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def _ensure_workers(self) -> None:
+        if not self._workers:
+            self._workers = [
+                asyncio.create_task(self._worker(), name=f"judge-worker-{i}") for i in range(self._n_workers)
+            ]
+
+    async def submit(self, run_id: str, question: Any, answer: Any, cache_key: str | None = None) -> bool:
+        """Queue a run for scoring. Returns False (and marks the run skipped) when full.
+
+        The skip is written off the event loop: back-pressure is exactly when
+        blocking every request on SQLite would hurt most.
+        """
+
+        if not self._closed:
+            self._ensure_workers()
+            try:
+                self._queue.put_nowait(JudgeJob(run_id, question, answer, cache_key))
+                return True
+            except asyncio.QueueFull:
+                pass
+        reason = "judge queue closed" if self._closed else "judge queue full"
+        JUDGE_JOBS.labels("skipped").inc()
+        logger.warning("%s; run %s left unscored", reason, run_id)
+        await asyncio.to_thread(annotate_run_result, run_id, None, status="skipped", error=reason)
+        return False
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._process(job)
+            except Exception:  # never let one job kill the worker
+                logger.exception("judge worker failed on run %s", job.run_id)
+            finally:
+                self._queue.task_done()
+
+    async def _process(self, job: JudgeJob) -> None:
+        while True:
+            job.attempt += 1
+            try:
+                score = await self._score(job)
+            except Exception as exc:
+                if job.attempt >= self._max_attempts:
+                    JUDGE_JOBS.labels("failed").inc()
+                    await asyncio.to_thread(
+                        annotate_run_result, job.run_id, None, error=f"{type(exc).__name__}: {exc}"
+                    )
+                    return
+                JUDGE_JOBS.labels("retried").inc()
+                await asyncio.sleep(self._retry_base_delay * 2 ** (job.attempt - 1))
+                continue
+            JUDGE_JOBS.labels("scored").inc()
+            if job.cache_key is not None:
+                await asyncio.to_thread(get_score_cache().put, job.cache_key, score.rating, score.rationale)
+            await asyncio.to_thread(annotate_run_result, job.run_id, score)
+            return
+
+    async def drain(self, timeout: float | None = _DRAIN_TIMEOUT) -> bool:
+        """Stop accepting jobs, wait for queued ones, then stop the workers.
+
+        Returns False if the timeout expired with jobs still outstanding (those
+        runs keep ``quality_status: "pending"``).
+        """
+
+        self._closed = True
+        drained = True
+        if self._workers:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout)
+            except asyncio.TimeoutError:
+                drained = False
+                logger.warning("judge queue drain timed out with %d jobs pending", self._queue.qsize())
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        return drained
+
+
+_judge_queue: JudgeQueue | None = None
+
+
+def get_judge_queue() -> JudgeQueue:
+    """Process-wide queue, created lazily inside the running event loop."""
+
+    global _judge_queue
+    if _judge_queue is None:
+        _judge_queue = JudgeQueue()
+    return _judge_queue
+
+
+async def drain_judge_queue(timeout: float | None = _DRAIN_TIMEOUT) -> bool:
+    """Shutdown hook: let queued judge jobs finish (bounded by ``timeout``)."""
+
+    global _judge_queue
+    if _judge_queue is None:
+        return True
+    queue, _judge_queue = _judge_queue, None
+    return await queue.drain(timeout)
+
+
+__all__ = [
+    "JudgeQueue",
+    "drain_judge_queue",
+    "get_judge_queue",
+]
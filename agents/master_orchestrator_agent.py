@@ -2,15 +2,18 @@ from __future__ import annotations
 
 import asyncio
 import sys
-from typing import List
+from typing import Any, List
 
-from gpc_agents.src.agents import Agent, Runner
+from gpc_agents.src.agents import Agent, InputGuardrailTripwireTriggered, OutputGuardrailTripwireTriggered, Runner
 
+from .answer_cache import CacheMode, get_answer_cache
 from .guardrails import enforce_citation_json, profanity_filter
 from .specialists import ALL_SPECIALISTS
 from .config import DEFAULT_MODEL
-from .persistence import persist_run_result
+from .persistence import persist_run_result, persist_tripped_run, run_flags
+from .serialization import to_primitive
 from .structures import AnswerWithCitations
+from .usage_monitor import run_with_budget
 
 # ---------------------------------------------------------------------------
 # Build master orchestrator agent – delegates via handoffs.
@@ -35,6 +38,55 @@ ORCHESTRATOR = Agent[
     output_type=AnswerWithCitations,
 )
 
+# ---------------------------------------------------------------------------
+# Blocking entry point for the CLI / Flask front-ends
+# ---------------------------------------------------------------------------
+
+
+def format_answer(answer: Any) -> str:
+    """Plain-text rendering of an AnswerWithCitations payload (dict or dataclass)."""
+
+    answer = to_primitive(answer)
+    if not isinstance(answer, dict):
+        return str(answer)
+    lines = [answer.get("answer", "")]
+    citations = answer.get("citations") or []
+    if citations:
+        lines.append("")
+        lines.append("Citations: " + "; ".join(f"{c.get('section')} (p. {c.get('page')})" for c in citations))
+    return "\n".join(lines)
+
+
+def route_question(question: str, *, mode: CacheMode = CacheMode()) -> str:
+    """Answer ``question`` through the orchestrator, answer cache first.
+
+    A cache hit returns without running any agent.  Otherwise the run goes through
+    the budget ledger, is persisted and judged, and a clean answer is cached.
+    ``mode`` (see ``answer_cache.cache_mode``) can skip the lookup, the store or both.
+    """
+
+    cache = get_answer_cache(ORCHESTRATOR) if mode.read or mode.write else None
+    cached = cache.get(question) if cache is not None and mode.read else None
+    if cached is not None:
+        return format_answer(cached["answer"])
+
+    try:
+        result = asyncio.run(run_with_budget(starting_agent=ORCHESTRATOR, input=question))
+    except (InputGuardrailTripwireTriggered, OutputGuardrailTripwireTriggered) as exc:
+        persist_tripped_run(question, exc)
+        raise
+    location = persist_run_result(result)
+    if cache is not None and mode.write and not run_flags(result):
+        cache.put(
+            question,
+            result.final_output,
+            run_id=location.run_id,
+            run_result_path=str(location),
+            specialist=result.last_agent.name,
+        )
+    return format_answer(result.final_output)
+
+
 # ---------------------------------------------------------------------------
 # CLI entry point
 # ---------------------------------------------------------------------------
@@ -58,9 +110,16 @@ def main() -> None:  # noqa: D401 – CLI helper
     print(result.final_output)
 
     # Persist for audits / fine-tuning
-    path = persist_run_result(result)
-    print(f"[info] run saved to {path}")
+    location = persist_run_result(result)
+    print(f"[info] run {location.run_id} saved to {location}")
+
+
+__all__ = [
+    "ORCHESTRATOR",
+    "format_answer",
+    "route_question",
+]
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,337 @@
+"""Offline parcel → zoning snapshot backed by an indexed local SQLite store.
+
+Ingest a bulk export from the EBR GIS portal (CSV, GeoJSON or newline-delimited
+GeoJSON) and ``get_parcel_zoning`` answers from it before touching the live REST
+service.  Every import is recorded as a numbered snapshot version; re-importing
+only rewrites parcels whose zoning changed, and re-importing an identical file
+is a no-op.
+
+    python -m agents.parcel_snapshot import parcels.csv --prune
+    python -m agents.parcel_snapshot info
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Iterable, Iterator, Tuple
+
+_DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+DB_PATH = os.getenv("PARCEL_SNAPSHOT_DB", os.path.join(_DATA_DIR, "parcel_snapshot.sqlite3"))
+
+# Snapshots older than this are reported stale and bypassed by lookups.
+MAX_AGE_DAYS = float(os.getenv("PARCEL_SNAPSHOT_MAX_AGE_DAYS", "30"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    version INTEGER PRIMARY KEY AUTOINCREMENT,
+    source TEXT NOT NULL,
+    source_sha256 TEXT NOT NULL,
+    imported_at TEXT NOT NULL,
+    rows_seen INTEGER NOT NULL,
+    rows_changed INTEGER NOT NULL,
+    rows_removed INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS parcels (
+    parcel_id TEXT PRIMARY KEY,
+    zoning TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    updated_at TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_parcels_version ON parcels(version);
+"""
+
+
+class SnapshotError(RuntimeError):
+    """Raised when an export cannot be parsed."""
+
+
+# ---------------------------------------------------------------------------
+# Export readers
+# ---------------------------------------------------------------------------
+
+
+def _detect_format(path: str) -> str:
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        return "csv"
+    if ext in {".geojsonl", ".geojsons", ".ndjson", ".jsonl"}:
+        return "geojsonl"
+    if ext in {".geojson", ".json"}:
+        return "geojson"
+    raise SnapshotError(f"Cannot infer export format from {path!r}; pass --format")
+
+
+def _feature_row(feature: dict[str, Any], id_field: str, zoning_field: str) -> Tuple[str, str] | None:
+    props = feature.get("properties") or feature.get("attributes") or {}
+    pid, zoning = props.get(id_field), props.get(zoning_field)
+    if pid is None or not zoning:
+        return None
+    return str(pid).strip(), str(zoning).strip()
+
+
+def iter_export(path: str, fmt: str, id_field: str, zoning_field: str) -> Iterator[Tuple[str, str]]:
+    """Yield ``(parcel_id, zoning)`` rows; records without both fields are skipped."""
+
+    if fmt == "csv":
+        with open(path, newline="", encoding="utf-8-sig") as fp:
+            reader = csv.DictReader(fp)
+            if reader.fieldnames is None or not {id_field, zoning_field} <= set(reader.fieldnames):
+                raise SnapshotError(f"CSV must have {id_field!r} and {zoning_field!r} columns")
+            for rec in reader:
+                pid, zoning = (rec.get(id_field) or "").strip(), (rec.get(zoning_field) or "").strip()
+                if pid and zoning:
+                    yield pid, zoning
+    elif fmt == "geojsonl":
+        # One Feature per line – streams, so very large exports stay cheap.
+        with open(path, encoding="utf-8") as fp:
+            for line in fp:
+                line = line.strip().lstrip("\x1e")  # RFC 8142 record separator
+                if line:
+                    row = _feature_row(json.loads(line), id_field, zoning_field)
+                    if row:
+                        yield row
+    elif fmt == "geojson":
+        with open(path, encoding="utf-8") as fp:
+            data = json.load(fp)
+        for feature in data.get("features", []):
+            row = _feature_row(feature, id_field, zoning_field)
+            if row:
+                yield row
+    else:
+        raise SnapshotError(f"Unknown export format {fmt!r}")
+
+
+# ---------------------------------------------------------------------------
+# Import
+# ---------------------------------------------------------------------------
+
+
+def _file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as fp:
+        for chunk in iter(lambda: fp.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _connect(db_path: str) -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def import_export(
+    path: str,
+    *,
+    fmt: str | None = None,
+    id_field: str = "PARCEL_ID",
+    zoning_field: str = "ZONING",
+    prune: bool = False,
+    db_path: str = DB_PATH,
+) -> dict[str, Any]:
+    """Apply an export as a new snapshot version and return its summary row.
+
+    Only parcels whose zoning changed (or are new) are rewritten.  With ``prune``
+    the export is treated as complete and parcels missing from it are removed.
+    """
+
+    fmt = fmt or _detect_format(path)
+    digest = _file_sha256(path)
+    conn = _connect(db_path)
+    try:
+        latest = conn.execute(
+            "SELECT version FROM snapshots WHERE source_sha256 = ? ORDER BY version DESC LIMIT 1", (digest,)
+        ).fetchone()
+        now = datetime.utcnow().isoformat()
+        if latest and latest[0] == _latest_version(conn):
+            # Same data re-exported: still confirms the snapshot is current.
+            with conn:
+                conn.execute("UPDATE snapshots SET imported_at = ? WHERE version = ?", (now, latest[0]))
+            return {**_snapshot_row(conn, latest[0]), "unchanged": True}
+
+        with conn:
+            cur = conn.execute(
+                "INSERT INTO snapshots (source, source_sha256, imported_at, rows_seen, rows_changed, rows_removed) "
+                "VALUES (?, ?, ?, 0, 0, 0)",
+                (os.path.abspath(path), digest, now),
+            )
+            version = cur.lastrowid
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS seen (parcel_id TEXT PRIMARY KEY) WITHOUT ROWID")
+            conn.execute("DELETE FROM seen")
+
+            seen = 0
+            for batch in _batched(iter_export(path, fmt, id_field, zoning_field), 5000):
+                seen += len(batch)
+                conn.executemany(
+                    "INSERT INTO parcels (parcel_id, zoning, version, updated_at) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(parcel_id) DO UPDATE SET zoning = excluded.zoning, "
+                    "version = excluded.version, updated_at = excluded.updated_at "
+                    "WHERE parcels.zoning != excluded.zoning",
+                    [(pid, zoning, version, now) for pid, zoning in batch],
+                )
+                if prune:
+                    conn.executemany("INSERT OR IGNORE INTO seen VALUES (?)", [(pid,) for pid, _ in batch])
+            changed = conn.execute("SELECT COUNT(*) FROM parcels WHERE version = ?", (version,)).fetchone()[0]
+
+            removed = 0
+            if prune:
+                removed = conn.execute(
+                    "DELETE FROM parcels WHERE parcel_id NOT IN (SELECT parcel_id FROM seen)"
+                ).rowcount
+            conn.execute(
+                "UPDATE snapshots SET rows_seen = ?, rows_changed = ?, rows_removed = ? WHERE version = ?",
+                (seen, changed, removed, version),
+            )
+        return _snapshot_row(conn, version)
+    finally:
+        conn.close()
+
+
+def _batched(rows: Iterable[Tuple[str, str]], size: int) -> Iterator[list[Tuple[str, str]]]:
+    batch: list[Tuple[str, str]] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _latest_version(conn: sqlite3.Connection) -> int | None:
+    row = conn.execute("SELECT MAX(version) FROM snapshots").fetchone()
+    return row[0] if row else None
+
+
+def _snapshot_row(conn: sqlite3.Connection, version: int) -> dict[str, Any]:
+    cur = conn.execute("SELECT * FROM snapshots WHERE version = ?", (version,))
+    cols = [c[0] for c in cur.description]
+    return dict(zip(cols, cur.fetchone()))
+
+
+# ---------------------------------------------------------------------------
+# Lookup
+# ---------------------------------------------------------------------------
+
+
+class ParcelSnapshot:
+    """Read-only view of the snapshot DB used by ``agents.tools``."""
+
+    _INFO_TTL_SECONDS = 60
+
+    def __init__(self, db_path: str = DB_PATH, max_age_days: float = MAX_AGE_DAYS):
+        self.db_path = db_path
+        self.max_age = timedelta(days=max_age_days)
+        self._conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._info: dict[str, Any] | None = None
+        self._info_at = 0.0
+
+    def info(self) -> dict[str, Any] | None:
+        """Latest snapshot summary (cached briefly; picks up re-imports automatically)."""
+
+        if time.monotonic() - self._info_at > self._INFO_TTL_SECONDS:
+            with self._lock:
+                version = _latest_version(self._conn)
+                self._info = _snapshot_row(self._conn, version) if version else None
+                self._info_at = time.monotonic()
+        return self._info
+
+    def is_stale(self) -> bool:
+        info = self.info()
+        if info is None:
+            return True
+        return datetime.utcnow() - datetime.fromisoformat(info["imported_at"]) > self.max_age
+
+    def get(self, parcel_id: str) -> str | None:
+        with self._lock:
+            row = self._conn.execute("SELECT zoning FROM parcels WHERE parcel_id = ?", (parcel_id,)).fetchone()
+        return row[0] if row else None
+
+    def get_many(self, parcel_ids: list[str]) -> dict[str, str]:
+        found: dict[str, str] = {}
+        with self._lock:
+            for i in range(0, len(parcel_ids), 500):
+                chunk = parcel_ids[i : i + 500]
+                marks = ",".join("?" * len(chunk))
+                found.update(
+                    self._conn.execute(
+                        f"SELECT parcel_id, zoning FROM parcels WHERE parcel_id IN ({marks})", chunk
+                    ).fetchall()
+                )
+        return found
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def open_snapshot(db_path: str = DB_PATH) -> ParcelSnapshot | None:
+    """Return a reader for ``db_path`` or ``None`` if no snapshot has been imported."""
+
+    if not os.path.exists(db_path):
+        return None
+    try:
+        snap = ParcelSnapshot(db_path)
+        return snap if snap.info() else None
+    except sqlite3.Error:
+        return None
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Manage the offline parcel zoning snapshot")
+    parser.add_argument("--db", default=DB_PATH, help="Snapshot SQLite path")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    imp = sub.add_parser("import", help="Import a CSV / GeoJSON parcel export")
+    imp.add_argument("path")
+    imp.add_argument("--format", choices=["csv", "geojson", "geojsonl"])
+    imp.add_argument("--id-field", default="PARCEL_ID")
+    imp.add_argument("--zoning-field", default="ZONING")
+    imp.add_argument("--prune", action="store_true", help="Export is complete; drop parcels not in it")
+
+    sub.add_parser("info", help="Show the latest snapshot version and staleness")
+    args = parser.parse_args(argv)
+
+    if args.command == "import":
+        summary = import_export(
+            args.path,
+            fmt=args.format,
+            id_field=args.id_field,
+            zoning_field=args.zoning_field,
+            prune=args.prune,
+            db_path=args.db,
+        )
+        print(json.dumps(summary, indent=2))
+    else:
+        snap = open_snapshot(args.db)
+        if snap is None:
+            print("No snapshot imported.")
+            return
+        print(json.dumps({**(snap.info() or {}), "stale": snap.is_stale()}, indent=2))
+
+
+__all__ = [
+    "ParcelSnapshot",
+    "SnapshotError",
+    "import_export",
+    "open_snapshot",
+]
+
+
+if __name__ == "__main__":
+    main()
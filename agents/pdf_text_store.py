@@ -0,0 +1,360 @@
+"""Persistent, memory-mapped store of extracted zoning PDF page text.
+
+pypdf extraction of the full ordinance takes several seconds, and an ``lru_cache``
+only lives as long as the worker process.  This module writes the extracted text
+once to a compact binary file keyed by the PDF's SHA-256 so every uvicorn worker
+and CLI invocation can ``mmap`` it in milliseconds.  The store is rebuilt
+automatically whenever the PDF content changes.
+
+File layout (little-endian)::
+
+    magic   8 bytes   b"EBRPTX1\\0"
+    sha256  32 bytes  digest of the source PDF
+    count   uint32    number of pages
+    offsets uint64 × (count + 1) byte offsets into the text blob
+    blob    UTF-8 page text, concatenated
+
+Prebuild as a deploy step::
+
+    python -m agents.pdf_text_store --pdf agents/data/EastBatonRouge_Zoning.pdf --workers 8
+
+On a cold cache pages are extracted by a process pool (``PDF_EXTRACT_WORKERS``) and
+streamed straight into the store, so memory stays bounded for large documents.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import time
+from collections import deque
+from collections.abc import Sequence
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Iterable, Iterator, overload
+
+from prometheus_client import Gauge
+from pypdf import PdfReader
+
+logger = logging.getLogger(__name__)
+
+_DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+DEFAULT_PDF_PATH = os.path.join(_DATA_DIR, "EastBatonRouge_Zoning.pdf")
+DEFAULT_CACHE_DIR = os.getenv("PDF_TEXT_CACHE_DIR", os.path.join(_DATA_DIR, "pdf_cache"))
+
+_MAGIC = b"EBRPTX1\0"
+_HEADER = struct.Struct("<8s32sI")
+_OFFSET = struct.Struct("<Q")
+_SPAN = struct.Struct("<QQ")
+
+# Cold-start extraction fan-out. 0/1 keeps extraction in-process.
+_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", str(min(os.cpu_count() or 1, 8))))
+
+EXTRACT_RATE = Gauge("pdf_extract_pages_per_second", "Pages/second of the last zoning PDF extraction")
+
+
+# ---------------------------------------------------------------------------
+# Hashing
+# ---------------------------------------------------------------------------
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as fp:
+        for chunk in iter(lambda: fp.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _cached_sha256(pdf_path: str, cache_dir: str) -> str:
+    """SHA-256 of ``pdf_path``, memoised on (size, mtime) in a small stamp file.
+
+    Avoids re-hashing a large PDF on every process start while still picking up
+    content changes (any rewrite of the file changes its mtime).
+    """
+
+    st = os.stat(pdf_path)
+    stamp_path = os.path.join(cache_dir, os.path.basename(pdf_path) + ".sha256.json")
+    try:
+        with open(stamp_path) as fp:
+            stamp = json.load(fp)
+        if stamp["size"] == st.st_size and stamp["mtime_ns"] == st.st_mtime_ns:
+            return stamp["sha256"]
+    except (OSError, ValueError, KeyError):
+        pass
+
+    digest = file_sha256(pdf_path)
+    _atomic_write(
+        stamp_path,
+        json.dumps({"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": digest}).encode(),
+    )
+    return digest
+
+
+def pdf_sha256(pdf_path: str = DEFAULT_PDF_PATH, cache_dir: str = DEFAULT_CACHE_DIR) -> str:
+    """SHA-256 of the zoning PDF, re-hashed only when its size or mtime changed."""
+
+    return _cached_sha256(pdf_path, cache_dir)
+
+
+def _atomic_write(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fp:
+            fp.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+# ---------------------------------------------------------------------------
+# Reader
+# ---------------------------------------------------------------------------
+
+
+class PageTextStore(Sequence):
+    """Read-only, memory-mapped sequence of page strings.
+
+    Pages are decoded lazily on access, so opening the store costs one ``mmap``
+    call regardless of document size.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as fp:
+            self._mm = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, digest, count = _HEADER.unpack_from(self._mm, 0)
+        except struct.error:
+            self._mm.close()
+            raise
+        if magic != _MAGIC:
+            self._mm.close()
+            raise ValueError(f"{path} is not a page-text store")
+        self.sha256 = digest.hex()
+        self._count = count
+        self._offsets_at = _HEADER.size
+        self._blob_at = self._offsets_at + (count + 1) * _OFFSET.size
+
+    def _span(self, i: int) -> tuple[int, int]:
+        start, end = _SPAN.unpack_from(self._mm, self._offsets_at + i * _OFFSET.size)
+        return self._blob_at + start, self._blob_at + end
+
+    def __len__(self) -> int:
+        return self._count
+
+    @overload
+    def __getitem__(self, i: int) -> str: ...
+
+    @overload
+    def __getitem__(self, i: slice) -> list[str]: ...
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self._count))]
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError("page index out of range")
+        start, end = self._span(i)
+        return self._mm[start:end].decode("utf-8")
+
+    def close(self) -> None:
+        self._mm.close()
+
+
+# ---------------------------------------------------------------------------
+# Writer
+# ---------------------------------------------------------------------------
+
+
+def _page_count(pdf_path: str) -> int:
+    return len(PdfReader(pdf_path).pages)
+
+
+def _extract_range(pdf_path: str, start: int, stop: int) -> list[str]:
+    """Worker entry point: extract pages ``[start, stop)`` with a private reader."""
+
+    reader = PdfReader(pdf_path)
+    return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def _iter_serial(pdf_path: str) -> Iterator[str]:
+    reader = PdfReader(pdf_path)
+    for page in reader.pages:
+        yield page.extract_text() or ""
+
+
+def _iter_parallel(pdf_path: str, total: int, workers: int, chunk_size: int) -> Iterator[str]:
+    # At most ``2 × workers`` ranges are in flight, so the parent never holds more
+    # than that many chunks of page text regardless of document length.
+    ranges = iter(range(0, total, chunk_size))
+    pending: deque[Future] = deque()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+
+        def submit_next() -> None:
+            start = next(ranges, None)
+            if start is not None:
+                pending.append(pool.submit(_extract_range, pdf_path, start, min(start + chunk_size, total)))
+
+        for _ in range(workers * 2):
+            submit_next()
+        while pending:
+            chunk = pending.popleft().result()
+            submit_next()
+            yield from chunk
+
+
+def iter_pdf_pages(pdf_path: str, *, workers: int | None = None, chunk_size: int | None = None) -> Iterator[str]:
+    """Yield page text in order, fanning page ranges out across a process pool.
+
+    Logs and publishes (``pdf_extract_pages_per_second``) the extraction rate once
+    the generator is exhausted.
+    """
+
+    workers = _EXTRACT_WORKERS if workers is None else workers
+    started = time.perf_counter()
+    pages = 0
+
+    total = _page_count(pdf_path) if workers > 1 else 0
+    if workers > 1 and total > 1:
+        workers = min(workers, total)
+        chunk_size = chunk_size or max(4, min(64, -(-total // (workers * 4))))
+        source = _iter_parallel(pdf_path, total, workers, chunk_size)
+    else:
+        workers = 1
+        source = _iter_serial(pdf_path)
+
+    for text in source:
+        pages += 1
+        yield text
+
+    elapsed = time.perf_counter() - started
+    rate = pages / elapsed if elapsed > 0 else float(pages)
+    EXTRACT_RATE.set(rate)
+    logger.info("extracted %d pages from %s in %.2fs (%.1f pages/s, %d workers)", pages, pdf_path, elapsed, rate, workers)
+
+
+def write_store(path: str, sha256: str, pages: Iterable[str]) -> int:
+    """Write ``pages`` to ``path`` atomically. Returns the number of pages written.
+
+    Page text is streamed to a temporary blob file so memory stays bounded by a
+    single page plus the offsets table.
+    """
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    offsets = [0]
+    with tempfile.TemporaryFile(dir=os.path.dirname(path)) as blob:
+        for text in pages:
+            data = text.encode("utf-8", errors="replace")
+            blob.write(data)
+            offsets.append(offsets[-1] + len(data))
+        count = len(offsets) - 1
+
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                out.write(_HEADER.pack(_MAGIC, bytes.fromhex(sha256), count))
+                out.write(b"".join(_OFFSET.pack(o) for o in offsets))
+                blob.seek(0)
+                for chunk in iter(lambda: blob.read(1 << 20), b""):
+                    out.write(chunk)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+    return count
+
+
+def store_path_for(pdf_path: str, sha256: str, cache_dir: str = DEFAULT_CACHE_DIR) -> str:
+    stem = os.path.splitext(os.path.basename(pdf_path))[0]
+    return os.path.join(cache_dir, f"{stem}-{sha256}.pages")
+
+
+def _remove_stale(pdf_path: str, keep: str, cache_dir: str) -> None:
+    stem = os.path.splitext(os.path.basename(pdf_path))[0]
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        if name.startswith(f"{stem}-") and name.endswith(".pages") and path != keep:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+
+def build_store(
+    pdf_path: str = DEFAULT_PDF_PATH,
+    cache_dir: str = DEFAULT_CACHE_DIR,
+    *,
+    force: bool = False,
+    workers: int | None = None,
+) -> str:
+    """Ensure an up-to-date store exists for ``pdf_path`` and return its path."""
+
+    sha256 = _cached_sha256(pdf_path, cache_dir)
+    path = store_path_for(pdf_path, sha256, cache_dir)
+    if force or not os.path.exists(path):
+        write_store(path, sha256, iter_pdf_pages(pdf_path, workers=workers))
+        _remove_stale(pdf_path, path, cache_dir)
+    return path
+
+
+def load_page_store(pdf_path: str = DEFAULT_PDF_PATH, cache_dir: str = DEFAULT_CACHE_DIR) -> PageTextStore:
+    """Open the page-text store for ``pdf_path``, (re)building it if the PDF changed."""
+
+    path = build_store(pdf_path, cache_dir)
+    try:
+        return PageTextStore(path)
+    except (ValueError, struct.error):
+        # Truncated / foreign file – rebuild once.
+        return PageTextStore(build_store(pdf_path, cache_dir, force=True))
+
+
+# ---------------------------------------------------------------------------
+# CLI – prebuild as a deploy step
+# ---------------------------------------------------------------------------
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Prebuild the zoning PDF page-text cache")
+    parser.add_argument(
+        "--pdf",
+        action="append",
+        help="Source PDF (repeat for amendments); defaults to the zoning ordinance",
+    )
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Output directory")
+    parser.add_argument("--force", action="store_true", help="Rebuild even if up to date")
+    parser.add_argument("--workers", type=int, default=None, help="Extraction processes (1 = serial)")
+    args = parser.parse_args(argv)
+
+    for pdf_path in args.pdf or [DEFAULT_PDF_PATH]:
+        started = time.perf_counter()
+        path = build_store(pdf_path, args.cache_dir, force=args.force, workers=args.workers)
+        elapsed = time.perf_counter() - started
+        store = PageTextStore(path)
+        print(
+            f"{path}: {len(store)} pages, sha256={store.sha256[:12]}… in {elapsed:.2f}s "
+            f"({len(store) / elapsed if elapsed > 0 else 0:.1f} pages/s)"
+        )
+        store.close()
+
+
+__all__ = [
+    "PageTextStore",
+    "build_store",
+    "load_page_store",
+    "pdf_sha256",
+]
+
+
+if __name__ == "__main__":
+    main()
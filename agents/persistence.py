@@ -1,70 +1,262 @@
-import json
 import os
 from datetime import datetime
 from typing import Any
 
-from gpc_agents.src.agents import RunResult
+from gpc_agents.src.agents import Agent, RunResult
 from .judge import JUDGE, Score
 from gpc_agents.src.agents import Runner
+from .judge_policy import JudgePlan, SamplingPolicy, cache_key, get_score_cache
+from .run_store import RunLocation, get_run_store
+from .serialization import register, select, to_primitive
+from .usage_monitor import record_usage
 
-_DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
-_RESULTS_DIR = os.path.join(_DATA_DIR, "run_results")
 
-os.makedirs(_RESULTS_DIR, exist_ok=True)
+# Run items reference their agent; store the name, not the whole agent graph.
+register(Agent, lambda agent: agent.name)
 
+# Model responses repeat every output item already stored under new_items;
+# keep only their usage/ids unless RUN_STORE_RAW_RESPONSES=1.
+_RAW_RESPONSES = os.getenv("RUN_STORE_RAW_RESPONSES", "0") == "1"
+_RAW_RESPONSE_FIELDS = ("output",)
 
-def _to_serialisable(obj: Any) -> Any:  # noqa: ANN401 – needs Any for recursion
-    """Best-effort conversion of complex SDK objects to JSON-serialisable primitives."""
 
-    from dataclasses import is_dataclass, asdict
+def judge_input(question: Any, answer: Any) -> Any:
+    """Input payload for the quality judge."""
 
-    if is_dataclass(obj):
-        return asdict(obj)
+    return {
+        "assistant_answer": answer,
+        "question": question if isinstance(question, str) else "",
+    }
 
-    if isinstance(obj, (list, tuple)):
-        return [_to_serialisable(i) for i in obj]
 
-    if isinstance(obj, dict):
-        return {k: _to_serialisable(v) for k, v in obj.items()}
+def guardrail_outcome(result: RunResult) -> str:
+    """``"flagged"`` for invalid citations, else ``"passed"``.
 
-    return obj
+    A tripwire aborts the run before there is a ``RunResult``; such runs are
+    stored as ``"tripped"`` by ``persist_tripped_run``.
+    """
 
+    outcome = "passed"
+    for gr in [*result.input_guardrail_results, *result.output_guardrail_results]:
+        info = gr.output.output_info
+        if isinstance(info, dict) and info.get("invalid_citations"):
+            outcome = "flagged"
+    return outcome
 
-def persist_run_result(result: RunResult) -> str:
-    """Write RunResult to JSONL file – returns absolute path."""
 
-    timestamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S%fZ")
-    trace_id = (
-        result.context_wrapper.trace.trace_id if result.context_wrapper.trace else "notrace"
-    )
-    fname = f"{timestamp}_{trace_id}.json"
-    fpath = os.path.join(_RESULTS_DIR, fname)
+def run_flags(result: RunResult) -> set[str]:
+    """Review flags that force judging: guardrail findings and uncited answers."""
 
-    payload = {
-        "input": result.input,
-        "final_output": _to_serialisable(result.final_output),
-        "new_items": _to_serialisable(result.new_items),
-        "trace_id": trace_id,
-        "token_usage": _to_serialisable(result.raw_responses),
+    flags: set[str] = set()
+    if guardrail_outcome(result) != "passed":
+        flags.add("guardrail")
+    output = to_primitive(result.final_output)
+    if not isinstance(output, dict) or not output.get("answer") or not output.get("citations"):
+        flags.add("low_confidence")
+    return flags
+
+
+def judge_cache_key(question: Any, answer: Any) -> str:
+    return cache_key(question, to_primitive(answer), JUDGE.model, JUDGE.instructions)
+
+
+def plan_judging(result: RunResult, policy: SamplingPolicy | None = None) -> JudgePlan:
+    """Apply the score cache and sampling policy to a finished run (blocking: SQLite)."""
+
+    key = judge_cache_key(result.input, result.final_output)
+    cached = get_score_cache().get(key)
+    if cached is not None:
+        return JudgePlan(key, cached=cached)
+    trace = result.context_wrapper.trace
+    reason = (policy or SamplingPolicy()).decide(run_flags(result), trace.trace_id if trace else None)
+    return JudgePlan(key, reason=reason)
+
+
+def tripped_answer(exc: Exception) -> Any:
+    """The answer an output guardrail rejected; None for an input tripwire."""
+
+    return getattr(getattr(exc, "guardrail_result", None), "agent_output", None)
+
+
+def plan_tripped_judging(question: Any, exc: Exception, policy: SamplingPolicy | None = None) -> JudgePlan | None:
+    """``plan_judging`` for a run stopped by a tripwire; None when there is no answer.
+
+    The ``guardrail`` flag applies, so with the default ``JUDGE_ALWAYS`` every
+    rejected answer is judged.
+    """
+
+    answer = tripped_answer(exc)
+    if answer is None:
+        return None
+    key = judge_cache_key(question, answer)
+    cached = get_score_cache().get(key)
+    if cached is not None:
+        return JudgePlan(key, cached=cached)
+    reason = (policy or SamplingPolicy()).decide(["guardrail"], _trace_id(getattr(exc, "run_data", None)))
+    return JudgePlan(key, reason=reason)
+
+
+def annotate_run_result(
+    run_id: str, score: Score | None, *, status: str | None = None, error: str | None = None
+) -> None:
+    """Attach a judge score (or why there is none) to a stored run."""
+
+    fields: dict[str, Any] = {
+        "quality_score": score.rating if score else None,
+        "quality_rationale": score.rationale if score else None,
+        "quality_status": status or ("scored" if score else "failed"),
     }
+    if error:
+        fields["quality_error"] = error
+    get_run_store().annotate(run_id, **fields)
+
+
+def _trace_id(run: Any) -> str:
+    trace = getattr(getattr(run, "context_wrapper", None), "trace", None)
+    return trace.trace_id if trace else "notrace"
+
+
+def _token_usage(responses: Any, raw_responses: bool) -> list[Any]:
+    return [to_primitive(r) if raw_responses else select(r, _RAW_RESPONSE_FIELDS) for r in responses]
+
 
-    # Run quality judge synchronously (blocking) to score output
+def _judge_now(payload: dict[str, Any], plan: JudgePlan, question: Any, answer: Any) -> None:
+    # Run quality judge synchronously (blocking) to score output – CLI path only
     try:
-        judge_result = Runner.run_sync(JUDGE, {
-            "assistant_answer": result.final_output,
-            "question": result.input if isinstance(result.input, str) else "",
-        })
+        judge_result = Runner.run_sync(JUDGE, judge_input(question, answer))
+        record_usage(judge_result)
         score: Score = judge_result.final_output  # type: ignore[assignment]
+        get_score_cache().put(plan.cache_key, score.rating, score.rationale)
         payload["quality_score"] = score.rating
         payload["quality_rationale"] = score.rationale
+        payload["quality_status"] = "scored"
     except Exception:
-        payload["quality_score"] = None
+        payload["quality_status"] = "failed"
 
-    with open(fpath, "w") as fp:
-        json.dump(payload, fp, ensure_ascii=False, indent=2)
 
-    return fpath
+def persist_run_result(
+    result: RunResult,
+    *,
+    judge: bool = True,
+    plan: JudgePlan | None = None,
+    raw_responses: bool = _RAW_RESPONSES,
+) -> RunLocation:
+    """Append RunResult to the segmented run store – returns its location.
+
+    ``str(location)`` is ``<segment>:<offset>``; ``location.run_id`` is the key for
+    ``RunStore.get`` and ``annotate_run_result``.
+
+    Whether the run is judged follows ``plan`` (default: ``plan_judging``); a cached
+    score is attached directly.  With ``judge=False`` a run that needs judging is
+    written with ``quality_status: "pending"`` and the caller is expected to score
+    it later (see ``agents.judge_queue``).
+
+    ``token_usage`` holds each model response without its output items unless
+    ``raw_responses`` is set.
+    """
+
+    plan = plan or plan_judging(result)
+
+    now = datetime.utcnow()
+    trace_id = _trace_id(result)
+    run_id = f"{now.strftime('%Y%m%dT%H%M%S%fZ')}_{trace_id}"
+
+    payload = {
+        "input": result.input,
+        "final_output": to_primitive(result.final_output),
+        "new_items": to_primitive(result.new_items),
+        "trace_id": trace_id,
+        "specialist": result.last_agent.name,
+        "guardrail": guardrail_outcome(result),
+        "token_usage": _token_usage(result.raw_responses, raw_responses),
+        "quality_score": plan.cached.rating if plan.cached else None,
+        "quality_status": plan.status,
+        "judge_reason": plan.reason,
+    }
+    if plan.cached:
+        payload["quality_rationale"] = plan.cached.rationale
+
+    if judge and plan.needs_judge:
+        _judge_now(payload, plan, result.input, result.final_output)
+
+    return get_run_store().append(
+        payload,
+        run_id=run_id,
+        trace_id=trace_id,
+        ts=now.isoformat(),
+        quality_score=payload["quality_score"],
+        quality_status=payload["quality_status"],
+        specialist=payload["specialist"],
+        guardrail=payload["guardrail"],
+    )
+
+
+def persist_tripped_run(
+    question: Any,
+    exc: Exception,
+    *,
+    judge: bool = True,
+    plan: JudgePlan | None = None,
+    raw_responses: bool = _RAW_RESPONSES,
+) -> RunLocation:
+    """Store a run aborted by a guardrail tripwire (``guardrail: "tripped"``).
+
+    ``exc`` is the SDK's Input/OutputGuardrailTripwireTriggered; the run so far
+    comes from its ``run_data`` when the SDK attached one.  An output tripwire's
+    rejected answer is stored as ``final_output`` and judged like a finished run
+    (``plan`` defaults to ``plan_tripped_judging``; ``judge=False`` leaves it
+    ``"pending"`` for the judge queue).  An input tripwire has no answer and is
+    stored ``"not_judged"``.
+    """
+
+    plan = plan or plan_tripped_judging(question, exc)
+    run = getattr(exc, "run_data", None)
+    gr = exc.guardrail_result
+    answer = tripped_answer(exc)
+    now = datetime.utcnow()
+    trace_id = _trace_id(run)
+    run_id = f"{now.strftime('%Y%m%dT%H%M%S%fZ')}_{trace_id}"
+    last_agent = getattr(run, "last_agent", None)
+    payload = {
+        "input": getattr(run, "input", None) or question,
+        "final_output": to_primitive(answer),
+        "new_items": to_primitive(getattr(run, "new_items", None) or []),
+        "trace_id": trace_id,
+        "specialist": last_agent.name if last_agent is not None else None,
+        "guardrail": "tripped",
+        "tripwire": {"guardrail": gr.guardrail.get_name(), "info": to_primitive(gr.output.output_info)},
+        "token_usage": _token_usage(getattr(run, "raw_responses", None) or [], raw_responses),
+        "quality_score": plan.cached.rating if plan and plan.cached else None,
+        "quality_status": plan.status if plan else "not_judged",
+        "judge_reason": plan.reason if plan else None,
+    }
+    if plan and plan.cached:
+        payload["quality_rationale"] = plan.cached.rationale
+
+    if judge and plan and plan.needs_judge:
+        _judge_now(payload, plan, question, answer)
+
+    return get_run_store().append(
+        payload,
+        run_id=run_id,
+        trace_id=trace_id,
+        ts=now.isoformat(),
+        quality_score=payload["quality_score"],
+        quality_status=payload["quality_status"],
+        specialist=payload["specialist"],
+        guardrail="tripped",
+    )
+
 
 __all__ = [
+    "annotate_run_result",
+    "guardrail_outcome",
+    "judge_cache_key",
+    "judge_input",
     "persist_run_result",
+    "persist_tripped_run",
+    "plan_judging",
+    "plan_tripped_judging",
+    "run_flags",
+    "tripped_answer",
 ] 
\ No newline at end of file
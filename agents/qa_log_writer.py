@@ -0,0 +1,283 @@
+"""Background, batched writer for the per-domain ``qa_log`` SQLite databases.
+
+``log_qa`` used to open a connection, create the table, insert one row and commit
+on every call, all on the agent's thread.  Here rows go onto a bounded queue and a
+single writer thread keeps one WAL-mode connection per domain DB open, inserting
+whatever has accumulated in one transaction (group commit).  When the queue is
+full ``submit`` raises ``QueueFullError`` so the caller can report back-pressure
+and fall back to a direct write instead of blocking indefinitely or dropping rows.
+
+A batch that fails to commit (e.g. "database is locked" while the retention job
+vacuums) is kept and retried with exponential backoff, in order with later rows
+for the same DB.  Rows are only given up after ``QA_LOG_MAX_ATTEMPTS`` failed
+commits; they are logged and counted in ``qa_log_rows_dropped_total``.
+"""
+
+from __future__ import annotations
+
+import atexit
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Tuple
+
+from prometheus_client import Counter
+
+logger = logging.getLogger(__name__)
+
+_MAX_QUEUE = int(os.getenv("QA_LOG_MAX_QUEUE", "10000"))
+_BATCH_SIZE = int(os.getenv("QA_LOG_BATCH_SIZE", "500"))
+_FLUSH_INTERVAL = float(os.getenv("QA_LOG_FLUSH_INTERVAL", "0.05"))
+_PUT_TIMEOUT = float(os.getenv("QA_LOG_PUT_TIMEOUT", "0.1"))
+_MAX_ATTEMPTS = int(os.getenv("QA_LOG_MAX_ATTEMPTS", "5"))
+_RETRY_BASE_DELAY = float(os.getenv("QA_LOG_RETRY_BASE_DELAY", "0.5"))
+
+QA_LOG_ROWS_DROPPED = Counter("qa_log_rows_dropped_total", "qa_log rows given up after repeated write failures")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS qa_log (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    question TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    timestamp TEXT NOT NULL
+)
+"""
+
+_Row = Tuple[str, str, str, str]  # db_path, question, answer, timestamp
+_STOP = object()
+
+
+class QueueFullError(RuntimeError):
+    """Raised by ``QALogWriter.submit`` when the writer cannot keep up."""
+
+
+@dataclass
+class _Unwritten:
+    rows: list[Tuple[str, str, str]]
+    attempts: int = 0
+
+
+def connect(db_path: str) -> sqlite3.Connection:
+    """Open a ``qa_log`` database in WAL mode, creating the table if needed."""
+
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(_SCHEMA)
+    conn.commit()
+    return conn
+
+
+def write_rows(conn: sqlite3.Connection, rows: list[Tuple[str, str, str]]) -> None:
+    with conn:
+        conn.executemany("INSERT INTO qa_log (question, answer, timestamp) VALUES (?, ?, ?)", rows)
+
+
+class QALogWriter:
+    """Single background thread + per-domain connection pool."""
+
+    def __init__(
+        self,
+        *,
+        max_queue: int = _MAX_QUEUE,
+        batch_size: int = _BATCH_SIZE,
+        flush_interval: float = _FLUSH_INTERVAL,
+        put_timeout: float = _PUT_TIMEOUT,
+        max_attempts: int = _MAX_ATTEMPTS,
+        retry_base_delay: float = _RETRY_BASE_DELAY,
+    ):
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._put_timeout = put_timeout
+        self._max_attempts = max_attempts
+        self._retry_base_delay = retry_base_delay
+        self._conns: dict[str, sqlite3.Connection] = {}
+        # Writer-thread only: rows of a DB whose last commit failed, and when to retry.
+        self._backlog: dict[str, list[_Unwritten]] = {}
+        self._retry_at: dict[str, float] = {}
+        self._pending = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        self.rows_written = 0
+        self.batches_written = 0
+        self.rows_dropped = 0
+        self._thread = threading.Thread(target=self._run, name="qa-log-writer", daemon=True)
+        self._thread.start()
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def submit(self, db_path: str, question: str, answer: str, timestamp: str) -> None:
+        if self._closed:
+            raise QueueFullError("qa_log writer is closed")
+        with self._cond:
+            self._pending += 1
+        try:
+            self._queue.put((db_path, question, answer, timestamp), timeout=self._put_timeout)
+        except queue.Full:
+            self._done(1)
+            raise QueueFullError(f"qa_log queue full ({self._queue.maxsize} rows pending)") from None
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Block until every submitted row is committed. Returns False on timeout."""
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout: float | None = 10.0) -> None:
+        """Flush outstanding rows, stop the thread and close pooled connections."""
+
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    # -- writer thread -------------------------------------------------------
+
+    def _done(self, n: int) -> None:
+        with self._cond:
+            self._pending -= n
+            if not self._pending:
+                self._cond.notify_all()
+
+    def _conn(self, db_path: str) -> sqlite3.Connection:
+        conn = self._conns.get(db_path)
+        if conn is None:
+            conn = self._conns[db_path] = connect(db_path)
+        return conn
+
+    def _run(self) -> None:
+        stopping = False
+        # After close(), keep going until failed rows are written or given up.
+        while not stopping or self._backlog:
+            self._retry_due()
+            try:
+                item = self._queue.get(timeout=self._flush_interval)
+            except queue.Empty:
+                continue
+            batch: list[_Row] = []
+            while True:
+                if item is _STOP:
+                    stopping = True
+                else:
+                    batch.append(item)
+                if len(batch) >= self._batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                self._write(batch)
+        for conn in self._conns.values():
+            conn.close()
+        self._conns.clear()
+
+    def _write(self, batch: list[_Row]) -> None:
+        by_db: dict[str, list[Tuple[str, str, str]]] = defaultdict(list)
+        for db_path, question, answer, ts in batch:
+            by_db[db_path].append((question, answer, ts))
+        for db_path, rows in by_db.items():
+            if db_path in self._backlog:
+                # Keep insertion order: queue behind the rows waiting for a retry.
+                self._backlog[db_path].append(_Unwritten(rows))
+            else:
+                self._write_db(db_path, [_Unwritten(rows)])
+
+    def _retry_due(self) -> None:
+        now = time.monotonic()
+        for db_path in [db for db, at in self._retry_at.items() if at <= now]:
+            del self._retry_at[db_path]
+            self._write_db(db_path, self._backlog.pop(db_path))
+
+    def _write_db(self, db_path: str, chunks: list[_Unwritten]) -> None:
+        rows = [row for chunk in chunks for row in chunk.rows]
+        try:
+            write_rows(self._conn(db_path), rows)
+        except sqlite3.Error as exc:
+            conn = self._conns.pop(db_path, None)
+            if conn is not None:
+                conn.close()
+            kept = []
+            for chunk in chunks:
+                chunk.attempts += 1
+                if chunk.attempts < self._max_attempts:
+                    kept.append(chunk)
+            dropped = len(rows) - sum(len(chunk.rows) for chunk in kept)
+            if dropped:
+                logger.error(
+                    "giving up on %d qa_log rows for %s after %d attempts: %s",
+                    dropped,
+                    db_path,
+                    self._max_attempts,
+                    exc,
+                )
+                QA_LOG_ROWS_DROPPED.inc(dropped)
+                self.rows_dropped += dropped
+                self._done(dropped)
+            if kept:
+                attempts = max(chunk.attempts for chunk in kept)
+                delay = self._retry_base_delay * 2 ** (attempts - 1)
+                logger.warning(
+                    "failed to write %d qa_log rows to %s (%s); retrying in %.2fs",
+                    len(rows) - dropped,
+                    db_path,
+                    exc,
+                    delay,
+                )
+                self._backlog[db_path] = kept
+                self._retry_at[db_path] = time.monotonic() + delay
+            return
+        self.rows_written += len(rows)
+        self.batches_written += 1
+        self._done(len(rows))
+
+
+_writer: QALogWriter | None = None
+_writer_lock = threading.Lock()
+
+
+def get_writer() -> QALogWriter:
+    """Process-wide writer, started lazily and flushed at interpreter exit."""
+
+    global _writer
+    with _writer_lock:
+        if _writer is None or _writer._closed:
+            _writer = QALogWriter()
+        return _writer
+
+
+def shutdown_writer() -> None:
+    """Flush and stop the process-wide writer (app shutdown hook / atexit)."""
+
+    global _writer
+    with _writer_lock:
+        if _writer is not None:
+            _writer.close()
+            _writer = None
+
+
+atexit.register(shutdown_writer)
+
+__all__ = [
+    "QALogWriter",
+    "QueueFullError",
+    "connect",
+    "get_writer",
+    "shutdown_writer",
+    "write_rows",
+]
@@ -0,0 +1,308 @@
+"""Retention, downsampling and incremental maintenance for the local data files.
+
+``usage.sqlite3``, the per-domain ``run_logs/*.sqlite3`` and the run store index
+otherwise grow forever.  One pass of this job:
+
+* folds raw ``usage`` rows older than ``--usage-days`` into one row per hour
+  (same table, so the budget window and audits keep working) and drops
+  ``usage_events`` / ``usage_hourly`` rows already covered by coarser rollups;
+* archives ``qa_log`` rows older than ``--qa-days`` to gzipped NDJSON, then deletes them;
+* packs legacy one-file-per-run results (``run_results/*.json``, written before
+  the segmented run store) older than ``--results-days`` into one gzipped NDJSON
+  segment per day under ``run_results/archive/``;
+* reclaims free pages with ``PRAGMA incremental_vacuum`` and refreshes planner
+  statistics with ``PRAGMA optimize`` – never a blocking full ``VACUUM`` after the
+  one-off switch to incremental auto-vacuum.
+
+Safe to run repeatedly (e.g. nightly from cron):
+
+    python -m agents.retention
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import gzip
+import json
+import logging
+import os
+import sqlite3
+from datetime import datetime, timedelta
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+_DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+USAGE_DB = os.path.join(_DATA_DIR, "usage.sqlite3")
+RUN_LOGS_DIR = os.path.join(_DATA_DIR, "run_logs")
+RUN_RESULTS_DIR = os.path.join(_DATA_DIR, "run_results")
+ARCHIVE_DIR = os.path.join(_DATA_DIR, "archive")
+
+USAGE_DAYS = float(os.getenv("RETENTION_USAGE_DAYS", "7"))
+EVENTS_DAYS = float(os.getenv("RETENTION_EVENTS_DAYS", "30"))
+HOURLY_DAYS = float(os.getenv("RETENTION_HOURLY_DAYS", "180"))
+QA_LOG_DAYS = float(os.getenv("RETENTION_QA_LOG_DAYS", "90"))
+RESULTS_DAYS = float(os.getenv("RETENTION_RESULTS_DAYS", "14"))
+VACUUM_PAGES = int(os.getenv("RETENTION_VACUUM_PAGES", "2000"))
+
+
+def _cutoff(days: float, now: datetime | None = None) -> str:
+    return ((now or datetime.utcnow()) - timedelta(days=days)).isoformat()
+
+
+def _connect(db_path: str) -> sqlite3.Connection:
+    return sqlite3.connect(db_path, timeout=30, isolation_level=None)
+
+
+def _has_table(conn: sqlite3.Connection, name: str) -> bool:
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)).fetchone() is not None
+
+
+# ---------------------------------------------------------------------------
+# usage.sqlite3
+# ---------------------------------------------------------------------------
+
+
+def downsample_usage(
+    db_path: str = USAGE_DB,
+    *,
+    usage_days: float = USAGE_DAYS,
+    events_days: float = EVENTS_DAYS,
+    hourly_days: float = HOURLY_DAYS,
+    now: datetime | None = None,
+) -> dict[str, int]:
+    """Collapse old ``usage`` rows to hourly sums and prune covered rollup rows."""
+
+    # The budget window reads the newest 24 h of raw rows; rewritten rows must be
+    # well outside it or they would be counted again.
+    if usage_days < 2:
+        raise ValueError("usage_days must be at least 2")
+    conn = _connect(db_path)
+    try:
+        stats = {"usage_rows_removed": 0, "usage_rows_added": 0, "events_removed": 0, "hourly_removed": 0}
+        if not _has_table(conn, "usage"):
+            return stats
+        cutoff = _cutoff(usage_days, now)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Only hours that still hold more than one row – already-collapsed hours are skipped.
+            conn.execute("DROP TABLE IF EXISTS temp.usage_collapse")
+            conn.execute(
+                "CREATE TEMP TABLE usage_collapse AS "
+                "SELECT substr(ts, 1, 13) AS hour, SUM(prompt_tokens) AS p, SUM(completion_tokens) AS c, "
+                "SUM(cost_usd) AS cost FROM usage WHERE ts < ? GROUP BY hour HAVING COUNT(*) > 1",
+                (cutoff,),
+            )
+            stats["usage_rows_removed"] = conn.execute(
+                "DELETE FROM usage WHERE ts < ? AND substr(ts, 1, 13) IN (SELECT hour FROM usage_collapse)",
+                (cutoff,),
+            ).rowcount
+            stats["usage_rows_added"] = conn.execute(
+                "INSERT INTO usage (ts, prompt_tokens, completion_tokens, cost_usd) "
+                "SELECT hour || ':00:00', p, c, cost FROM usage_collapse"
+            ).rowcount
+            conn.execute("DROP TABLE usage_collapse")
+            # Per-response events are already folded into usage_hourly/usage_daily.
+            if _has_table(conn, "usage_events"):
+                stats["events_removed"] = conn.execute(
+                    "DELETE FROM usage_events WHERE ts < ?", (_cutoff(events_days, now),)
+                ).rowcount
+            if _has_table(conn, "usage_hourly"):
+                stats["hourly_removed"] = conn.execute(
+                    "DELETE FROM usage_hourly WHERE hour < ?", (_cutoff(hourly_days, now)[:13],)
+                ).rowcount
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return stats
+    finally:
+        conn.close()
+
+
+# ---------------------------------------------------------------------------
+# run_logs/*.sqlite3 (qa_log)
+# ---------------------------------------------------------------------------
+
+
+def archive_qa_logs(
+    logs_dir: str = RUN_LOGS_DIR,
+    archive_dir: str = ARCHIVE_DIR,
+    *,
+    days: float = QA_LOG_DAYS,
+    now: datetime | None = None,
+) -> dict[str, int]:
+    """Move ``qa_log`` rows older than ``days`` into ``<archive_dir>/qa_log/<domain>.ndjson.gz``."""
+
+    cutoff = _cutoff(days, now)
+    out_dir = os.path.join(archive_dir, "qa_log")
+    archived: dict[str, int] = {}
+    for db_path in sorted(glob.glob(os.path.join(logs_dir, "*.sqlite3"))):
+        domain = os.path.splitext(os.path.basename(db_path))[0]
+        conn = _connect(db_path)
+        try:
+            if not _has_table(conn, "qa_log"):
+                continue
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = conn.execute(
+                    "SELECT id, question, answer, timestamp FROM qa_log WHERE timestamp < ? ORDER BY id", (cutoff,)
+                ).fetchall()
+                if rows:
+                    os.makedirs(out_dir, exist_ok=True)
+                    # Appending adds a gzip member; readers see one continuous stream.
+                    with gzip.open(os.path.join(out_dir, f"{domain}.ndjson.gz"), "at", encoding="utf-8") as fp:
+                        for row_id, question, answer, ts in rows:
+                            fp.write(
+                                json.dumps({"id": row_id, "question": question, "answer": answer, "timestamp": ts})
+                                + "\n"
+                            )
+                    conn.execute("DELETE FROM qa_log WHERE id <= ? AND timestamp < ?", (rows[-1][0], cutoff))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            archived[domain] = len(rows)
+        finally:
+            conn.close()
+    return archived
+
+
+# ---------------------------------------------------------------------------
+# run_results/*.json
+# ---------------------------------------------------------------------------
+
+
+def _result_time(fname: str) -> datetime | None:
+    # persist_run_result names files "<%Y%m%dT%H%M%S%fZ>_<trace_id>.json".
+    try:
+        return datetime.strptime(fname.split("_", 1)[0], "%Y%m%dT%H%M%S%fZ")
+    except ValueError:
+        return None
+
+
+def pack_run_results(
+    results_dir: str = RUN_RESULTS_DIR,
+    *,
+    days: float = RESULTS_DAYS,
+    now: datetime | None = None,
+) -> dict[str, int]:
+    """Pack results older than ``days`` into ``archive/run_results-<YYYYMMDD>.ndjson.gz``.
+
+    A file is removed only after its line has been written; a crash in between
+    can at worst duplicate one result in the segment, never lose it.
+    """
+
+    cutoff = (now or datetime.utcnow()) - timedelta(days=days)
+    by_day: dict[str, list[str]] = {}
+    for path in sorted(glob.glob(os.path.join(results_dir, "*.json"))):
+        ts = _result_time(os.path.basename(path))
+        if ts is not None and ts < cutoff:
+            by_day.setdefault(ts.strftime("%Y%m%d"), []).append(path)
+
+    out_dir = os.path.join(results_dir, "archive")
+    packed: dict[str, int] = {}
+    for day, paths in by_day.items():
+        os.makedirs(out_dir, exist_ok=True)
+        with gzip.open(os.path.join(out_dir, f"run_results-{day}.ndjson.gz"), "at", encoding="utf-8") as fp:
+            for path in paths:
+                try:
+                    with open(path, encoding="utf-8") as src:
+                        result = json.load(src)
+                except (OSError, json.JSONDecodeError):
+                    logger.warning("skipping unreadable run result %s", path)
+                    continue
+                fp.write(json.dumps({"file": os.path.basename(path), "result": result}, ensure_ascii=False) + "\n")
+                fp.flush()
+                os.remove(path)
+                packed[day] = packed.get(day, 0) + 1
+    return packed
+
+
+# ---------------------------------------------------------------------------
+# Incremental VACUUM / ANALYZE
+# ---------------------------------------------------------------------------
+
+
+def maintain(db_path: str, *, pages: int = VACUUM_PAGES) -> dict[str, Any]:
+    """Free up to ``pages`` pages and refresh statistics where SQLite deems it useful."""
+
+    conn = _connect(db_path)
+    try:
+        converted = False
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            # One-off: switching to incremental auto-vacuum needs a full VACUUM.
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+            converted = True
+        free_before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        conn.execute(f"PRAGMA incremental_vacuum({int(pages)})").fetchall()
+        free_after = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        # Bounded ANALYZE: only tables whose stats are missing or stale, sampled.
+        conn.execute("PRAGMA analysis_limit = 1000")
+        conn.execute("PRAGMA optimize")
+        return {"converted": converted, "pages_freed": free_before - free_after, "free_pages": free_after}
+    finally:
+        conn.close()
+
+
+def run(
+    *,
+    usage_db: str = USAGE_DB,
+    logs_dir: str = RUN_LOGS_DIR,
+    results_dir: str = RUN_RESULTS_DIR,
+    archive_dir: str = ARCHIVE_DIR,
+    usage_days: float = USAGE_DAYS,
+    qa_days: float = QA_LOG_DAYS,
+    results_days: float = RESULTS_DAYS,
+    vacuum_pages: int = VACUUM_PAGES,
+) -> dict[str, Any]:
+    summary: dict[str, Any] = {}
+    if os.path.exists(usage_db):
+        summary["usage"] = downsample_usage(usage_db, usage_days=usage_days)
+    summary["qa_log_archived"] = archive_qa_logs(logs_dir, archive_dir, days=qa_days)
+    summary["run_results_packed"] = pack_run_results(results_dir, days=results_days)
+    run_index = os.path.join(results_dir, "index.sqlite3")
+    dbs = [db for db in (usage_db, run_index) if os.path.exists(db)]
+    dbs += sorted(glob.glob(os.path.join(logs_dir, "*.sqlite3")))
+    summary["maintenance"] = {os.path.basename(db): maintain(db, pages=vacuum_pages) for db in dbs}
+    return summary
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Downsample, archive and compact local usage / run-log data")
+    parser.add_argument("--usage-db", default=USAGE_DB)
+    parser.add_argument("--logs-dir", default=RUN_LOGS_DIR)
+    parser.add_argument("--results-dir", default=RUN_RESULTS_DIR)
+    parser.add_argument("--archive-dir", default=ARCHIVE_DIR)
+    parser.add_argument("--usage-days", type=float, default=USAGE_DAYS, help="Keep raw usage rows this long")
+    parser.add_argument("--qa-days", type=float, default=QA_LOG_DAYS, help="Keep qa_log rows this long")
+    parser.add_argument("--results-days", type=float, default=RESULTS_DAYS, help="Keep run result files this long")
+    parser.add_argument("--vacuum-pages", type=int, default=VACUUM_PAGES, help="Max pages freed per DB per run")
+    args = parser.parse_args(argv)
+
+    summary = run(
+        usage_db=args.usage_db,
+        logs_dir=args.logs_dir,
+        results_dir=args.results_dir,
+        archive_dir=args.archive_dir,
+        usage_days=args.usage_days,
+        qa_days=args.qa_days,
+        results_days=args.results_days,
+        vacuum_pages=args.vacuum_pages,
+    )
+    print(json.dumps(summary, indent=2))
+
+
+__all__ = [
+    "archive_qa_logs",
+    "downsample_usage",
+    "maintain",
+    "pack_run_results",
+    "run",
+]
+
+
+if __name__ == "__main__":
+    main()
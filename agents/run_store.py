@@ -0,0 +1,504 @@
+"""Append-only, segmented store for persisted run results.
+
+Runs are appended as one JSON line each to the active segment
+``segments/<opened-at>-<pid>.ndjson`` (one writer per process, so workers never
+interleave).  A segment is rotated once it exceeds ``RUN_STORE_SEGMENT_MB`` or
+``RUN_STORE_SEGMENT_SECONDS`` and is then compressed (``RUN_STORE_COMPRESSION``:
+``gzip`` (default), ``zstd`` if the ``zstandard`` package is installed, or
+``none``).  Offsets always refer to the uncompressed stream, so a location stays
+valid after compression.
+
+A SQLite sidecar ``index.sqlite3`` maps ``run_id`` to (segment, offset, length)
+and indexes trace id, timestamp, the specialist that answered, quality score
+and guardrail outcome, so ``RunStore.query`` never scans segments.  Records are
+immutable; later facts about a run (the judge score) are stored as annotations
+in the index.
+
+    python -m agents.run_store get <run_id>
+    python -m agents.run_store query --since 2025-05-01 --specialist parking --max-score 2
+    python -m agents.run_store import-legacy   # fold old per-run *.json files in
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import gzip
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, NamedTuple
+
+try:  # optional: better ratio and much faster than gzip
+    import zstandard
+except ImportError:  # pragma: no cover - depends on environment
+    zstandard = None
+
+from .serialization import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+RUN_STORE_DIR = os.getenv("RUN_STORE_DIR", os.path.join(os.path.dirname(__file__), "data", "run_results"))
+_SEGMENT_BYTES = int(float(os.getenv("RUN_STORE_SEGMENT_MB", "64")) * 1024 * 1024)
+_SEGMENT_SECONDS = float(os.getenv("RUN_STORE_SEGMENT_SECONDS", "3600"))
+_COMPRESSION = os.getenv("RUN_STORE_COMPRESSION", "gzip")
+
+_EXTENSIONS = {"gzip": ".gz", "zstd": ".zst", "none": ""}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    trace_id TEXT NOT NULL,
+    ts TEXT NOT NULL,
+    segment TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    quality_score INTEGER,
+    quality_status TEXT,
+    annotations TEXT,
+    specialist TEXT,
+    guardrail TEXT
+);
+"""
+
+# Columns added after the first release of the index; ALTERed into old files.
+_ADDED_COLUMNS = {"specialist": "TEXT", "guardrail": "TEXT"}
+
+_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_runs_trace ON runs(trace_id);
+CREATE INDEX IF NOT EXISTS idx_runs_ts ON runs(ts);
+CREATE INDEX IF NOT EXISTS idx_runs_status ON runs(quality_status);
+CREATE INDEX IF NOT EXISTS idx_runs_specialist ON runs(specialist, ts);
+CREATE INDEX IF NOT EXISTS idx_runs_guardrail ON runs(guardrail, ts);
+CREATE INDEX IF NOT EXISTS idx_runs_score ON runs(quality_score, ts);
+"""
+
+_SUMMARY_COLUMNS = "run_id, ts, trace_id, specialist, quality_score, quality_status, guardrail, segment, offset, length"
+
+
+class RunLocation(NamedTuple):
+    """Where a run lives; ``str()`` gives ``<segment>:<offset>``."""
+
+    run_id: str
+    segment: str
+    offset: int
+    length: int
+
+    def __str__(self) -> str:
+        return f"{self.segment}:{self.offset}"
+
+
+class RunSummary(NamedTuple):
+    """Index row for one run – everything ``query`` can filter on, without the record."""
+
+    run_id: str
+    ts: str
+    trace_id: str
+    specialist: str | None
+    quality_score: int | None
+    quality_status: str | None
+    guardrail: str | None
+    segment: str
+    offset: int
+    length: int
+
+    @property
+    def location(self) -> RunLocation:
+        return RunLocation(self.run_id, self.segment, self.offset, self.length)
+
+
+def _open_compressed(path: str, compression: str):
+    if compression == "zstd":
+        return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+    return gzip.open(path, "rb")
+
+
+# Segments this process has open for writing, across all RunStore instances.
+_OPEN_SEGMENTS: set[str] = set()
+
+
+def _segment_in_use(name: str) -> bool:
+    """Whether the writer of ``<opened-at>-<pid>.ndjson`` may still append to it."""
+
+    try:
+        pid = int(name[: -len(".ndjson")].rsplit("-", 1)[1])
+    except (IndexError, ValueError):
+        return True  # not ours to touch
+    if pid == os.getpid():
+        return name in _OPEN_SEGMENTS
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # alive, owned by another user
+    return True
+
+
+class RunStore:
+    """Process-local writer plus reader over all segments in ``root``."""
+
+    def __init__(
+        self,
+        root: str = RUN_STORE_DIR,
+        *,
+        max_segment_bytes: int = _SEGMENT_BYTES,
+        max_segment_seconds: float = _SEGMENT_SECONDS,
+        compression: str = _COMPRESSION,
+    ):
+        if compression not in _EXTENSIONS:
+            raise ValueError(f"unknown compression {compression!r}")
+        if compression == "zstd" and zstandard is None:
+            logger.warning("RUN_STORE_COMPRESSION=zstd but zstandard is not installed; using gzip")
+            compression = "gzip"
+        self.root = root
+        self.segments_dir = os.path.join(root, "segments")
+        os.makedirs(self.segments_dir, exist_ok=True)
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segment_seconds = max_segment_seconds
+        self.compression = compression
+        self._lock = threading.Lock()
+        self._fp = None
+        self._segment: str | None = None
+        self._opened_at = 0.0
+        self._index = sqlite3.connect(
+            os.path.join(root, "index.sqlite3"), timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self._index.execute("PRAGMA journal_mode=WAL")
+        self._index.executescript(_SCHEMA)
+        columns = {row[1] for row in self._index.execute("PRAGMA table_info(runs)")}
+        for column, decl in _ADDED_COLUMNS.items():
+            if column not in columns:
+                self._index.execute(f"ALTER TABLE runs ADD COLUMN {column} {decl}")
+        self._index.executescript(_INDEXES)
+
+    # -- writing ---------------------------------------------------------------
+
+    def _open_segment(self) -> None:
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+        self._segment = f"{stamp}-{os.getpid()}.ndjson"
+        self._fp = open(os.path.join(self.segments_dir, self._segment), "ab")
+        _OPEN_SEGMENTS.add(self._segment)
+        self._opened_at = time.monotonic()
+
+    def _should_rotate(self) -> bool:
+        return self._fp is not None and (
+            self._fp.tell() >= self.max_segment_bytes
+            or time.monotonic() - self._opened_at >= self.max_segment_seconds
+        )
+
+    def append(
+        self,
+        record: dict[str, Any],
+        *,
+        run_id: str,
+        trace_id: str,
+        ts: str,
+        quality_score: int | None = None,
+        quality_status: str | None = None,
+        specialist: str | None = None,
+        guardrail: str | None = None,
+    ) -> RunLocation:
+        """Append one run and index it. The line is written before the index row."""
+
+        line = dumps({"run_id": run_id, **record}) + b"\n"
+        with self._lock:
+            if self._should_rotate():
+                self._rotate_locked()
+            if self._fp is None:
+                self._open_segment()
+            offset = self._fp.tell()
+            self._fp.write(line)
+            self._fp.flush()
+            segment = self._segment
+        self._index.execute(
+            "INSERT OR REPLACE INTO runs (run_id, trace_id, ts, segment, offset, length, quality_score, quality_status, "
+            "specialist, guardrail) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (run_id, trace_id, ts, segment, offset, len(line), quality_score, quality_status, specialist, guardrail),
+        )
+        return RunLocation(run_id, segment, offset, len(line))
+
+    def annotate(self, run_id: str, **fields: Any) -> None:
+        """Attach facts learned after the run (e.g. the judge score) to its index row."""
+
+        with self._lock:  # read-modify-write of the annotations blob
+            row = self._index.execute("SELECT annotations FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+            if row is None:
+                raise KeyError(run_id)
+            annotations = {**json.loads(row[0] or "{}"), **fields}
+            sets, args = ["annotations = ?"], [json.dumps(annotations, ensure_ascii=False, default=str)]
+            for column in ("quality_score", "quality_status"):  # indexed copies
+                if column in fields:
+                    sets.append(f"{column} = ?")
+                    args.append(fields[column])
+            self._index.execute(f"UPDATE runs SET {', '.join(sets)} WHERE run_id = ?", (*args, run_id))
+
+    def _rotate_locked(self) -> None:
+        if self._fp is None:
+            return
+        self._fp.close()
+        self._fp = None
+        _OPEN_SEGMENTS.discard(self._segment)
+        self.compress(self._segment)
+        self._segment = None
+        self._compress_orphaned_segments()
+
+    def rotate(self) -> None:
+        """Close and compress the active segment (next append opens a new one)."""
+
+        with self._lock:
+            self._rotate_locked()
+
+    def compress(self, segment: str | None) -> None:
+        if segment is None or self.compression == "none":
+            return
+        src = os.path.join(self.segments_dir, segment)
+        dst = src + _EXTENSIONS[self.compression]
+        tmp = f"{dst}.{os.getpid()}.tmp"
+        try:
+            with open(src, "rb") as fin:
+                if self.compression == "zstd":
+                    with open(tmp, "wb") as fout:
+                        zstandard.ZstdCompressor(level=10).copy_stream(fin, fout)
+                else:
+                    with gzip.open(tmp, "wb", compresslevel=6) as fout:
+                        shutil.copyfileobj(fin, fout, 1 << 20)
+            os.replace(tmp, dst)
+            os.remove(src)
+        except FileNotFoundError:
+            # Another process compressed it first.
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def _compress_orphaned_segments(self) -> None:
+        # Segments left open by a crashed or restarted worker.  A live peer may be
+        # idle for hours, so only the writer's death makes a segment safe to compress.
+        for path in glob.glob(os.path.join(self.segments_dir, "*.ndjson")):
+            name = os.path.basename(path)
+            if not _segment_in_use(name):
+                self.compress(name)
+
+    def close(self) -> None:
+        """Close and compress the active segment, then the index."""
+
+        with self._lock:
+            self._rotate_locked()
+        self._index.close()
+
+    # -- reading ---------------------------------------------------------------
+
+    def read(self, segment: str, offset: int, length: int | None = None) -> dict[str, Any]:
+        base = os.path.join(self.segments_dir, segment)
+        # The segment may have been compressed since it was indexed.
+        for ext, compression in (("", "none"), (".zst", "zstd"), (".gz", "gzip")):
+            try:
+                if compression == "none":
+                    fp = open(base, "rb")
+                elif compression == "zstd" and zstandard is None:
+                    continue
+                else:
+                    fp = _open_compressed(base + ext, compression)
+            except FileNotFoundError:
+                continue
+            with fp:
+                fp.seek(offset)  # compressed streams decompress up to the offset
+                line = fp.read(length) if length else fp.readline()
+            return loads(line)
+        raise FileNotFoundError(base)
+
+    def get(self, run_id: str) -> dict[str, Any] | None:
+        """The stored record with its annotations applied, or None."""
+
+        row = self._index.execute(
+            "SELECT segment, offset, length, annotations FROM runs WHERE run_id = ?", (run_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        record = self.read(row[0], row[1], row[2])
+        return {**record, **json.loads(row[3] or "{}")}
+
+    def query(
+        self,
+        *,
+        trace_id: str | None = None,
+        since: str | None = None,
+        until: str | None = None,
+        statuses: set[str] | frozenset[str] | None = None,
+        specialist: str | None = None,
+        min_score: int | None = None,
+        max_score: int | None = None,
+        guardrail: str | None = None,
+        limit: int | None = None,
+    ) -> list[RunSummary]:
+        """Index-only lookup of runs matching every given filter (newest first).
+
+        ``since`` is inclusive and ``until`` exclusive (ISO timestamps or dates);
+        ``min_score`` / ``max_score`` skip runs without a score.
+        """
+
+        where, args = [], []
+        for clause, value in (
+            ("trace_id = ?", trace_id),
+            ("ts >= ?", since),
+            ("ts < ?", until),
+            ("specialist = ?", specialist),
+            ("quality_score >= ?", min_score),
+            ("quality_score <= ?", max_score),
+            ("guardrail = ?", guardrail),
+        ):
+            if value is not None:
+                where.append(clause)
+                args.append(value)
+        if statuses is not None:
+            where.append(f"quality_status IN ({','.join('?' * len(statuses))})")
+            args.extend(statuses)
+        sql = f"SELECT {_SUMMARY_COLUMNS} FROM runs"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY ts DESC"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        return [RunSummary(*row) for row in self._index.execute(sql, args).fetchall()]
+
+    def find(self, **filters: Any) -> list[RunLocation]:
+        """Locations of the runs ``query(**filters)`` returns."""
+
+        return [summary.location for summary in self.query(**filters)]
+
+    def reindex(self) -> int:
+        """Fill ``specialist`` / ``guardrail`` for runs indexed before those columns existed."""
+
+        rows = self._index.execute(
+            "SELECT run_id, segment, offset, length FROM runs WHERE specialist IS NULL"
+        ).fetchall()
+        n = 0
+        for run_id, segment, offset, length in rows:
+            try:
+                record = self.read(segment, offset, length)
+            except (OSError, ValueError):
+                logger.warning("cannot reindex unreadable run %s", run_id)
+                continue
+            specialist = record.get("specialist") or _last_agent_name(record)
+            if specialist is None:
+                continue
+            self._index.execute(
+                "UPDATE runs SET specialist = ?, guardrail = COALESCE(guardrail, ?) WHERE run_id = ?",
+                (specialist, record.get("guardrail"), run_id),
+            )
+            n += 1
+        return n
+
+
+def _last_agent_name(record: dict[str, Any]) -> str | None:
+    # Items store their agent as a name (or, in older records, as a full dict).
+    items = record.get("new_items") or []
+    agent = items[-1].get("agent") if items and isinstance(items[-1], dict) else None
+    return agent.get("name") if isinstance(agent, dict) else agent
+
+
+def import_legacy(store: RunStore, results_dir: str) -> int:
+    """Append old one-file-per-run ``*.json`` results to the store and delete them."""
+
+    n = 0
+    for path in sorted(glob.glob(os.path.join(results_dir, "*.json"))):
+        run_id = os.path.splitext(os.path.basename(path))[0]
+        with open(path) as fp:
+            record = json.load(fp)
+        stamp = run_id.split("_", 1)[0]
+        try:
+            ts = datetime.strptime(stamp, "%Y%m%dT%H%M%S%fZ").isoformat()
+        except ValueError:
+            ts = datetime.utcfromtimestamp(os.path.getmtime(path)).isoformat()
+        store.append(
+            record,
+            run_id=run_id,
+            trace_id=record.get("trace_id") or "notrace",
+            ts=ts,
+            quality_score=record.get("quality_score"),
+            quality_status=record.get("quality_status") or ("scored" if record.get("quality_score") else "failed"),
+            specialist=_last_agent_name(record),
+        )
+        os.remove(path)
+        n += 1
+    store.rotate()
+    return n
+
+
+_store: RunStore | None = None
+_store_lock = threading.Lock()
+
+
+def get_run_store() -> RunStore:
+    """Process-wide store (one active segment per process)."""
+
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = RunStore()
+        return _store
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Inspect the segmented run-result store")
+    parser.add_argument("--root", default=RUN_STORE_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+    get = sub.add_parser("get", help="Print one run by run_id")
+    get.add_argument("run_id")
+    query = sub.add_parser("query", help="List runs matching index filters as JSON lines")
+    query.add_argument("--trace-id")
+    query.add_argument("--since", help="ISO timestamp or date (inclusive)")
+    query.add_argument("--until", help="ISO timestamp or date (exclusive)")
+    query.add_argument("--specialist", help="Name of the agent that produced the final answer")
+    query.add_argument("--min-score", type=int)
+    query.add_argument("--max-score", type=int)
+    query.add_argument("--status", action="append", help="quality_status (repeatable)")
+    query.add_argument("--guardrail", choices=["passed", "flagged", "tripped"])
+    query.add_argument("--limit", type=int, default=50)
+    query.add_argument("--records", action="store_true", help="Print the full stored records")
+    sub.add_parser("import-legacy", help="Move old per-run *.json files into segments")
+    sub.add_parser("reindex", help="Index specialist/guardrail of runs stored before they were indexed")
+    args = parser.parse_args(argv)
+
+    store = RunStore(args.root)
+    try:
+        if args.command == "get":
+            print(json.dumps(store.get(args.run_id), indent=2, ensure_ascii=False))
+        elif args.command == "query":
+            summaries = store.query(
+                trace_id=args.trace_id,
+                since=args.since,
+                until=args.until,
+                statuses=set(args.status) if args.status else None,
+                specialist=args.specialist,
+                min_score=args.min_score,
+                max_score=args.max_score,
+                guardrail=args.guardrail,
+                limit=args.limit,
+            )
+            for summary in summaries:
+                row = store.get(summary.run_id) if args.records else summary._asdict()
+                print(json.dumps(row, ensure_ascii=False, default=str))
+        elif args.command == "reindex":
+            print(f"reindexed {store.reindex()} runs")
+        else:
+            print(f"imported {import_legacy(store, args.root)} runs")
+    finally:
+        store.close()
+
+
+__all__ = [
+    "RunLocation",
+    "RunStore",
+    "RunSummary",
+    "get_run_store",
+    "import_legacy",
+]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""Paraphrase lookup for the answer cache.
+
+The exact-match cache misses rewordings ("parking for a restaurant" / "how many
+spaces does a restaurant need").  ``SemanticIndex`` keeps one L2-normalised
+vector per cached question in a NumPy matrix and finds the closest earlier
+question with a single matrix-vector product, so a lookup over a few thousand
+entries takes well under a millisecond and needs no model or network.
+
+Questions are embedded offline by ``HashedNgramEmbedder``: word and character
+n-grams of the normalised question are hashed into a fixed number of signed
+buckets (the "hashing trick").  Tokens containing digits – district codes,
+section numbers, square footages – must match exactly: "setback in A1" and
+"setback in A2" are near-identical vectors but different answers.
+
+Each row is tagged with the specialist that answered it; a lookup may be
+restricted to one specialist and every specialist can have its own similarity
+threshold.
+
+The index lives in process memory and only holds questions cached by this
+process.  Rows point at exact-cache keys, so TTL expiry and version changes of
+the underlying ``AnswerCache`` apply to semantic hits as well.
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+import time
+import unicodedata
+import zlib
+from dataclasses import dataclass
+from typing import Iterable, Mapping
+
+import numpy as np
+
+_WORD = re.compile(r"[^\W_]+")
+
+# Function words carry little meaning for matching and inflate similarity
+# between unrelated questions that share phrasing ("what is the ... for a ...").
+_STOPWORDS = frozenset(
+    "a an and are as at be by can could do does for from i if in is it its me my of on or our should "
+    "that the there this to under we what when where which who will with would you your".split()
+)
+
+
+class HashedNgramEmbedder:
+    """Deterministic bag of hashed word and character n-grams.
+
+    ``dim`` buckets; character n-grams of lengths ``char_ngrams`` are taken from
+    each padded word so that inflections ("space" / "spaces") still overlap.
+    """
+
+    def __init__(self, dim: int = 512, char_ngrams: tuple[int, int] = (3, 5)):
+        self.dim = dim
+        self.char_ngrams = char_ngrams
+
+    @staticmethod
+    def _words(question: str) -> list[str]:
+        text = unicodedata.normalize("NFKC", question).casefold()
+        return [w for w in _WORD.findall(text) if w not in _STOPWORDS]
+
+    def signature(self, question: str) -> int:
+        """Hash of the question's tokens that contain digits (0 if there are none)."""
+
+        codes = sorted({w for w in self._words(question) if any(c.isdigit() for c in w)})
+        return zlib.crc32("|".join(codes).encode()) if codes else 0
+
+    def _features(self, question: str) -> Iterable[str]:
+        lo, hi = self.char_ngrams
+        words = self._words(question)
+        for word in words:
+            yield "w:" + word
+            padded = f" {word} "
+            for n in range(lo, hi + 1):
+                for i in range(len(padded) - n + 1):
+                    yield padded[i : i + n]
+        for left, right in zip(words, words[1:]):
+            yield f"b:{left} {right}"
+
+    def embed(self, question: str) -> np.ndarray:
+        """Unit-length float32 vector (all zeros if nothing is left to embed)."""
+
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for feature in self._features(question):
+            h = zlib.crc32(feature.encode())
+            vec[h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        norm = float(np.linalg.norm(vec))
+        return vec / norm if norm else vec
+
+
+@dataclass(frozen=True)
+class SemanticMatch:
+    key: str
+    question: str
+    specialist: str | None
+    similarity: float
+
+
+class SemanticIndex:
+    """Fixed-capacity matrix of question vectors with nearest-neighbour lookup.
+
+    ``threshold`` is the minimum cosine similarity for a match; ``thresholds``
+    overrides it per specialist.  When full, the oldest row is overwritten.
+    """
+
+    def __init__(
+        self,
+        *,
+        capacity: int,
+        threshold: float,
+        thresholds: Mapping[str, float] | None = None,
+        embedder: HashedNgramEmbedder | None = None,
+    ):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.embedder = embedder or HashedNgramEmbedder()
+        self.capacity = capacity
+        self.threshold = threshold
+        self.thresholds = dict(thresholds or {})
+        self._vectors = np.zeros((capacity, self.embedder.dim), dtype=np.float32)
+        self._expires = np.zeros(capacity, dtype=np.float64)  # monotonic; 0 = empty row
+        self._scopes = np.full(capacity, -1, dtype=np.int32)
+        self._signatures = np.zeros(capacity, dtype=np.int64)
+        self._row_threshold = np.full(capacity, np.inf, dtype=np.float32)
+        self._keys: list[str | None] = [None] * capacity
+        self._questions: list[str | None] = [None] * capacity
+        self._rows: dict[str, int] = {}  # key -> row
+        self._scope_ids: dict[str | None, int] = {}
+        self._scope_names: list[str | None] = []
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self._expires > time.monotonic()))
+
+    def _scope_id(self, specialist: str | None) -> int:
+        sid = self._scope_ids.get(specialist)
+        if sid is None:
+            sid = self._scope_ids[specialist] = len(self._scope_names)
+            self._scope_names.append(specialist)
+        return sid
+
+    def add(self, key: str, question: str, *, specialist: str | None = None, ttl: float) -> None:
+        vec = self.embedder.embed(question)
+        with self._lock:
+            row = self._rows.get(key)
+            if row is None:
+                row = self._next
+                self._next = (self._next + 1) % self.capacity
+                old = self._keys[row]
+                if old is not None:
+                    del self._rows[old]
+                self._rows[key] = row
+            self._vectors[row] = vec
+            self._expires[row] = time.monotonic() + ttl
+            self._scopes[row] = self._scope_id(specialist)
+            self._signatures[row] = self.embedder.signature(question)
+            self._row_threshold[row] = self.thresholds.get(specialist, self.threshold)
+            self._keys[row] = key
+            self._questions[row] = question
+
+    def search(self, question: str, *, specialist: str | None = None) -> SemanticMatch | None:
+        """Most similar live question above its threshold, optionally within one specialist."""
+
+        vec = self.embedder.embed(question)
+        if not vec.any():
+            return None
+        signature = self.embedder.signature(question)
+        with self._lock:
+            scores = self._vectors @ vec
+            eligible = (scores >= self._row_threshold) & (self._signatures == signature)
+            eligible &= self._expires > time.monotonic()
+            if specialist is not None:
+                sid = self._scope_ids.get(specialist)
+                if sid is None:
+                    return None
+                eligible &= self._scopes == sid
+            if not eligible.any():
+                return None
+            row = int(np.argmax(np.where(eligible, scores, -np.inf)))
+            return SemanticMatch(
+                key=self._keys[row],
+                question=self._questions[row],
+                specialist=self._scope_names[self._scopes[row]],
+                similarity=float(scores[row]),
+            )
+
+
+__all__ = [
+    "HashedNgramEmbedder",
+    "SemanticIndex",
+    "SemanticMatch",
+]
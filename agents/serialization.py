@@ -0,0 +1,133 @@
+"""Fast conversion of run results to JSON.
+
+``to_primitive`` turns SDK objects into JSON-ready primitives with one encoder
+per type, resolved once per class and cached:
+
+* dataclasses are walked field by field (no ``dataclasses.asdict`` deep copy);
+* pydantic models (the OpenAI response items) use ``model_dump(mode="json")``;
+* types registered with ``register`` – e.g. ``Agent`` → its name, so a run item
+  does not drag the whole agent graph (tools, handoffs, instructions) along.
+
+``dumps`` / ``loads`` use ``orjson`` when it is installed and fall back to the
+standard library; both produce compact UTF-8 JSON.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import enum
+import json
+from collections.abc import Mapping
+from datetime import date, datetime
+from typing import Any, Callable, Iterable
+
+try:  # optional: several times faster than json for large payloads
+    import orjson
+except ImportError:  # pragma: no cover - depends on environment
+    orjson = None
+
+Encoder = Callable[[Any], Any]
+
+_PRIMITIVES = (str, int, float, bool, type(None))
+_REGISTERED: dict[type, Encoder] = {}
+_RESOLVED: dict[type, Encoder] = {}
+
+
+def register(cls: type, encoder: Encoder) -> None:
+    """Encode instances of ``cls`` (and subclasses) with ``encoder``."""
+
+    _REGISTERED[cls] = encoder
+    _RESOLVED.clear()
+
+
+def _identity(obj: Any) -> Any:
+    return obj
+
+
+def _encode_sequence(obj: Iterable[Any]) -> list[Any]:
+    return [to_primitive(v) for v in obj]
+
+
+def _encode_mapping(obj: Mapping[Any, Any]) -> dict[Any, Any]:
+    return {k if isinstance(k, str) else str(k): to_primitive(v) for k, v in obj.items()}
+
+
+def _encode_dataclass(obj: Any) -> dict[str, Any]:
+    return {f.name: to_primitive(getattr(obj, f.name)) for f in dataclasses.fields(obj)}
+
+
+def _encode_pydantic(obj: Any) -> Any:
+    return obj.model_dump(mode="json", exclude_none=True)
+
+
+def _encode_enum(obj: enum.Enum) -> Any:
+    return to_primitive(obj.value)
+
+
+def _encode_datetime(obj: date) -> str:
+    return obj.isoformat()
+
+
+def _resolve(cls: type) -> Encoder:
+    for base in cls.__mro__:
+        if base in _REGISTERED:
+            return _REGISTERED[base]
+    if issubclass(cls, _PRIMITIVES):
+        return _identity
+    if issubclass(cls, enum.Enum):
+        return _encode_enum
+    if issubclass(cls, (list, tuple, set, frozenset)):
+        return _encode_sequence
+    if issubclass(cls, Mapping):
+        return _encode_mapping
+    if issubclass(cls, (datetime, date)):
+        return _encode_datetime
+    if dataclasses.is_dataclass(cls):
+        return _encode_dataclass
+    if callable(getattr(cls, "model_dump", None)):
+        return _encode_pydantic
+    return str
+
+
+def to_primitive(obj: Any) -> Any:  # noqa: ANN401 – needs Any for recursion
+    """Convert ``obj`` to dicts, lists and scalars."""
+
+    cls = type(obj)
+    encoder = _RESOLVED.get(cls)
+    if encoder is None:
+        encoder = _RESOLVED[cls] = _resolve(cls)
+    return encoder(obj)
+
+
+def select(obj: Any, exclude: Iterable[str]) -> dict[str, Any]:
+    """Encode a dataclass or pydantic model, leaving out the ``exclude`` fields."""
+
+    skip = set(exclude)
+    if dataclasses.is_dataclass(obj):
+        return {f.name: to_primitive(getattr(obj, f.name)) for f in dataclasses.fields(obj) if f.name not in skip}
+    if callable(getattr(obj, "model_dump", None)):
+        return obj.model_dump(mode="json", exclude_none=True, exclude=skip)
+    if isinstance(obj, Mapping):
+        return {k: v for k, v in _encode_mapping(obj).items() if k not in skip}
+    raise TypeError(f"cannot select fields of {type(obj).__name__}")
+
+
+def dumps(obj: Any) -> bytes:
+    """Compact UTF-8 JSON; values the backend cannot encode become ``str(value)``."""
+
+    if orjson is not None:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=str).encode()
+
+
+def loads(data: bytes | str) -> Any:
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+__all__ = [
+    "dumps",
+    "loads",
+    "register",
+    "select",
+    "to_primitive",
+]
@@ -27,17 +27,13 @@ fi
 echo "Installing required dependencies..."
 $PYTHON -m pip install -r requirements.txt
 
-# Make scripts executable
-chmod +x ebr_zoning_cli.py
-chmod +x ebr_zoning_web.py
-
 echo "Setup complete!"
 echo ""
-echo "To run the CLI interface:"
-echo "  ./ebr_zoning_cli.py -i"
+echo "To run the CLI interface (from the repository root):"
+echo "  python -m agents.ebr_zoning_cli -i"
 echo ""
-echo "To run the web interface:"
-echo "  ./ebr_zoning_web.py"
+echo "To run the web interface (from the repository root):"
+echo "  python -m agents.ebr_zoning_web"
 echo ""
 echo "Remember to set your OpenAI API key if you haven't already:"
 echo "  export OPENAI_API_KEY=your_api_key_here"
\ No newline at end of file
@@ -0,0 +1,104 @@
+"""In-memory rolling spend total for the daily budget check.
+
+Spend is kept as per-minute sums in a ring buffer covering the window, plus a
+running total, so ``total()`` is O(1) and advancing time touches at most one
+bucket per elapsed minute.  The window is seeded from the ``usage`` table at
+startup and then follows new rows by ``rowid``, which also picks up spend logged
+by other worker processes sharing the same SQLite file.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+
+def _epoch(ts: str) -> float:
+    # usage.ts is a naive UTC ISO-8601 string (datetime.utcnow().isoformat()).
+    return datetime.fromisoformat(ts).replace(tzinfo=timezone.utc).timestamp()
+
+
+class SpendWindow:
+    """Sum of costs over the trailing ``window_seconds``, bucketed by ``bucket_seconds``."""
+
+    def __init__(self, window_seconds: int = 86400, bucket_seconds: int = 60):
+        self.bucket_seconds = bucket_seconds
+        # One extra bucket so the partially elapsed oldest minute is never dropped
+        # early – the window errs on covering slightly more than 24 h, not less.
+        self._n = -(-window_seconds // bucket_seconds) + 1
+        self._buckets = [0.0] * self._n
+        self._head: int | None = None  # absolute index of the newest bucket
+        self._total = 0.0
+        self._lock = threading.Lock()
+        self.last_rowid = 0
+
+    def _advance(self, bucket: int) -> None:
+        if self._head is None or bucket - self._head >= self._n:
+            self._buckets = [0.0] * self._n
+            self._total = 0.0
+        else:
+            for b in range(self._head + 1, bucket + 1):
+                i = b % self._n
+                self._total -= self._buckets[i]
+                self._buckets[i] = 0.0
+        self._head = bucket
+
+    def add(self, cost: float, ts: float | None = None) -> None:
+        ts = time.time() if ts is None else ts
+        bucket = int(ts // self.bucket_seconds)
+        with self._lock:
+            if self._head is None or bucket > self._head:
+                self._advance(bucket)
+            if bucket <= self._head - self._n:
+                return  # older than the window
+            self._buckets[bucket % self._n] += cost
+            self._total += cost
+
+    def total(self, now: float | None = None) -> float:
+        now = time.time() if now is None else now
+        with self._lock:
+            bucket = int(now // self.bucket_seconds)
+            if self._head is None or bucket > self._head:
+                self._advance(bucket)
+            return max(self._total, 0.0)
+
+    # -- SQLite integration ----------------------------------------------------
+
+    def seed(self, conn: sqlite3.Connection, now: float | None = None) -> None:
+        """Load the trailing window from ``usage`` (one indexed, grouped range scan)."""
+
+        now = time.time() if now is None else now
+        window = timedelta(seconds=self._n * self.bucket_seconds)
+        since = (datetime.fromtimestamp(now, timezone.utc).replace(tzinfo=None) - window).isoformat()
+        with self._lock:
+            self._head = None
+            self._advance(int(now // self.bucket_seconds))
+        # Both statements in one read transaction so last_rowid matches the sums.
+        conn.execute("BEGIN")
+        try:
+            rows = conn.execute(
+                "SELECT substr(ts, 1, 16) AS minute, SUM(cost_usd) FROM usage WHERE ts >= ? GROUP BY minute",
+                (since,),
+            ).fetchall()
+            max_rowid = conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM usage").fetchone()[0]
+        finally:
+            conn.execute("COMMIT")
+        for minute, cost in rows:
+            self.add(cost or 0.0, _epoch(minute))
+        self.last_rowid = max_rowid
+
+    def sync(self, conn: sqlite3.Connection) -> int:
+        """Apply rows inserted since the last seed/sync (by any process). Returns the count."""
+
+        rows = conn.execute(
+            "SELECT rowid, ts, cost_usd FROM usage WHERE rowid > ? ORDER BY rowid", (self.last_rowid,)
+        ).fetchall()
+        for rowid, ts, cost in rows:
+            self.add(cost, _epoch(ts))
+            self.last_rowid = rowid
+        return len(rows)
+
+
+__all__ = ["SpendWindow"]
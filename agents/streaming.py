@@ -0,0 +1,130 @@
+"""Server-Sent Events for streamed runs.
+
+``run_events`` turns the SDK's stream of a ``Runner.run_streamed`` result into
+a few client-facing events:
+
+* ``handoff`` – ``{"from": ..., "to": ...}`` when the orchestrator hands off;
+* ``tool`` – ``{"agent": ..., "name": ...}`` when an agent calls a tool;
+* ``delta`` – ``{"text": ...}`` partial answer text as the model produces it.
+
+Specialists answer with structured output (``AnswerWithCitations`` JSON), so
+``AnswerTextStream`` decodes just the ``answer`` string out of the partial JSON
+and the client never sees braces or escapes.  The final ``answer`` / ``error``
+events are sent by the endpoint once the run (and its guardrails) completed.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from typing import Any, AsyncIterator
+
+from .serialization import dumps
+
+
+class AnswerTextStream:
+    """Incrementally extracts one string field from streamed JSON output.
+
+    Output that does not start with ``{`` is plain text and passed through.
+    """
+
+    def __init__(self, field: str = "answer"):
+        self._start = re.compile(rf'"{re.escape(field)}"\s*:\s*"')
+        self.reset()
+
+    def reset(self) -> None:
+        """Start over for a new model response."""
+
+        self._buf = ""
+        self._pos: int | None = None  # next undecoded char of the field's value
+        self._plain: bool | None = None
+        self._done = False
+
+    def feed(self, delta: str) -> str:
+        """Add a chunk of model output; returns the newly decoded field text."""
+
+        if self._done:
+            return ""
+        self._buf += delta
+        if self._plain is None:
+            head = self._buf.lstrip()
+            if not head:
+                return ""
+            self._plain = not head.startswith("{")
+            if self._plain:
+                return self._buf
+        if self._plain:
+            return delta
+        if self._pos is None:
+            match = self._start.search(self._buf)
+            if match is None:
+                return ""
+            self._pos = match.end()
+        return self._decode()
+
+    def _decode(self) -> str:
+        out = []
+        buf, i = self._buf, self._pos
+        while i < len(buf):
+            ch = buf[i]
+            if ch == '"':
+                self._done = True
+                break
+            if ch != "\\":
+                out.append(ch)
+                i += 1
+                continue
+            # Escape sequence: wait for all of it before decoding.
+            width = 6 if buf[i + 1 : i + 2] == "u" else 2
+            if buf[i + 1 : i + 4].lower() in ("ud8", "ud9", "uda", "udb"):
+                width = 12  # high surrogate, decoded together with its low half
+            if i + width > len(buf):
+                break
+            out.append(json.loads(f'"{buf[i : i + width]}"'))
+            i += width
+        self._pos = i
+        return "".join(out)
+
+
+def format_sse(event: str, data: Any) -> bytes:
+    """One SSE message; the JSON payload never contains a raw newline."""
+
+    return b"event: " + event.encode() + b"\ndata: " + dumps(data) + b"\n\n"
+
+
+async def run_events(result: Any) -> AsyncIterator[tuple[str, dict[str, Any]]]:
+    """Translate ``result.stream_events()`` into (event, data) pairs.
+
+    Exceptions raised by the run – including guardrail tripwires, which the SDK
+    raises once the stream ends – propagate to the caller.
+    """
+
+    text = AnswerTextStream()
+    agent = result.current_agent.name
+    async for event in result.stream_events():
+        if event.type == "raw_response_event":
+            data = event.data
+            if data.type == "response.created":
+                text.reset()
+            elif data.type == "response.output_text.delta":
+                chunk = text.feed(data.delta)
+                if chunk:
+                    yield "delta", {"text": chunk}
+        elif event.type == "agent_updated_stream_event":
+            if event.new_agent.name != agent:
+                yield "handoff", {"from": agent, "to": event.new_agent.name}
+                agent = event.new_agent.name
+        elif event.type == "run_item_stream_event" and event.name == "tool_called":
+            raw = event.item.raw_item
+            if isinstance(raw, dict):
+                name = raw.get("name") or raw.get("type")
+            else:  # hosted tools (file search, web search) have no name, only a type
+                name = getattr(raw, "name", None) or getattr(raw, "type", None)
+            yield "tool", {"agent": agent, "name": name}
+
+
+__all__ = [
+    "AnswerTextStream",
+    "format_sse",
+    "run_events",
+]
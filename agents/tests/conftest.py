@@ -0,0 +1,71 @@
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+_ID_PATTERN = re.compile(r"'((?:[^']|'')*)'")
+
+
+class _MockGIS:
+    """Minimal stand-in for the EBR GIS ``/query`` endpoint."""
+
+    def __init__(self, parcels: dict[str, str]):
+        self.parcels = parcels
+        self.requests: list[str] = []
+        self.delay = 0.0
+
+    def respond(self, where: str) -> dict:
+        ids = [m.replace("''", "'") for m in _ID_PATTERN.findall(where)]
+        features = [
+            {"attributes": {"PARCEL_ID": pid, "ZONING": self.parcels[pid]}}
+            for pid in ids
+            if pid in self.parcels
+        ]
+        return {"features": features}
+
+
+@pytest.fixture
+def mock_gis(monkeypatch):
+    """Run a local GIS server and point ``EBR_GIS_PARCEL_ENDPOINT`` at it."""
+
+    gis = _MockGIS({"0101": "C2", "0202": "A1", "0303": "M1"})
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):  # noqa: N802
+            where = parse_qs(urlparse(self.path).query).get("where", [""])[0]
+            gis.requests.append(where)
+            if gis.delay:
+                threading.Event().wait(gis.delay)
+            body = json.dumps(gis.respond(where)).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):  # silence test output
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setenv("EBR_GIS_PARCEL_ENDPOINT", f"http://127.0.0.1:{server.server_port}/query")
+    yield gis
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def run_store(tmp_path, monkeypatch):
+    """A RunStore under tmp_path wired in as the process-wide store."""
+
+    from agents import persistence
+    from agents.run_store import RunStore
+
+    store = RunStore(str(tmp_path / "run_results"))
+    monkeypatch.setattr(persistence, "get_run_store", lambda: store)
+    yield store
+    store.close()
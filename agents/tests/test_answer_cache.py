@@ -0,0 +1,86 @@
+from dataclasses import dataclass, field
+from typing import Any
+
+import pytest
+
+from agents import answer_cache
+from agents.answer_cache import AnswerCache, LocalBackend, RedisBackend, agent_fingerprint, cache_version, normalize_question
+from agents.pdf_text_store import file_sha256
+from agents.structures import AnswerWithCitations, Citation
+
+
+@dataclass
+class _Tool:
+    name: str
+    vector_store_ids: list[str] = field(default_factory=list)
+    on_invoke: Any = None
+
+
+@dataclass
+class _Agent:
+    name: str
+    instructions: str
+    model: str = "gpt-4o-mini"
+    tools: list[Any] = field(default_factory=list)
+    handoffs: list[Any] = field(default_factory=list)
+
+
+def _orchestrator(instructions: str = "Answer parking questions.") -> _Agent:
+    specialist = _Agent("parking", instructions, tools=[_Tool("file_search", ["vs_1"], on_invoke=lambda: None)])
+    orchestrator = _Agent("orchestrator", "Route.", handoffs=[specialist])
+    specialist.handoffs = [orchestrator]  # cycles must not recurse forever
+    return orchestrator
+
+
+def test_normalize_question():
+    assert normalize_question("What is the front setback in A1?") == "what is the front setback in a1"
+    assert normalize_question("  what is the FRONT setback   in A1 ") == "what is the front setback in a1"
+    assert normalize_question("Explain §17.3.B.") == "explain §17.3.b"
+
+
+def test_version_tracks_agent_config_and_ordinance(tmp_path, monkeypatch):
+    monkeypatch.setattr(answer_cache, "pdf_sha256", file_sha256)  # no stamp files in the data dir
+    pdf = tmp_path / "zoning.pdf"
+    pdf.write_bytes(b"%PDF v1")
+
+    base = cache_version(_orchestrator(), str(pdf))
+    assert cache_version(_orchestrator(), str(pdf)) == base  # deterministic across instances
+    assert agent_fingerprint(_orchestrator())["handoffs"][0]["handoffs"] == [{"name": "orchestrator"}]
+    assert cache_version(_orchestrator("Answer parking questions briefly."), str(pdf)) != base
+    assert cache_version(_orchestrator(), str(pdf), salt="vs-reindexed") != base
+
+    pdf.write_bytes(b"%PDF v2 amended")
+    assert cache_version(_orchestrator(), str(pdf)) != base
+
+
+def test_hit_after_put_and_version_isolation():
+    backend = LocalBackend(maxsize=10)
+    cache = AnswerCache(backend, version="v1", ttl_seconds=60)
+    answer = AnswerWithCitations("15 ft", [Citation("§8.2", "41")])
+
+    assert cache.get("front setback in A1?") is None
+    cache.put("Front setback in A1", answer, run_id="r1", run_result_path="seg:0")
+    hit = cache.get("front setback in a1?")
+    assert hit["answer"] == {"answer": "15 ft", "citations": [{"section": "§8.2", "page": "41"}]}
+    assert hit["run_id"] == "r1"
+    assert AnswerCache(backend, version="v2").get("front setback in A1") is None
+
+
+def test_redis_backend_expires_entries():
+    fakeredis = pytest.importorskip("fakeredis")
+    client = fakeredis.FakeRedis()
+    cache = AnswerCache(RedisBackend(client), version="v1", ttl_seconds=30)
+
+    cache.put("q", "a")
+    assert cache.get("Q?")["answer"] == "a"
+    assert 0 < client.ttl(f"answer:{cache.key('q')}") <= 30
+
+
+def test_similarity_by_specialist_is_read_when_the_cache_is_built(monkeypatch, caplog):
+    monkeypatch.setenv("ANSWER_CACHE_SIMILARITY_BY_SPECIALIST", '{"EBR Definitions Specialist": 0.9}')
+    assert answer_cache._similarity_by_specialist() == {"EBR Definitions Specialist": 0.9}
+
+    for raw in ('{"EBR Definitions Specialist": 0.9', '["EBR Definitions Specialist"]', '{"x": "high"}'):
+        monkeypatch.setenv("ANSWER_CACHE_SIMILARITY_BY_SPECIALIST", raw)
+        assert answer_cache._similarity_by_specialist() == {}
+    assert "malformed ANSWER_CACHE_SIMILARITY_BY_SPECIALIST" in caplog.text
@@ -0,0 +1,63 @@
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import pytest
+
+from agents import api
+from agents.run_store import RunLocation
+from agents.usage_monitor import BudgetExceededError
+
+
+@pytest.fixture
+def fake_runs(monkeypatch):
+    calls = {"reservations": set(), "in_flight": 0, "max_in_flight": 0}
+
+    async def run_with_budget(*, starting_agent, input, reservation=None):
+        calls["reservations"].add(reservation)
+        calls["in_flight"] += 1
+        calls["max_in_flight"] = max(calls["max_in_flight"], calls["in_flight"])
+        try:
+            await asyncio.sleep(0.01 * (5 - int(input[1:])))  # later questions finish first
+            if input == "q2":
+                raise BudgetExceededError("over budget")
+            return SimpleNamespace(final_output={"answer": input.upper(), "citations": []})
+        finally:
+            calls["in_flight"] -= 1
+
+    async def persist(question, result, **kwargs):
+        return RunLocation(f"run-{question}", "seg.ndjson", 0, 1)
+
+    @asynccontextmanager
+    async def batch_reservation(inputs):
+        yield "shared"
+
+    monkeypatch.setattr(api, "run_with_budget", run_with_budget)
+    monkeypatch.setattr(api, "_persist", persist)
+    monkeypatch.setattr(api, "batch_reservation", batch_reservation)
+    monkeypatch.setattr(api, "get_answer_cache", lambda agent: None)
+    monkeypatch.setattr(api, "_BATCH_CONCURRENCY", 2)
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_batch_returns_results_in_order_despite_failures(fake_runs):
+    resp = await api.ask_batch(api.AskBatchRequest(questions=[f"q{i}" for i in range(5)]))
+
+    assert [item.index for item in resp.results] == [0, 1, 2, 3, 4]
+    assert resp.results[2].answer is None
+    assert resp.results[2].error["type"] == "budget_exceeded"
+    assert [item.answer["answer"] for item in resp.results if item.error is None] == ["Q0", "Q1", "Q3", "Q4"]
+    assert resp.results[4].run_id == "run-q4"
+    assert fake_runs["reservations"] == {"shared"}
+    assert fake_runs["max_in_flight"] == 2
+
+
+@pytest.mark.asyncio
+async def test_batch_streams_ndjson_as_items_finish(fake_runs):
+    resp = await api.ask_batch(api.AskBatchRequest(questions=["q0", "q3", "q4"], stream=True))
+    lines = [json.loads(chunk) async for chunk in resp.body_iterator]
+
+    assert resp.media_type == "application/x-ndjson"
+    assert [line["index"] for line in lines] == [1, 2, 0]
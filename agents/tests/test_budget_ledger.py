@@ -0,0 +1,83 @@
+import threading
+import time
+
+import pytest
+
+from agents.budget_ledger import BudgetExceededError, SQLiteLedger
+from agents.cost_attribution import UsageEvent, price, rollup
+
+
+def test_concurrent_reservations_cannot_overshoot(tmp_path):
+    db = tmp_path / "usage.sqlite3"
+    SQLiteLedger(db, 1.0).close()
+    granted, rejected = [], []
+
+    def worker():
+        # One ledger per thread stands in for one uvicorn worker process.
+        ledger = SQLiteLedger(db, 1.0)
+        try:
+            granted.append(ledger.reserve(0.1))
+        except BudgetExceededError:
+            rejected.append(1)
+        finally:
+            ledger.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(30)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(granted) == 10
+    assert len(rejected) == 20
+
+
+def test_commit_records_actual_spend_and_release_frees_the_rest(tmp_path):
+    ledger = SQLiteLedger(tmp_path / "usage.sqlite3", 1.0)
+    res = ledger.reserve(0.9)
+    with pytest.raises(BudgetExceededError):
+        ledger.reserve(0.2)
+
+    ledger.commit(res, 1000, 500, 0.3)
+    ledger.release(res)
+
+    assert ledger.spent() == pytest.approx(0.3)
+    ledger.reserve(0.7)
+    with pytest.raises(BudgetExceededError):
+        ledger.reserve(0.01)
+    ledger.close()
+
+
+def test_extended_reservation_outlives_its_ttl(tmp_path):
+    ledger = SQLiteLedger(tmp_path / "usage.sqlite3", 1.0, reservation_ttl=0.2)
+    res = ledger.reserve(0.9)
+    for _ in range(3):
+        time.sleep(0.1)
+        assert ledger.extend(res)
+    with pytest.raises(BudgetExceededError):
+        ledger.reserve(0.2)  # still held 0.3 s in
+
+    time.sleep(0.25)
+    assert not ledger.extend(res)  # lapsed; not revived
+    ledger.reserve(0.9)
+    ledger.close()
+
+
+def test_events_are_priced_per_model_and_rolled_up(tmp_path):
+    ledger = SQLiteLedger(tmp_path / "usage.sqlite3", 10.0)
+    ts = "2025-05-01T10:15:00"
+    events = [
+        UsageEvent("Orchestrator", "gpt-4o-mini", 1000, 100, price("gpt-4o-mini", 1000, 100), ts),
+        UsageEvent("Parking", "gpt-4.1-mini-2025-04-14", 2000, 300, price("gpt-4.1-mini", 2000, 300), ts),
+        UsageEvent("Parking", "gpt-4.1-mini-2025-04-14", 500, 50, price("gpt-4.1-mini", 500, 50), ts),
+    ]
+    ledger.commit(None, 3500, 450, sum(e.cost_usd for e in events), events)
+    ledger.commit(None, 1000, 100, events[0].cost_usd, events[:1])
+
+    daily = {r["agent"]: r for r in rollup(ledger._conn, "daily")}
+    assert daily["Parking"]["responses"] == 2
+    assert daily["Parking"]["prompt_tokens"] == 2500
+    assert daily["Parking"]["cost_usd"] == pytest.approx((2500 * 0.0004 + 350 * 0.0016) / 1000)
+    assert daily["Orchestrator"]["responses"] == 2
+    assert [r["hour"] for r in rollup(ledger._conn, "hourly")] == ["2025-05-01T10", "2025-05-01T10"]
+    ledger.close()
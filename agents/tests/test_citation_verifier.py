@@ -0,0 +1,50 @@
+import pytest
+
+from agents import citation_verifier as cv_mod
+from agents.citation_verifier import normalize_section, verify_citations
+from agents.structures import AnswerWithCitations, Citation
+
+_PAGES = [
+    "Chapter 8 Zoning Districts",
+    "Sec. 8.5.2 Front setbacks in A1 are 25 feet.",
+    "§ 17 Parking and Loading. See also 17.3.B.",
+]
+
+
+@pytest.fixture(autouse=True)
+def _fake_pdf(monkeypatch):
+    cv_mod._section_index.cache_clear()
+    monkeypatch.setattr(cv_mod, "_load_pdf_text", lambda: _PAGES)
+    yield
+    cv_mod._section_index.cache_clear()
+
+
+def test_normalize_section_variants():
+    assert normalize_section("§8.5.2") == "8.5.2"
+    assert normalize_section("Sec. 8.5.2") == "8.5.2"
+    assert normalize_section("8.5.2") == "8.5.2"
+    assert normalize_section("Setbacks") is None
+    assert normalize_section("§ 17") == "17"
+    assert normalize_section("Chapter 8") is None  # bare integer without a § / Sec. prefix
+
+
+@pytest.mark.asyncio
+async def test_verify_citations_passes_normalized_section():
+    payload = AnswerWithCitations(answer="ok", citations=[Citation(section="§8.5.2", page="2")])
+    out = await verify_citations.guardrail_function(None, None, payload)  # type: ignore[arg-type]
+    assert not out.tripwire_triggered
+
+
+@pytest.mark.asyncio
+async def test_verify_citations_suggests_page():
+    payload = AnswerWithCitations(answer="ok", citations=[Citation(section="17.3.B", page="2")])
+    out = await verify_citations.guardrail_function(None, None, payload)  # type: ignore[arg-type]
+    assert out.tripwire_triggered
+    assert out.output_info["suggested_pages"] == {"17.3.B": 3}
+
+
+@pytest.mark.asyncio
+async def test_verify_citations_unprefixed_integer_uses_substring_check():
+    payload = AnswerWithCitations(answer="ok", citations=[Citation(section="Chapter 8", page="1")])
+    out = await verify_citations.guardrail_function(None, None, payload)  # type: ignore[arg-type]
+    assert not out.tripwire_triggered
@@ -0,0 +1,39 @@
+import pytest
+
+from agents import judge_batch
+from agents.judge import Score
+from agents.judge_policy import ScoreCache
+
+
+@pytest.mark.asyncio
+async def test_batches_are_scored_concurrently_and_written_back(run_store, tmp_path, monkeypatch):
+    monkeypatch.setattr(judge_batch, "record_usage", lambda result: None)
+    cache = ScoreCache(str(tmp_path / "judge_cache.sqlite3"))
+    monkeypatch.setattr(judge_batch, "get_score_cache", lambda: cache)
+    monkeypatch.setattr(judge_batch, "get_run_store", lambda: run_store)
+    requests = []
+
+    async def fake_batch(batch):
+        requests.append(len(batch))
+        # The model drops the last item of every full batch; it is retried on its own.
+        keep = batch[:-1] if len(batch) == 3 else batch
+        return {i: Score(rating=3, rationale=item.question) for i, item in enumerate(keep)}
+
+    monkeypatch.setattr(judge_batch, "_judge_batch", fake_batch)
+    run_ids = [f"run{i}" for i in range(7)]
+    for run_id in run_ids:
+        record = {"input": f"q-{run_id}", "final_output": {"answer": "a"}}
+        run_store.append(record, run_id=run_id, trace_id=run_id, ts="2025-05-01", quality_status="unsampled")
+    run_store.append({"input": "q"}, run_id="done", trace_id="done", ts="2025-05-01", quality_status="scored")
+
+    stats = await judge_batch.score_runs(batch_size=3, concurrency=2)
+
+    assert stats == {"runs": 7, "scored": 7, "cached": 0, "failed": 0}
+    assert sorted(requests) == [1, 1, 1, 3, 3]
+    assert {run_store.get(r)["quality_status"] for r in run_ids} == {"scored"}
+
+    # A second sweep over re-queued runs is answered from the score cache.
+    for run_id in run_ids:
+        run_store.annotate(run_id, quality_status="failed")
+    stats = await judge_batch.score_runs(batch_size=3)
+    assert stats["cached"] == 7 and len(requests) == 5
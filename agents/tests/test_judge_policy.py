@@ -0,0 +1,24 @@
+from agents.judge_policy import SamplingPolicy, ScoreCache, cache_key
+
+
+def test_sampling_rate_and_forced_flags():
+    policy = SamplingPolicy(rate=0.2, always=frozenset({"guardrail"}))
+    decisions = [policy.decide([], f"trace_{i}") for i in range(2000)]
+    assert 300 < decisions.count("sampled") < 500
+    # Deterministic per trace id.
+    assert [policy.decide([], f"trace_{i}") for i in range(2000)] == decisions
+
+    assert SamplingPolicy(rate=0.0, always=frozenset({"guardrail"})).decide(["guardrail"], "t") == "guardrail"
+    assert SamplingPolicy(rate=0.0, always=frozenset()).decide(["guardrail"], "t") is None
+
+
+def test_score_cache_keyed_on_answer_and_judge(tmp_path):
+    cache = ScoreCache(str(tmp_path / "judge_cache.sqlite3"))
+    key = cache_key("Parking for retail?", {"answer": "1 per 300 sq ft", "citations": []}, "gpt-4o-mini", "rate it")
+    assert cache.get(key) is None
+    cache.put(key, 4, "accurate")
+    assert cache.get(key) == (4, "accurate")
+
+    assert cache_key("Parking for retail?", {"answer": "1 per 300 sq ft", "citations": []}, "gpt-4o-mini", "v2") != key
+    assert ScoreCache(str(tmp_path / "judge_cache.sqlite3"), ttl_seconds=-1).get(key) is None
+    cache.close()
@@ -0,0 +1,66 @@
+import asyncio
+import threading
+
+import pytest
+
+from agents import judge_queue
+from agents.judge import Score
+from agents.judge_queue import JudgeQueue
+
+
+def _store_run(store, name):
+    store.append({"input": name}, run_id=name, trace_id=name, ts="2025-05-01T00:00:00", quality_status="pending")
+    return name
+
+
+@pytest.mark.asyncio
+async def test_scores_are_attached_after_retry(run_store):
+    calls = {}
+
+    async def flaky_judge(job):
+        calls[job.run_id] = calls.get(job.run_id, 0) + 1
+        if calls[job.run_id] == 1:
+            raise RuntimeError("rate limited")
+        return Score(rating=4, rationale="ok")
+
+    queue = JudgeQueue(workers=2, retry_base_delay=0, score=flaky_judge)
+    run_ids = [_store_run(run_store, f"run{i}") for i in range(5)]
+    for run_id in run_ids:
+        assert await queue.submit(run_id, "q", "a")
+    assert await queue.drain(timeout=5)
+
+    for run_id in run_ids:
+        record = run_store.get(run_id)
+        assert record["quality_score"] == 4
+        assert record["quality_status"] == "scored"
+    assert set(calls.values()) == {2}
+
+
+@pytest.mark.asyncio
+async def test_full_queue_marks_run_skipped(run_store, monkeypatch):
+    release = asyncio.Event()
+    annotated_on = []
+    annotate = judge_queue.annotate_run_result
+
+    def recording_annotate(run_id, *args, **kwargs):
+        annotated_on.append(threading.get_ident())
+        annotate(run_id, *args, **kwargs)
+
+    monkeypatch.setattr(judge_queue, "annotate_run_result", recording_annotate)
+
+    async def slow_judge(job):
+        await release.wait()
+        return Score(rating=5, rationale="fine")
+
+    queue = JudgeQueue(workers=1, max_pending=1, score=slow_judge)
+    first, second, third = (_store_run(run_store, n) for n in ("a", "b", "c"))
+    assert await queue.submit(first, "q", "a")
+    await asyncio.sleep(0)  # worker picks up the first job
+    assert await queue.submit(second, "q", "a")
+    assert not await queue.submit(third, "q", "a")
+
+    assert run_store.get(third)["quality_status"] == "skipped"
+    assert annotated_on[0] != threading.get_ident()  # not on the event loop
+    release.set()
+    assert await queue.drain(timeout=5)
+    assert run_store.get(second)["quality_status"] == "scored"
@@ -0,0 +1,112 @@
+from types import SimpleNamespace
+
+import pytest
+
+from agents import master_orchestrator_agent as orchestrator
+from agents.answer_cache import cache_mode
+from agents.run_store import RunLocation
+
+ANSWER = {"answer": "1 space per 100 sq ft.", "citations": [{"section": "17.3", "page": 412}]}
+
+
+class _Cache:
+    def __init__(self, hit=None):
+        self.hit = hit
+        self.lookups = []
+        self.stored = []
+
+    def get(self, question):
+        self.lookups.append(question)
+        return self.hit
+
+    def put(self, question, answer, **meta):
+        self.stored.append((question, answer, meta))
+
+
+@pytest.fixture
+def runs(monkeypatch):
+    runs = []
+
+    async def run_with_budget(**kwargs):
+        runs.append(kwargs["input"])
+        return SimpleNamespace(final_output=ANSWER, last_agent=SimpleNamespace(name="parking"))
+
+    monkeypatch.setattr(orchestrator, "run_with_budget", run_with_budget)
+    monkeypatch.setattr(orchestrator, "persist_run_result", lambda result: RunLocation("r1", "seg", 0, 10))
+    monkeypatch.setattr(orchestrator, "run_flags", lambda result: set())
+    return runs
+
+
+def _use_cache(monkeypatch, cache):
+    monkeypatch.setattr(orchestrator, "get_answer_cache", lambda agent: cache)
+
+
+def test_format_answer():
+    assert orchestrator.format_answer(ANSWER) == "1 space per 100 sq ft.\n\nCitations: 17.3 (p. 412)"
+    assert orchestrator.format_answer({"answer": "No.", "citations": []}) == "No."
+    assert orchestrator.format_answer("plain text") == "plain text"
+
+
+def test_cache_hit_runs_no_agent(runs, monkeypatch):
+    _use_cache(monkeypatch, _Cache(hit={"answer": ANSWER, "run_id": "r0"}))
+
+    assert orchestrator.route_question("Restaurant parking?") == orchestrator.format_answer(ANSWER)
+    assert runs == []
+
+
+def test_cache_miss_runs_and_stores_the_answer(runs, monkeypatch):
+    cache = _Cache()
+    _use_cache(monkeypatch, cache)
+
+    assert orchestrator.route_question("Restaurant parking?") == orchestrator.format_answer(ANSWER)
+    assert runs == ["Restaurant parking?"]
+    [(question, answer, meta)] = cache.stored
+    assert (question, answer) == ("Restaurant parking?", ANSWER)
+    assert meta == {"run_id": "r1", "run_result_path": "seg:0", "specialist": "parking"}
+
+
+def test_cache_control_is_honoured(runs, monkeypatch):
+    cache = _Cache(hit={"answer": ANSWER, "run_id": "r0"})
+    _use_cache(monkeypatch, cache)
+
+    orchestrator.route_question("Restaurant parking?", mode=cache_mode("no-cache"))
+    assert cache.lookups == [] and len(cache.stored) == 1  # fresh answer still stored
+
+    orchestrator.route_question("Restaurant parking?", mode=cache_mode("No-Cache, no-store"))
+    assert cache.lookups == [] and len(cache.stored) == 1 and len(runs) == 2
+
+
+def test_cli_serves_a_cache_hit_without_a_run(runs, monkeypatch, tmp_path, capsys):
+    from agents import ebr_zoning_cli as cli
+
+    cache = _Cache(hit={"answer": ANSWER, "run_id": "r0"})
+    _use_cache(monkeypatch, cache)
+    monkeypatch.setattr(cli, "HISTORY_DB_PATH", str(tmp_path / "query_history.db"))
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+
+    monkeypatch.setattr("sys.argv", ["ebr_zoning_cli", "Restaurant parking?"])
+    cli.main()
+    assert capsys.readouterr().out.strip() == orchestrator.format_answer(ANSWER)
+    assert runs == []
+
+    monkeypatch.setattr("sys.argv", ["ebr_zoning_cli", "--no-cache", "Restaurant parking?"])
+    cli.main()
+    assert runs == ["Restaurant parking?"] and len(cache.lookups) == 1 and cache.stored == []
+
+
+def test_web_serves_a_cache_hit_without_a_run(runs, monkeypatch, tmp_path):
+    pytest.importorskip("flask")
+    from agents import ebr_zoning_web as web
+
+    cache = _Cache(hit={"answer": ANSWER, "run_id": "r0"})
+    _use_cache(monkeypatch, cache)
+    monkeypatch.setattr(web, "HISTORY_DB_PATH", str(tmp_path / "query_history.db"))
+    web.init_history_db()
+    client = web.app.test_client()
+
+    response = client.post("/api/ask", json={"question": "Restaurant parking?"})
+    assert response.get_json() == {"answer": orchestrator.format_answer(ANSWER)}
+    assert runs == []
+
+    client.post("/api/ask", json={"question": "Restaurant parking?"}, headers={"Cache-Control": "no-store"})
+    assert runs == ["Restaurant parking?"] and len(cache.lookups) == 1 and cache.stored == []
@@ -0,0 +1,177 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from agents import tools as tools_mod
+from agents.parcel_snapshot import ParcelSnapshot, import_export
+from agents.tools import CachePolicy, lookup_parcel_zoning, lookup_parcel_zoning_batch
+
+
+@pytest.fixture(autouse=True)
+def _local_only(monkeypatch):
+    monkeypatch.setattr(tools_mod, "REDIS_URL", None)
+    monkeypatch.setattr(tools_mod, "_SNAPSHOT_MODE", "off")
+    tools_mod._local_cache.clear()
+    yield
+    tools_mod._local_cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_lookup_uses_cache_and_pooled_client(mock_gis):
+    assert await lookup_parcel_zoning("0101") == "C2"
+    client = tools_mod._get_http_client()
+    assert await lookup_parcel_zoning("0101") == "C2"
+    assert await lookup_parcel_zoning("0202") == "A1"
+
+    assert tools_mod._get_http_client() is client
+    assert len(mock_gis.requests) == 2
+    await tools_mod.aclose_clients()
+
+
+@pytest.mark.asyncio
+async def test_unknown_parcel_is_negatively_cached(mock_gis):
+    for _ in range(3):
+        with pytest.raises(ValueError):
+            await lookup_parcel_zoning("9999")
+
+    assert len(mock_gis.requests) == 1
+    await tools_mod.aclose_clients()
+
+
+@pytest.mark.asyncio
+async def test_negative_entry_expires_after_its_short_ttl(mock_gis, monkeypatch):
+    monkeypatch.setattr(tools_mod, "_NEGATIVE_POLICY", CachePolicy(ttl=0, stale=0, beta=0))
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            await lookup_parcel_zoning("9999")
+
+    assert len(mock_gis.requests) == 2
+    await tools_mod.aclose_clients()
+
+
+@pytest.mark.asyncio
+async def test_batch_lookup_single_round_trip(mock_gis, monkeypatch):
+    monkeypatch.setattr(tools_mod, "_GIS_MAX_IDS_PER_QUERY", 2)
+    assert await lookup_parcel_zoning("0101") == "C2"
+
+    out = await lookup_parcel_zoning_batch(["0202", "0101", "9999", "0303", "0202"])
+
+    assert out == {"0202": "A1", "0101": "C2", "9999": None, "0303": "M1"}
+    # one single lookup + two chunks for the three misses
+    assert len(mock_gis.requests) == 3
+    assert await lookup_parcel_zoning_batch(["0202", "9999"]) == {"0202": "A1", "9999": None}
+    assert len(mock_gis.requests) == 3
+    await tools_mod.aclose_clients()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_lookups_coalesce_into_one_request(mock_gis):
+    mock_gis.delay = 0.2
+
+    results = await asyncio.gather(*(lookup_parcel_zoning("0303") for _ in range(20)))
+
+    assert results == ["M1"] * 20
+    assert len(mock_gis.requests) == 1
+    assert not tools_mod._inflight
+    await tools_mod.aclose_clients()
+
+
+@pytest.mark.asyncio
+async def test_snapshot_answers_before_live_endpoint(mock_gis, monkeypatch, tmp_path):
+    export = tmp_path / "parcels.csv"
+    export.write_text("PARCEL_ID,ZONING\n0101,C2-SNAP\n")
+    db = str(tmp_path / "snapshot.sqlite3")
+    import_export(str(export), db_path=db)
+    monkeypatch.setattr(tools_mod, "_SNAPSHOT_MODE", "auto")
+    monkeypatch.setattr(tools_mod, "_snapshot", ParcelSnapshot(db))
+
+    assert await lookup_parcel_zoning("0101") == "C2-SNAP"
+    assert await lookup_parcel_zoning_batch(["0101", "0202"]) == {"0101": "C2-SNAP", "0202": "A1"}
+    assert mock_gis.requests == ["PARCEL_ID IN ('0202')"]
+    await tools_mod.aclose_clients()
+
+
+def test_reimport_of_unchanged_export_refreshes_stale_snapshot(tmp_path):
+    export = tmp_path / "parcels.csv"
+    export.write_text("PARCEL_ID,ZONING\n0101,C2\n")
+    db = str(tmp_path / "snapshot.sqlite3")
+    first = import_export(str(export), db_path=db)
+    with sqlite3.connect(db) as conn:
+        conn.execute("UPDATE snapshots SET imported_at = '2000-01-01T00:00:00'")
+    assert ParcelSnapshot(db, max_age_days=1).is_stale()
+
+    again = import_export(str(export), db_path=db)
+
+    assert again["unchanged"] and again["version"] == first["version"]
+    assert not ParcelSnapshot(db, max_age_days=1).is_stale()
+
+
+@pytest.mark.asyncio
+async def test_stale_value_served_while_refreshing(mock_gis, monkeypatch):
+    monkeypatch.setitem(tools_mod._CACHE_POLICIES, "parcel", CachePolicy(ttl=0, stale=60, beta=0))
+    assert await lookup_parcel_zoning("0101") == "C2"
+
+    mock_gis.parcels["0101"] = "C3"
+    assert await lookup_parcel_zoning("0101") == "C2"  # stale, refresh scheduled
+    await asyncio.gather(*tools_mod._background)
+
+    assert len(mock_gis.requests) == 2
+    assert (await tools_mod._cache_get("parcel:0101")).value == "C3"
+    await tools_mod.aclose_clients()
+
+
+def test_redis_client_is_recreated_per_event_loop(monkeypatch):
+    class _Client:
+        closed = False
+
+        async def aclose(self):
+            self.closed = True
+
+    monkeypatch.setattr(tools_mod, "REDIS_URL", "redis://cache:6379/0")
+    monkeypatch.setattr(tools_mod.aioredis.Redis, "from_url", staticmethod(lambda url: _Client()))
+
+    async def current():
+        client = tools_mod._get_redis()
+        assert tools_mod._get_redis() is client  # one per loop
+        await asyncio.sleep(0)  # let the replaced client close
+        return client
+
+    first = asyncio.run(current())  # successive asyncio.run calls, as in the CLI
+    second = asyncio.run(current())
+
+    assert second is not first and first.closed and not second.closed
+    monkeypatch.setattr(tools_mod, "_redis", None)
+
+
+@pytest.mark.asyncio
+async def test_redis_lock_lets_one_caller_fetch(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")  # fakeredis needs it for the release script
+    client = fakeredis.aioredis.FakeRedis()
+    monkeypatch.setattr(tools_mod, "_get_redis", lambda: client)
+    monkeypatch.setattr(tools_mod, "_LOCK_POLL_SECONDS", 0.01)
+    fetches = []
+
+    async def fetch():
+        fetches.append(1)
+        await asyncio.sleep(0.05)
+        await tools_mod._cache_set("parcel:0101", "C2")
+        return "C2"
+
+    async def second_worker():
+        await asyncio.sleep(0.01)  # arrive while the first holds the lock
+        return await tools_mod._with_redis_lock("parcel:0101", fetch)
+
+    results = await asyncio.gather(tools_mod._with_redis_lock("parcel:0101", fetch), second_worker())
+
+    assert results == ["C2", "C2"] and len(fetches) == 1  # the second read the cached value
+    assert not await client.exists("lock:parcel:0101")
+
+    async def failing():
+        raise RuntimeError("GIS down")
+
+    with pytest.raises(RuntimeError):
+        await tools_mod._with_redis_lock("parcel:0202", failing)
+    assert not await client.exists("lock:parcel:0202")  # released, so the next caller need not wait
+    await client.aclose()
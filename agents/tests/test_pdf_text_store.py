@@ -0,0 +1,89 @@
+import os
+
+import pytest
+
+from agents.pdf_text_store import PageTextStore, iter_pdf_pages, load_page_store, write_store
+
+
+def _write_pdf(path, pages: list[str]) -> None:
+    """Minimal PDF with one line of Helvetica text per page."""
+
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in pages:
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode()
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 3 0 R >> >> "
+            b"/Contents %d 0 R >>" % (len(objects))
+        )
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % k for k in kids),
+        len(kids),
+    )
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % o for o in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as fp:
+        fp.write(out)
+
+
+@pytest.fixture
+def pdf(tmp_path):
+    path = str(tmp_path / "zoning.pdf")
+    _write_pdf(path, [f"Sec. {i}.1 page {i}" for i in range(1, 7)])
+    return path
+
+
+def test_store_round_trip(tmp_path):
+    pages = ["Sec. 8.5.2 setbacks", "", "§ 17 – parking ½ space 😀"]
+    path = str(tmp_path / "doc.pages")
+
+    assert write_store(path, "ab" * 32, pages) == 3
+    store = PageTextStore(path)
+    assert list(store) == pages
+    assert store[-1] == pages[-1] and store[0:2] == pages[:2]
+    assert store.sha256 == "ab" * 32
+    with pytest.raises(IndexError):
+        store[3]
+    store.close()
+
+
+def test_store_is_rebuilt_when_pdf_changes(pdf, tmp_path):
+    cache = str(tmp_path / "cache")
+    first = load_page_store(pdf, cache)
+    assert len(first) == 6 and "Sec. 3.1 page 3" in first[2]
+    first.close()
+
+    _write_pdf(pdf, ["Sec. 1.1 amended", "Sec. 2.1 amended"])
+    os.utime(pdf, ns=(0, os.stat(pdf).st_mtime_ns + 1_000_000_000))
+    second = load_page_store(pdf, cache)
+
+    assert len(second) == 2 and "amended" in second[0]
+    assert [n for n in os.listdir(cache) if n.endswith(".pages")] == [os.path.basename(second.path)]
+    second.close()
+
+
+def test_corrupt_store_is_rebuilt(pdf, tmp_path):
+    cache = str(tmp_path / "cache")
+    path = load_page_store(pdf, cache).path
+    with open(path, "r+b") as fp:
+        fp.truncate(10)
+
+    store = load_page_store(pdf, cache)
+    assert len(store) == 6 and "page 6" in store[5]
+    store.close()
+
+
+def test_parallel_extraction_matches_serial(pdf):
+    serial = list(iter_pdf_pages(pdf, workers=1))
+    assert list(iter_pdf_pages(pdf, workers=3, chunk_size=1)) == serial
+    assert list(iter_pdf_pages(pdf, workers=2, chunk_size=4)) == serial
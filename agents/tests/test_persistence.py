@@ -0,0 +1,66 @@
+from types import SimpleNamespace
+
+import pytest
+from gpc_agents.src.agents import InputGuardrailTripwireTriggered, OutputGuardrailTripwireTriggered
+
+from agents import persistence
+from agents.guardrails import enforce_citation_json, profanity_filter
+from agents.judge import Score
+from agents.judge_policy import ScoreCache
+from agents.persistence import persist_tripped_run
+
+_RUN = SimpleNamespace(
+    new_items=[],
+    raw_responses=[],
+    last_agent=SimpleNamespace(name="EBR Zoning Dimensional Standards Expert"),
+    context_wrapper=SimpleNamespace(trace=SimpleNamespace(trace_id="trace_1")),
+)
+
+
+@pytest.fixture
+def judge(tmp_path, monkeypatch):
+    calls = []
+
+    def run_sync(agent, payload):
+        calls.append(payload)
+        return SimpleNamespace(final_output=Score(rating=1, rationale="not the requested format"))
+
+    monkeypatch.setattr(persistence, "Runner", SimpleNamespace(run_sync=run_sync))
+    monkeypatch.setattr(persistence, "record_usage", lambda result: None)
+    cache = ScoreCache(str(tmp_path / "judge_cache.sqlite3"))
+    monkeypatch.setattr(persistence, "get_score_cache", lambda: cache)
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_rejected_answer_is_stored_and_judged(run_store, judge):
+    rejected = {"text": "A1 front setback is 25 ft"}
+    guardrail_result = await enforce_citation_json.run(None, _RUN.last_agent, rejected)  # type: ignore[arg-type]
+    assert guardrail_result.output.tripwire_triggered
+    exc = OutputGuardrailTripwireTriggered(guardrail_result)
+    exc.run_data = _RUN
+
+    location = persist_tripped_run("Front setback in A1?", exc)
+
+    [summary] = run_store.query(guardrail="tripped")
+    assert summary.run_id == location.run_id and summary.quality_score == 1
+    record = run_store.get(location.run_id)
+    assert record["final_output"] == rejected
+    assert record["tripwire"]["guardrail"] == "enforce_citation_json"
+    assert (record["quality_status"], record["judge_reason"]) == ("scored", "guardrail")
+    assert judge == [{"assistant_answer": rejected, "question": "Front setback in A1?"}]
+
+    persist_tripped_run("Front setback in A1?", exc)  # same rejected answer: cached score
+    assert len(judge) == 1
+
+
+@pytest.mark.asyncio
+async def test_input_tripwire_has_nothing_to_judge(run_store, judge):
+    output = await profanity_filter.guardrail_function(None, None, "you are a bitch")  # type: ignore[arg-type]
+    exc = InputGuardrailTripwireTriggered(SimpleNamespace(guardrail=profanity_filter, output=output))
+
+    location = persist_tripped_run("you are a bitch", exc)
+
+    record = run_store.get(location.run_id)
+    assert record["quality_status"] == "not_judged" and record["final_output"] is None
+    assert record["input"] == "you are a bitch" and judge == []
@@ -0,0 +1,48 @@
+import sqlite3
+
+from prometheus_client import REGISTRY
+
+from agents import qa_log_writer
+from agents.qa_log_writer import QALogWriter
+
+
+def _failing_writes(monkeypatch, failures: int) -> list[int]:
+    calls = []
+    write_rows = qa_log_writer.write_rows
+
+    def flaky(conn, rows):
+        calls.append(len(rows))
+        if len(calls) <= failures:
+            raise sqlite3.OperationalError("database is locked")
+        write_rows(conn, rows)
+
+    monkeypatch.setattr(qa_log_writer, "write_rows", flaky)
+    return calls
+
+
+def test_locked_database_is_retried_without_losing_rows(tmp_path, monkeypatch):
+    calls = _failing_writes(monkeypatch, failures=2)
+    db = str(tmp_path / "parking.db")
+    writer = QALogWriter(max_attempts=5, retry_base_delay=0.01)
+
+    for i in range(3):
+        writer.submit(db, f"q{i}", "a", "2025-05-01T00:00:00")
+    assert writer.flush(timeout=5)
+    writer.close()
+
+    assert len(calls) >= 3 and writer.rows_dropped == 0
+    with sqlite3.connect(db) as conn:
+        assert [q for (q,) in conn.execute("SELECT question FROM qa_log ORDER BY id")] == ["q0", "q1", "q2"]
+
+
+def test_rows_are_dropped_and_counted_after_max_attempts(tmp_path, monkeypatch):
+    calls = _failing_writes(monkeypatch, failures=100)
+    dropped_before = REGISTRY.get_sample_value("qa_log_rows_dropped_total")
+    writer = QALogWriter(max_attempts=3, retry_base_delay=0.01)
+
+    writer.submit(str(tmp_path / "parking.db"), "q", "a", "2025-05-01T00:00:00")
+    assert writer.flush(timeout=5)
+    writer.close()
+
+    assert calls == [1, 1, 1] and writer.rows_dropped == 1
+    assert REGISTRY.get_sample_value("qa_log_rows_dropped_total") == dropped_before + 1
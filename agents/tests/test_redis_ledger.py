@@ -0,0 +1,72 @@
+import threading
+import time
+
+import pytest
+
+from agents.budget_ledger import BudgetExceededError, RedisLedger
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")  # fakeredis needs it for EVALSHA
+
+
+@pytest.fixture
+def server():
+    return fakeredis.FakeServer()
+
+
+def test_hosts_share_one_budget(server):
+    # Two ledgers on one Redis stand in for two API hosts.
+    a = RedisLedger(fakeredis.FakeRedis(server=server), 1.0)
+    b = RedisLedger(fakeredis.FakeRedis(server=server), 1.0)
+    granted, rejected = [], []
+
+    def worker(ledger):
+        try:
+            granted.append(ledger.reserve(0.1))
+        except BudgetExceededError:
+            rejected.append(1)
+
+    threads = [threading.Thread(target=worker, args=(a if i % 2 else b,)) for i in range(30)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(granted) == 10
+    assert len(rejected) == 20
+
+
+def test_commit_buckets_spend_and_writes_behind(server, tmp_path):
+    db = tmp_path / "usage.sqlite3"
+    client = fakeredis.FakeRedis(server=server)
+    ledger = RedisLedger(client, 1.0, db_path=db, write_behind_seconds=0)
+
+    res = ledger.reserve(0.9)
+    ledger.commit(res, 1000, 500, 0.3)
+    ledger.release(res)
+
+    assert res.amount == 0
+    assert ledger.spent() == pytest.approx(0.3)
+    [key] = client.keys("budget:spend:*")
+    assert 0 < client.ttl(key) <= ledger._bucket_ttl
+    assert ledger.flush() == 1
+
+    ledger.reserve(0.7)
+    with pytest.raises(BudgetExceededError):
+        ledger.reserve(0.01)
+    ledger.close()
+
+
+def test_extended_reservation_outlives_its_ttl(server):
+    ledger = RedisLedger(fakeredis.FakeRedis(server=server), 1.0, reservation_ttl=0.2)
+    res = ledger.reserve(0.9)
+    for _ in range(3):
+        time.sleep(0.1)
+        assert ledger.extend(res)
+    with pytest.raises(BudgetExceededError):
+        ledger.reserve(0.2)  # still held 0.3 s in
+
+    time.sleep(0.25)
+    assert not ledger.extend(res)  # lapsed; not revived
+    ledger.reserve(0.9)
+    ledger.close()
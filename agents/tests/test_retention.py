@@ -0,0 +1,47 @@
+import gzip
+import json
+import sqlite3
+from datetime import datetime
+
+from agents.budget_ledger import SQLiteLedger
+from agents.retention import downsample_usage, maintain, pack_run_results
+
+NOW = datetime(2025, 6, 1, 12, 0)
+
+
+def test_old_usage_rows_collapse_to_hourly(tmp_path):
+    db = tmp_path / "usage.sqlite3"
+    SQLiteLedger(db, 10.0).close()
+    conn = sqlite3.connect(db)
+    rows = [(f"2025-05-01T10:{m:02d}:00", 100, 10, 0.01) for m in range(0, 60, 5)]
+    rows += [("2025-05-01T11:30:00", 1, 1, 0.5), ("2025-05-31T23:00:00", 5, 5, 1.0)]
+    with conn:
+        conn.executemany("INSERT INTO usage VALUES (?, ?, ?, ?)", rows)
+
+    stats = downsample_usage(str(db), usage_days=7, now=NOW)
+    assert stats["usage_rows_removed"] == 12
+    assert stats["usage_rows_added"] == 1
+    assert conn.execute("SELECT ts, prompt_tokens, ROUND(cost_usd, 4) FROM usage ORDER BY ts").fetchall() == [
+        ("2025-05-01T10:00:00", 1200, 0.12),
+        ("2025-05-01T11:30:00", 1, 0.5),
+        ("2025-05-31T23:00:00", 5, 1.0),
+    ]
+    # Idempotent: nothing left to collapse.
+    assert downsample_usage(str(db), usage_days=7, now=NOW)["usage_rows_removed"] == 0
+    conn.close()
+    assert maintain(str(db))["converted"] is True
+    assert maintain(str(db))["converted"] is False
+
+
+def test_old_run_results_are_packed_into_daily_segments(tmp_path):
+    for name in ["20250501T100000000000Z_a.json", "20250501T110000000000Z_b.json", "20250530T100000000000Z_c.json"]:
+        (tmp_path / name).write_text(json.dumps({"input": name}))
+
+    assert pack_run_results(str(tmp_path), days=14, now=NOW) == {"20250501": 2}
+
+    assert sorted(p.name for p in tmp_path.glob("*.json")) == ["20250530T100000000000Z_c.json"]
+    with gzip.open(tmp_path / "archive" / "run_results-20250501.ndjson.gz", "rt") as fp:
+        assert [json.loads(line)["file"] for line in fp] == [
+            "20250501T100000000000Z_a.json",
+            "20250501T110000000000Z_b.json",
+        ]
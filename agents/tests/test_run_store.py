@@ -0,0 +1,108 @@
+import os
+
+import pytest
+
+from agents.run_store import RunStore, import_legacy
+
+
+@pytest.mark.parametrize("compression", ["gzip", "none"])
+def test_append_rotate_and_read_back(tmp_path, compression):
+    store = RunStore(str(tmp_path), max_segment_bytes=300, compression=compression)
+    locations = [
+        store.append({"input": f"question {i}", "n": i}, run_id=f"r{i}", trace_id=f"t{i % 3}", ts=f"2025-05-01T00:0{i}")
+        for i in range(10)
+    ]
+    store.rotate()
+
+    assert len({loc.segment for loc in locations}) > 1
+    assert str(locations[3]) == f"{locations[3].segment}:{locations[3].offset}"
+    suffix = ".ndjson.gz" if compression == "gzip" else ".ndjson"
+    assert all(name.endswith(suffix) for name in os.listdir(store.segments_dir))
+
+    for i, loc in enumerate(locations):
+        assert store.read(loc.segment, loc.offset, loc.length)["n"] == i
+    assert [loc.run_id for loc in store.find(trace_id="t1")] == ["r7", "r4", "r1"]
+    assert [loc.run_id for loc in store.find(since="2025-05-01T00:08")] == ["r9", "r8"]
+
+    store.annotate("r2", quality_score=5, quality_status="scored")
+    assert store.get("r2")["quality_score"] == 5
+    assert [loc.run_id for loc in store.find(statuses={"scored"})] == ["r2"]
+    store.close()
+
+
+def test_rotation_leaves_idle_peer_segments_alone(tmp_path):
+    a = RunStore(str(tmp_path), max_segment_seconds=0)
+    b = RunStore(str(tmp_path), max_segment_seconds=0)
+    first = a.append({"n": 1}, run_id="a1", trace_id="t", ts="2025-05-01T00:01")
+    orphan = os.path.join(b.segments_dir, "20250101T000000000000-999999999.ndjson")  # writer pid is gone
+    with open(orphan, "wb") as fp:
+        fp.write(b'{"run_id": "old"}\n')
+
+    b.append({"n": 2}, run_id="b1", trace_id="t", ts="2025-05-01T00:02")
+    b.rotate()  # sweeps orphaned segments
+
+    assert os.path.exists(os.path.join(a.segments_dir, first.segment))  # a's idle segment is still open
+    assert os.path.exists(orphan + ".gz") and not os.path.exists(orphan)
+    a.compress(os.path.basename(orphan))  # already compressed elsewhere: no-op
+    second = a.append({"n": 3}, run_id="a2", trace_id="t", ts="2025-05-01T00:03")
+    assert a.get("a2")["n"] == 3 and second.segment != first.segment
+    assert a.get("a1")["n"] == 1
+
+    a.close()
+    b.close()
+    assert not any(name.endswith(".ndjson") for name in os.listdir(a.segments_dir))  # close compresses
+
+
+def test_import_legacy_json_files(tmp_path):
+    (tmp_path / "20250501T100000000000Z_abc.json").write_text('{"input": "q", "trace_id": "abc", "quality_score": 4}')
+    store = RunStore(str(tmp_path))
+
+    assert import_legacy(store, str(tmp_path)) == 1
+    assert not list(tmp_path.glob("*.json"))
+    assert store.get("20250501T100000000000Z_abc")["input"] == "q"
+    assert [loc.run_id for loc in store.find(statuses={"scored"})] == ["20250501T100000000000Z_abc"]
+    store.close()
+
+
+def test_query_filters_on_indexed_columns(tmp_path):
+    store = RunStore(str(tmp_path))
+    for i in range(12):
+        store.append(
+            {"n": i},
+            run_id=f"r{i:02d}",
+            trace_id=f"t{i}",
+            ts=f"2025-05-{i + 1:02d}T12:00:00",
+            quality_score=i % 5 + 1 if i % 4 else None,
+            quality_status="scored" if i % 4 else "unsampled",
+            specialist="parking" if i % 2 else "signage",
+            guardrail="tripped" if i == 7 else "passed",
+        )
+
+    parking = store.query(specialist="parking", since="2025-05-03", until="2025-05-10")
+    assert [s.run_id for s in parking] == ["r07", "r05", "r03"]
+    assert [s.run_id for s in store.query(max_score=2)] == ["r11", "r10", "r06", "r05", "r01"]
+    assert [s.run_id for s in store.query(guardrail="tripped")] == ["r07"]
+    assert [s.run_id for s in store.query(specialist="signage", statuses={"unsampled"}, limit=2)] == ["r08", "r04"]
+    assert store.read(*parking[0].location[1:])["n"] == 7
+    store.close()
+
+
+def test_old_index_is_migrated_and_reindexed(tmp_path):
+    store = RunStore(str(tmp_path))
+    store.append(
+        {"new_items": [{"agent": {"name": "orchestrator"}}, {"agent": {"name": "parking"}}]},
+        run_id="old",
+        trace_id="t",
+        ts="2025-05-01",
+    )
+    store._index.executescript(
+        "DROP INDEX idx_runs_specialist; DROP INDEX idx_runs_guardrail; "
+        "ALTER TABLE runs DROP COLUMN specialist; ALTER TABLE runs DROP COLUMN guardrail;"
+    )
+    store.close()
+
+    store = RunStore(str(tmp_path))
+    assert store.query(specialist="parking") == []
+    assert store.reindex() == 1
+    assert [s.run_id for s in store.query(specialist="parking")] == ["old"]
+    store.close()
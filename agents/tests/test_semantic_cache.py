@@ -0,0 +1,59 @@
+import numpy as np
+
+from agents.answer_cache import AnswerCache, LocalBackend
+from agents.semantic_cache import HashedNgramEmbedder, SemanticIndex
+
+PARKING = "EBR Zoning Parking & Loading Expert"
+SIGNAGE = "EBR Signage Regulations Specialist"
+
+
+def test_embedding_is_deterministic_and_unit_length():
+    embedder = HashedNgramEmbedder()
+    vec = embedder.embed("How many parking spaces does a restaurant need?")
+
+    assert np.array_equal(vec, HashedNgramEmbedder().embed("how many parking spaces does a restaurant need"))
+    assert abs(float(np.linalg.norm(vec)) - 1.0) < 1e-5
+    assert not embedder.embed("what is the").any()  # only stop words
+
+
+def test_paraphrase_matches_but_other_district_does_not():
+    index = SemanticIndex(capacity=4, threshold=0.6)
+    index.add("k1", "What is the front setback in A1?", specialist="dims", ttl=60)
+
+    match = index.search("front yard setback for A1 district")
+    assert match.key == "k1" and match.specialist == "dims" and match.similarity >= 0.6
+    assert index.search("What is the front setback in A2?") is None
+    assert index.search("Do I need a permit to remove a tree?") is None
+
+
+def test_specialist_scope_and_thresholds():
+    index = SemanticIndex(capacity=4, threshold=0.6, thresholds={SIGNAGE: 0.99})
+    index.add("park", "How many parking spaces does a restaurant need?", specialist=PARKING, ttl=60)
+    index.add("sign", "What is the maximum sign height in C2?", specialist=SIGNAGE, ttl=60)
+
+    assert index.search("parking spaces required for a restaurant", specialist=PARKING).key == "park"
+    assert index.search("parking spaces required for a restaurant", specialist=SIGNAGE) is None
+    assert index.search("maximum height of a sign in the C2 district") is None  # below signage's threshold
+
+
+def test_full_index_overwrites_oldest_and_expired_rows_miss():
+    index = SemanticIndex(capacity=2, threshold=0.6)
+    index.add("k1", "tree removal permit requirements", ttl=60)
+    index.add("k2", "rezoning application process", ttl=60)
+    index.add("k3", "floodplain development requirements", ttl=0)
+
+    assert index.search("requirements for a tree removal permit") is None  # k1 was overwritten
+    assert index.search("floodplain development requirements") is None  # k3 expired
+    assert index.search("rezoning application process").key == "k2"
+
+
+def test_answer_cache_falls_back_to_semantic_match():
+    semantic = SemanticIndex(capacity=10, threshold=0.6)
+    cache = AnswerCache(LocalBackend(maxsize=10), version="v1", ttl_seconds=60, semantic=semantic)
+    cache.put("How many parking spaces does a restaurant need?", "1 per 100 sq ft", run_id="r1", specialist=PARKING)
+
+    hit = cache.get("how many parking spaces are required for a restaurant")
+    assert hit["answer"] == "1 per 100 sq ft" and hit["run_id"] == "r1"
+    assert hit["matched_question"] == "How many parking spaces does a restaurant need?"
+    assert "similarity" not in cache.get("How many parking spaces does a restaurant need")  # exact hit
+    assert cache.get("how many parking spaces are required for a restaurant", specialist=SIGNAGE) is None
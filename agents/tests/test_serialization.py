@@ -0,0 +1,75 @@
+import enum
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any
+
+from agents import serialization
+from agents.structures import AnswerWithCitations, Citation
+
+
+@dataclass
+class _Agent:
+    name: str
+    tools: list[Any] = field(default_factory=list)
+
+
+class _Specialist(_Agent):
+    pass
+
+
+@dataclass
+class _Item:
+    agent: _Agent
+    raw_item: Any
+
+
+@dataclass
+class _Response:
+    output: list[Any]
+    response_id: str
+
+
+class _Model:
+    """Quacks like a pydantic model."""
+
+    def __init__(self, **data):
+        self.data = data
+
+    def model_dump(self, *, mode="python", exclude_none=False, exclude=None):
+        return {k: v for k, v in self.data.items() if k not in (exclude or ()) and not (exclude_none and v is None)}
+
+
+class _Color(enum.Enum):
+    RED = "red"
+
+
+def test_to_primitive_walks_dataclasses_models_and_registered_types():
+    serialization.register(_Agent, lambda agent: agent.name)
+    payload = [
+        _Item(_Specialist("parking", tools=[object()]), _Model(id="msg_1", text="hi", status=None)),
+        {"answer": AnswerWithCitations("42", [Citation("§1", "2")]), 3: (_Color.RED, datetime(2025, 5, 1))},
+    ]
+
+    assert serialization.to_primitive(payload) == [
+        {"agent": "parking", "raw_item": {"id": "msg_1", "text": "hi"}},
+        {
+            "answer": {"answer": "42", "citations": [{"section": "§1", "page": "2"}]},
+            "3": ["red", "2025-05-01T00:00:00"],
+        },
+    ]
+
+
+def test_select_drops_bulky_fields():
+    response = _Response(output=[_Model(id="msg_1")], response_id="resp_1")
+
+    assert serialization.select(response, ("output",)) == {"response_id": "resp_1"}
+    assert serialization.select(_Model(id="x", output=[1]), ("output",)) == {"id": "x"}
+
+
+def test_dumps_is_compact_and_round_trips():
+    data = {"q": "Zoning – C2", "n": [1, 2.5, None, True]}
+    encoded = serialization.dumps(data)
+
+    assert b"\n" not in encoded and b": " not in encoded
+    assert serialization.loads(encoded) == data
+    assert serialization.loads(serialization.dumps({"when": object}))["when"] == str(object)
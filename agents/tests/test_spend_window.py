@@ -0,0 +1,50 @@
+import sqlite3
+from datetime import datetime, timezone
+
+import pytest
+
+from agents.spend_window import SpendWindow
+
+_T0 = 1_750_000_020.0  # whole minute
+
+
+def _ts(epoch: float) -> str:
+    return datetime.fromtimestamp(epoch, timezone.utc).replace(tzinfo=None).isoformat()
+
+
+def _connect(path) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute("CREATE TABLE IF NOT EXISTS usage (ts TEXT NOT NULL, prompt_tokens INTEGER NOT NULL, "
+                 "completion_tokens INTEGER NOT NULL, cost_usd REAL NOT NULL)")
+    return conn
+
+
+def test_buckets_expire_as_time_advances():
+    window = SpendWindow(window_seconds=300, bucket_seconds=60)
+    window.add(1.0, _T0)
+    window.add(2.0, _T0 + 120)
+    window.add(9.0, _T0 - 3600)  # already outside the window
+
+    assert window.total(_T0 + 120) == pytest.approx(3.0)
+    # The extra bucket keeps the oldest minute until all of it is out of range.
+    assert window.total(_T0 + 359) == pytest.approx(3.0)
+    assert window.total(_T0 + 360) == pytest.approx(2.0)
+    assert window.total(_T0 + 120 + 3600) == 0.0  # jump past the whole ring
+
+
+def test_sync_picks_up_rows_committed_by_another_connection(tmp_path):
+    db = tmp_path / "usage.sqlite3"
+    ours, theirs = _connect(db), _connect(db)
+    ours.execute("INSERT INTO usage VALUES (?, 10, 5, 0.5)", (_ts(_T0 - 86400 * 2),))  # too old to count
+    ours.execute("INSERT INTO usage VALUES (?, 10, 5, 0.25)", (_ts(_T0 - 60),))
+
+    window = SpendWindow(window_seconds=86400, bucket_seconds=60)
+    window.seed(ours, now=_T0)
+    assert window.total(_T0) == pytest.approx(0.25)
+
+    theirs.execute("INSERT INTO usage VALUES (?, 10, 5, 1.0)", (_ts(_T0),))  # another worker
+    assert window.sync(ours) == 1
+    assert window.total(_T0) == pytest.approx(1.25)
+    assert window.sync(ours) == 0  # rows are applied once
+    ours.close()
+    theirs.close()
@@ -0,0 +1,68 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from agents.streaming import AnswerTextStream, format_sse, run_events
+
+
+def _feed_all(stream: AnswerTextStream, chunks) -> str:
+    return "".join(stream.feed(c) for c in chunks)
+
+
+def test_answer_text_is_decoded_from_partial_json():
+    payload = json.dumps({"answer": 'Use "C2" rules:\n1 space – per 100 ft² 😀', "citations": [{"section": "§1"}]})
+    stream = AnswerTextStream()
+
+    # Every split point, including inside escapes and surrogate pairs.
+    assert _feed_all(stream, payload) == 'Use "C2" rules:\n1 space – per 100 ft² 😀'
+    for size in (2, 3, 7):
+        stream.reset()
+        assert _feed_all(stream, [payload[i : i + size] for i in range(0, len(payload), size)]).endswith("😀")
+
+
+def test_plain_text_passes_through():
+    stream = AnswerTextStream()
+    assert _feed_all(stream, ["  ", "Hello", " world"]) == "  Hello world"
+
+
+def test_format_sse():
+    assert format_sse("delta", {"text": "a\nb"}) in (
+        b'event: delta\ndata: {"text":"a\\nb"}\n\n',
+        b'event: delta\ndata: {"text": "a\\nb"}\n\n',
+    )
+
+
+@pytest.mark.asyncio
+async def test_run_events_reports_handoff_tools_and_text():
+    orchestrator, parking = SimpleNamespace(name="orchestrator"), SimpleNamespace(name="parking")
+
+    def raw(type_, **kw):
+        return SimpleNamespace(type="raw_response_event", data=SimpleNamespace(type=type_, **kw))
+
+    events = [
+        SimpleNamespace(type="agent_updated_stream_event", new_agent=orchestrator),
+        raw("response.created"),
+        SimpleNamespace(type="agent_updated_stream_event", new_agent=parking),
+        raw("response.created"),
+        SimpleNamespace(
+            type="run_item_stream_event", name="tool_called", item=SimpleNamespace(raw_item={"type": "file_search_call"})
+        ),
+        raw("response.created"),
+        raw("response.output_text.delta", delta='{"answer": "One sp'),
+        raw("response.output_text.delta", delta='ace.", "citations": []}'),
+    ]
+
+    async def stream_events():
+        for event in events:
+            yield event
+
+    result = SimpleNamespace(current_agent=orchestrator, stream_events=stream_events)
+    out = [e async for e in run_events(result)]
+
+    assert out == [
+        ("handoff", {"from": "orchestrator", "to": "parking"}),
+        ("tool", {"agent": "parking", "name": "file_search_call"}),
+        ("delta", {"text": "One sp"}),
+        ("delta", {"text": "ace."}),
+    ]
@@ -4,6 +4,7 @@ import sqlite3
 import pytest
 
 from agents import tools as tools_mod
+from agents.qa_log_writer import get_writer
 from agents.tools import log_qa
 
 
@@ -13,6 +14,7 @@ async def test_log_qa_creates_db(tmp_path, monkeypatch):
     monkeypatch.setattr(tools_mod, "_RUN_LOGS_DIR", tmp_path)
 
     await log_qa("parking", "test q", "test a")
+    assert get_writer().flush(timeout=5)
 
     db_path = os.path.join(tmp_path, "parking.sqlite3")
     assert os.path.exists(db_path)
@@ -0,0 +1,60 @@
+import pytest
+
+from agents import ttl_cache
+from agents.ttl_cache import MISSING, TTLCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ttl_cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_entries_expire_after_their_own_ttl(clock):
+    evicted = []
+    cache = TTLCache(10, on_evict=evicted.append)
+    cache.set("short", "a", 5)
+    cache.set("long", "b", 60)
+
+    clock[0] += 10
+    assert cache.get("short") is MISSING
+    assert cache.get("long") == "b"
+    assert evicted == ["expired"]
+    assert len(cache) == 1
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    evicted = []
+    cache = TTLCache(2, on_evict=evicted.append)
+    cache.set("a", 1, 60)
+    cache.set("b", 2, 60)
+    cache.get("a")  # "b" is now the coldest
+    cache.set("c", 3, 60)
+
+    assert cache.get("b") is MISSING
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert evicted == ["capacity"]
+
+
+def test_capacity_eviction_of_an_expired_entry_counts_as_expired(clock):
+    evicted = []
+    cache = TTLCache(1, on_evict=evicted.append)
+    cache.set("old", 1, 1)
+    clock[0] += 5
+    cache.set("new", 2, 60)
+
+    assert evicted == ["expired"]
+    assert cache.get("new") == 2
+
+
+def test_falsy_values_are_cached_and_missing_is_distinct(clock):
+    cache = TTLCache(4)
+    cache.set("none", None, 60)  # negative result, e.g. an unknown parcel
+    cache.set("empty", "", 60)
+
+    assert cache.get("none") is None
+    assert cache.get("empty") == ""
+    assert cache.get("absent") is MISSING
+    assert (cache.hits, cache.misses) == (2, 1)
+    assert cache.hit_ratio == pytest.approx(2 / 3)
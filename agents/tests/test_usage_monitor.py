@@ -0,0 +1,101 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from gpc_agents.src.agents import OutputGuardrailTripwireTriggered
+
+from agents import usage_monitor
+from agents.budget_ledger import Reservation
+
+
+class _RecordingLedger:
+    reservation_ttl = 900.0
+
+    def __init__(self):
+        self.commits = []
+        self.released = []
+        self.extended = []
+
+    def reserve(self, amount):
+        return Reservation("r1", amount)
+
+    def commit(self, res, prompt_tokens, completion_tokens, cost_usd, events=()):
+        self.commits.append((res, prompt_tokens, completion_tokens, list(events)))
+
+    def release(self, res):
+        self.released.append(res)
+
+    def extend(self, res):
+        self.extended.append(res)
+        return True
+
+
+@pytest.fixture
+def ledger(monkeypatch):
+    ledger = _RecordingLedger()
+    monkeypatch.setattr(usage_monitor, "_ledger", ledger)
+    return ledger
+
+
+def _response(prompt, completion, *item_ids):
+    return SimpleNamespace(prompt_tokens=prompt, completion_tokens=completion, output=[{"id": i} for i in item_ids])
+
+
+@pytest.mark.asyncio
+async def test_failed_run_still_commits_its_usage(ledger, monkeypatch):
+    agent = SimpleNamespace(name="parking", model="gpt-4o-mini")
+    exc = OutputGuardrailTripwireTriggered(None)
+    exc.run_data = SimpleNamespace(new_items=[], raw_responses=[_response(120, 30)], last_agent=agent)
+
+    async def run(**kwargs):
+        raise exc
+
+    monkeypatch.setattr(usage_monitor, "Runner", SimpleNamespace(run=run))
+    with pytest.raises(OutputGuardrailTripwireTriggered):
+        await usage_monitor.run_with_budget(starting_agent=agent, input="q")
+
+    [(res, prompt, completion, events)] = ledger.commits
+    assert (res.id, prompt, completion) == ("r1", 120, 30)
+    assert [e.agent for e in events] == ["parking"]
+    assert ledger.released == [res]
+
+
+def test_usage_events_attribute_each_response_to_its_agent():
+    orchestrator = SimpleNamespace(name="orchestrator", model="gpt-4o-mini")
+    parking = SimpleNamespace(name="parking", model=SimpleNamespace(model="gpt-4.1"))
+    result = SimpleNamespace(
+        new_items=[
+            SimpleNamespace(raw_item={"id": "call_1"}, agent=orchestrator),
+            SimpleNamespace(raw_item=SimpleNamespace(id="msg_1"), agent=parking),
+            SimpleNamespace(raw_item=None, agent=orchestrator),  # e.g. a handoff output without an id
+        ],
+        raw_responses=[
+            _response(1000, 50, "call_1"),
+            _response(2000, 400, "rs_1", "msg_1"),  # reasoning item first, then the message
+            _response(500, 20),  # no matching item: the final message
+        ],
+        last_agent=parking,
+    )
+
+    events = usage_monitor.usage_events(result)
+
+    assert [(e.agent, e.model, e.prompt_tokens, e.completion_tokens) for e in events] == [
+        ("orchestrator", "gpt-4o-mini", 1000, 50),
+        ("parking", "gpt-4.1", 2000, 400),
+        ("parking", "gpt-4.1", 500, 20),
+    ]
+    assert events[0].cost_usd == pytest.approx((1000 * 0.00015 + 50 * 0.0006) / 1000)
+    assert events[1].cost_usd == pytest.approx((2000 * 0.002 + 400 * 0.008) / 1000)
+
+
+@pytest.mark.asyncio
+async def test_batch_reservation_is_extended_until_the_batch_ends(ledger):
+    ledger.reservation_ttl = 0.06
+    async with usage_monitor.batch_reservation(["q1", "q2"]) as res:
+        await asyncio.sleep(0.1)  # longer than the TTL
+    extended = len(ledger.extended)
+    await asyncio.sleep(0.05)
+
+    assert extended >= 2 and all(r is res for r in ledger.extended)
+    assert len(ledger.extended) == extended  # stopped with the batch
+    assert ledger.released == [res]
@@ -1,21 +1,34 @@
+import asyncio
+import logging
+import math
 import os
+import random
 import sqlite3
 import json
+import uuid
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Any
+from typing import Any, Awaitable, Callable
 
 import httpx
 from dotenv import load_dotenv
-import redis
+import redis.asyncio as aioredis
 import time
 from functools import lru_cache
-from prometheus_client import Counter
+from prometheus_client import Counter, Gauge
 
 from gpc_agents.src.agents import function_tool, CodeInterpreterTool, WebSearchTool
 
+from .parcel_snapshot import ParcelSnapshot, open_snapshot
+from .qa_log_writer import QueueFullError, connect as connect_qa_log, get_writer as get_qa_writer
+from .qa_log_writer import write_rows as write_qa_rows
+from .ttl_cache import MISSING, TTLCache
+
 # Load .env if present – keeps credentials out of Git
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # ---------------------------------------------------------------------------
 # Helpers
 # ---------------------------------------------------------------------------
@@ -26,42 +39,519 @@ _RUN_LOGS_DIR = os.path.join(_DATA_DIR, "run_logs")
 os.makedirs(_RUN_LOGS_DIR, exist_ok=True)
 
 REDIS_URL = os.getenv("REDIS_URL")
-if REDIS_URL:
-    _redis = redis.Redis.from_url(REDIS_URL)
-else:
-    _redis = None
+# Like the HTTP client, the Redis pool is bound to the loop it was created on.
+_redis: aioredis.Redis | None = None
+_redis_loop: asyncio.AbstractEventLoop | None = None
+
+# Shared GIS HTTP client – keep-alive pooling instead of a TCP+TLS handshake per lookup.
+_GIS_TIMEOUT = float(os.getenv("EBR_GIS_TIMEOUT", "10"))
+_GIS_CONNECT_TIMEOUT = float(os.getenv("EBR_GIS_CONNECT_TIMEOUT", "5"))
+_GIS_MAX_CONNECTIONS = int(os.getenv("EBR_GIS_MAX_CONNECTIONS", "20"))
+_GIS_MAX_KEEPALIVE = int(os.getenv("EBR_GIS_MAX_KEEPALIVE", "10"))
+_GIS_KEEPALIVE_EXPIRY = float(os.getenv("EBR_GIS_KEEPALIVE_EXPIRY", "30"))
+# Max parcel IDs per ``PARCEL_ID IN (...)`` query; keeps the URL under service limits.
+_GIS_MAX_IDS_PER_QUERY = int(os.getenv("EBR_GIS_MAX_IDS_PER_QUERY", "100"))
+
+_http_client: httpx.AsyncClient | None = None
+_http_client_loop: asyncio.AbstractEventLoop | None = None
+
+# Offline snapshot (see parcel_snapshot) consulted before cache/live lookups: "auto" or "off".
+_SNAPSHOT_MODE = os.getenv("PARCEL_SNAPSHOT_MODE", "auto")
+_snapshot: ParcelSnapshot | None = None
+_snapshot_checked_at = float("-inf")
+_SNAPSHOT_RECHECK_SECONDS = 300
+
+# Single-flight: concurrent misses for the same key share one upstream request.
+_inflight: dict[str, asyncio.Task] = {}
+# Cross-worker coalescing via a short Redis lock; waiters poll the cache.
+_LOCK_TTL_MS = int(os.getenv("PARCEL_LOCK_TTL_MS", str(int(_GIS_TIMEOUT * 1000) + 1000)))
+_LOCK_POLL_SECONDS = float(os.getenv("PARCEL_LOCK_POLL_SECONDS", "0.05"))
+_RELEASE_LOCK_LUA = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
 
 _TTL_SECONDS = 3600
+# Unknown parcels are remembered briefly so bad IDs don't hammer the GIS service.
+_NEGATIVE_TTL_SECONDS = int(os.getenv("PARCEL_CACHE_NEGATIVE_TTL", "300"))
+_LOCAL_CACHE_MAX_ENTRIES = int(os.getenv("PARCEL_CACHE_MAX_ENTRIES", "10000"))
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """Freshness rules for one key prefix (the part of the key before the first ``:``).
+
+    An entry is fresh for ``ttl`` seconds, then served stale for up to ``stale`` more
+    seconds while it is refreshed in the background.  ``beta`` scales probabilistic
+    early refresh (XFetch): hot keys start refreshing shortly before ``ttl`` elapses,
+    spread out in proportion to how long the value took to compute; 0 disables it.
+    """
+
+    ttl: float
+    stale: float = 0.0
+    beta: float = 1.0
+
+
+def _policy_from_env(prefix: str, default: CachePolicy) -> CachePolicy:
+    # e.g. CACHE_POLICY_PARCEL="3600,600,1.0" → ttl, stale window, beta
+    raw = os.getenv(f"CACHE_POLICY_{prefix.upper().replace('-', '_')}")
+    if not raw:
+        return default
+    parts = [float(p) for p in raw.split(",")]
+    return CachePolicy(*parts)
+
+
+_CACHE_POLICIES: dict[str, CachePolicy] = {
+    "parcel": _policy_from_env("parcel", CachePolicy(ttl=_TTL_SECONDS, stale=600)),
+}
+_DEFAULT_POLICY = CachePolicy(ttl=_TTL_SECONDS)
+_NEGATIVE_POLICY = _policy_from_env("parcel-negative", CachePolicy(ttl=_NEGATIVE_TTL_SECONDS, stale=0, beta=0))
+
+
+def _policy_for(key: str) -> CachePolicy:
+    return _CACHE_POLICIES.get(key.split(":", 1)[0], _DEFAULT_POLICY)
 
-_local_cache: dict[str, tuple[float, str]] = {}
+
+@dataclass(frozen=True)
+class _CacheEntry:
+    value: str
+    fresh_until: float  # epoch seconds – shared with other workers through Redis
+    delta: float = 0.0  # seconds the value took to fetch; drives early refresh
+
+    def is_stale(self, now: float) -> bool:
+        return now >= self.fresh_until
+
+    def should_refresh(self, beta: float, now: float) -> bool:
+        if self.is_stale(now):
+            return True
+        if beta <= 0 or self.delta <= 0:
+            return False
+        return now - self.delta * beta * math.log(1.0 - random.random()) >= self.fresh_until
+
+    def encode(self) -> str:
+        return json.dumps({"v": self.value, "f": self.fresh_until, "d": self.delta})
+
+    @classmethod
+    def decode(cls, raw: str) -> "_CacheEntry":
+        if raw.startswith("{"):
+            data = json.loads(raw)
+            return cls(data["v"], data["f"], data.get("d", 0.0))
+        # Plain value written before stale-while-revalidate existed – treat as fresh.
+        return cls(raw, math.inf)
+
+
+# Background refreshes started for stale / early-expiring entries.
+_background: set[asyncio.Task] = set()
+
+# Stored in place of a zoning code for parcels the GIS service does not know.
+_NOT_FOUND = "\x00not-found"
 
 # Prometheus metrics
 CACHE_HIT = Counter("redis_cache_hit_total", "Parcel zoning cache hits")
 CACHE_MISS = Counter("redis_cache_miss_total", "Parcel zoning cache misses")
+LOCAL_CACHE_EVICTIONS = Counter(
+    "parcel_local_cache_evictions_total", "Parcel zoning in-proc cache evictions", ["reason"]
+)
+LOCAL_CACHE_SIZE = Gauge("parcel_local_cache_size", "Entries in the parcel zoning in-proc cache")
+SNAPSHOT_HIT = Counter("parcel_snapshot_hit_total", "Parcel zoning answered from the offline snapshot")
+SNAPSHOT_STALE = Gauge("parcel_snapshot_stale", "1 when the offline parcel snapshot is older than its max age")
+LOCAL_CACHE_HIT_RATIO = Gauge("parcel_local_cache_hit_ratio", "Hit ratio of the parcel zoning in-proc cache")
+QA_LOG_BACKPRESSURE = Counter("qa_log_backpressure_total", "log_qa rows written inline because the queue was full")
+QA_LOG_QUEUE_DEPTH = Gauge("qa_log_queue_depth", "Rows waiting for the background qa_log writer")
+QA_LOG_QUEUE_DEPTH.set_function(lambda: get_qa_writer().depth)
+CACHE_STALE_SERVED = Counter("parcel_cache_stale_served_total", "Stale parcel zoning entries served while refreshing")
+CACHE_REFRESH = Counter("parcel_cache_background_refresh_total", "Background parcel cache refreshes", ["reason"])
+
+_local_cache: TTLCache[_CacheEntry] = TTLCache(
+    _LOCAL_CACHE_MAX_ENTRIES,
+    on_evict=lambda reason: LOCAL_CACHE_EVICTIONS.labels(reason=reason).inc(),
+)
+LOCAL_CACHE_SIZE.set_function(lambda: len(_local_cache))
+LOCAL_CACHE_HIT_RATIO.set_function(lambda: _local_cache.hit_ratio)
 
 
-def _cache_get(key: str) -> str | None:
-    if _redis:
-        val = _redis.get(key)
+async def _cache_get(key: str) -> _CacheEntry | None:
+    redis_client = _get_redis()
+    if redis_client:
+        try:
+            val = await redis_client.get(key)
+        except aioredis.RedisError:
+            logger.warning("parcel cache read failed; using the local cache", exc_info=True)
+            val = None
         if val:
             CACHE_HIT.inc()
-            return val.decode()
-    if key in _local_cache:
-        ts, v = _local_cache[key]
-        if time.time() - ts < _TTL_SECONDS:
-            CACHE_HIT.inc()
-            return v
-        _local_cache.pop(key, None)
+            return _CacheEntry.decode(val.decode())
+    v = _local_cache.get(key)
+    if v is not MISSING:
+        CACHE_HIT.inc()
+        return v
     CACHE_MISS.inc()
     return None
 
 
-def _cache_set(key: str, value: str):
-    if _redis:
-        _redis.setex(key, _TTL_SECONDS, value)
+async def _cache_set(key: str, value: str, *, delta: float = 0.0, policy: CachePolicy | None = None):
+    policy = policy or _policy_for(key)
+    entry = _CacheEntry(value, time.time() + policy.ttl, delta)
+    # Physically keep the entry through the stale window; freshness is in the entry.
+    expire = policy.ttl + policy.stale
+    redis_client = _get_redis()
+    if redis_client:
+        try:
+            await redis_client.setex(key, math.ceil(expire), entry.encode())
+            return
+        except aioredis.RedisError:
+            logger.warning("parcel cache write failed; using the local cache", exc_info=True)
+    _local_cache.set(key, entry, expire)
+
+
+async def _cache_get_many(keys: list[str]) -> dict[str, _CacheEntry]:
+    """Bulk variant of ``_cache_get`` (single Redis ``MGET``); returns only the hits."""
+
+    found: dict[str, _CacheEntry] = {}
+    redis_client = _get_redis()
+    if redis_client and keys:
+        try:
+            values = await redis_client.mget(keys)
+        except aioredis.RedisError:
+            logger.warning("parcel cache read failed; using the local cache", exc_info=True)
+            values = []
+        for key, val in zip(keys, values):
+            if val:
+                found[key] = _CacheEntry.decode(val.decode())
+    for key in keys:
+        if key not in found:
+            v = _local_cache.get(key)
+            if v is not MISSING:
+                found[key] = v
+    CACHE_HIT.inc(len(found))
+    CACHE_MISS.inc(len(keys) - len(found))
+    return found
+
+
+async def _cache_set_many(items: dict[str, tuple[str, CachePolicy]], delta: float = 0.0) -> None:
+    """Bulk variant of ``_cache_set``; ``items`` maps key -> (value, policy)."""
+
+    now = time.time()
+    entries = {key: (_CacheEntry(value, now + p.ttl, delta), p.ttl + p.stale) for key, (value, p) in items.items()}
+    redis_client = _get_redis()
+    if redis_client:
+        try:
+            async with redis_client.pipeline(transaction=False) as pipe:
+                for key, (entry, expire) in entries.items():
+                    pipe.setex(key, math.ceil(expire), entry.encode())
+                await pipe.execute()
+            return
+        except aioredis.RedisError:
+            logger.warning("parcel cache write failed; using the local cache", exc_info=True)
+    for key, (entry, expire) in entries.items():
+        _local_cache.set(key, entry, expire)
+
+
+def _refresh_in_background(reason: str, refresh: Callable[[], Awaitable[Any]]) -> None:
+    """Fire-and-forget cache refresh; failures are logged and the stale value stays."""
+
+    CACHE_REFRESH.labels(reason=reason).inc()
+    task = asyncio.ensure_future(refresh())
+    _background.add(task)
+    task.add_done_callback(_background_done)
+
+
+def _background_done(task: asyncio.Task) -> None:
+    _background.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("background parcel cache refresh failed: %r", task.exception())
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    """Return the process-wide GIS client, creating it on first use.
+
+    Pooled connections are bound to the event loop that opened them, so a new
+    client is created if we are called from a different loop (e.g. successive
+    ``asyncio.run`` calls in the CLI).
+    """
+
+    global _http_client, _http_client_loop
+    loop = asyncio.get_running_loop()
+    if _http_client is None or _http_client.is_closed or _http_client_loop is not loop:
+        if _http_client is not None and not _http_client.is_closed:
+            _close_replaced(_http_client)
+        _http_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(_GIS_TIMEOUT, connect=_GIS_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=_GIS_MAX_CONNECTIONS,
+                max_keepalive_connections=_GIS_MAX_KEEPALIVE,
+                keepalive_expiry=_GIS_KEEPALIVE_EXPIRY,
+            ),
+        )
+        _http_client_loop = loop
+    return _http_client
+
+
+def _get_redis() -> aioredis.Redis | None:
+    """Return the Redis client for the running loop (None without ``REDIS_URL``)."""
+
+    global _redis, _redis_loop
+    if not REDIS_URL:
+        return None
+    loop = asyncio.get_running_loop()
+    if _redis is None or _redis_loop is not loop:
+        if _redis is not None:
+            _close_replaced(_redis)
+        _redis = aioredis.Redis.from_url(REDIS_URL)
+        _redis_loop = loop
+    return _redis
+
+
+def _close_replaced(client: Any) -> None:
+    # The client's loop is usually closed already (an earlier ``asyncio.run``);
+    # closing is best effort so its sockets are not left to the GC.
+    async def close() -> None:
+        try:
+            await client.aclose()
+        except Exception:  # noqa: BLE001 – transports of a dead loop may refuse
+            logger.debug("could not close replaced client", exc_info=True)
+
+    task = asyncio.ensure_future(close())
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+
+
+async def aclose_clients() -> None:
+    """Close pooled HTTP/Redis connections – call from the app's shutdown hook."""
+
+    global _http_client, _redis
+    for task in list(_background):
+        task.cancel()
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
+
+
+async def _single_flight(key: str, fetch: Callable[[], Awaitable[str]]) -> str:
+    """Run ``fetch`` once per key at a time; concurrent callers await the same task."""
+
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(fetch())
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    # shield: one caller being cancelled must not cancel the shared request
+    return await asyncio.shield(task)
+
+
+async def _with_redis_lock(key: str, fetch: Callable[[], Awaitable[str]]) -> str:
+    """Let only one uvicorn worker fetch ``key``; the others wait for its cache write."""
+
+    redis_client = _get_redis()
+    if not redis_client:
+        return await fetch()
+
+    lock_key = f"lock:{key}"
+    token = uuid.uuid4().hex
+    try:
+        acquired = await redis_client.set(lock_key, token, nx=True, px=_LOCK_TTL_MS)
+    except aioredis.RedisError:
+        logger.warning("parcel lock unavailable; fetching without it", exc_info=True)
+        return await fetch()
+    if acquired:
+        try:
+            return await fetch()
+        finally:
+            try:
+                await redis_client.eval(_RELEASE_LOCK_LUA, 1, lock_key, token)
+            except aioredis.RedisError:
+                logger.warning("could not release %s; it expires after %d ms", lock_key, _LOCK_TTL_MS)
+
+    deadline = time.monotonic() + _LOCK_TTL_MS / 1000
+    try:
+        while time.monotonic() < deadline:
+            await asyncio.sleep(_LOCK_POLL_SECONDS)
+            val = await redis_client.get(key)
+            if val:
+                return _CacheEntry.decode(val.decode()).value
+            if not await redis_client.exists(lock_key):
+                break
+    except aioredis.RedisError:
+        logger.warning("parcel lock wait failed; fetching without it", exc_info=True)
+    # Holder failed or timed out without caching – fetch ourselves.
+    return await fetch()
+
+
+def _get_snapshot() -> ParcelSnapshot | None:
+    """Return the offline snapshot if one is imported and fresh, else ``None``.
+
+    A missing DB is re-checked every few minutes so an import during operation is
+    picked up without a restart; a stale snapshot is bypassed until refreshed.
+    """
+
+    global _snapshot, _snapshot_checked_at
+    if _SNAPSHOT_MODE == "off":
+        return None
+    if _snapshot is None and time.monotonic() - _snapshot_checked_at > _SNAPSHOT_RECHECK_SECONDS:
+        _snapshot_checked_at = time.monotonic()
+        _snapshot = open_snapshot()
+    if _snapshot is None or _snapshot.is_stale():
+        SNAPSHOT_STALE.set(1 if _snapshot is not None else 0)
+        return None
+    SNAPSHOT_STALE.set(0)
+    return _snapshot
+
+
+def _gis_endpoint() -> str:
+    # Example endpoint – replace with the authoritative API when available.
+    return os.getenv(
+        "EBR_GIS_PARCEL_ENDPOINT",
+        "https://gis.brla.gov/server/rest/services/Parish_Boundary/MapServer/0/query",
+    )
+
+
+def _sql_quote(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+async def _fetch_parcel_zoning(parcel_id: str) -> str:
+    """Query the GIS service for one parcel and cache the outcome (zoning or ``_NOT_FOUND``)."""
+
+    params = {
+        "where": f"PARCEL_ID={_sql_quote(parcel_id)}",
+        "outFields": "ZONING",
+        "f": "json",
+    }
+    started = time.perf_counter()
+    resp = await _get_http_client().get(_gis_endpoint(), params=params)
+    resp.raise_for_status()
+    data: dict[str, Any] = resp.json()
+
+    try:
+        zoning = data["features"][0]["attributes"]["ZONING"].strip()
+    except (KeyError, IndexError, AttributeError):
+        await _cache_set(f"parcel:{parcel_id}", _NOT_FOUND, policy=_NEGATIVE_POLICY)
+        return _NOT_FOUND
+
+    await _cache_set(f"parcel:{parcel_id}", zoning, delta=time.perf_counter() - started)
+    return zoning
+
+
+async def lookup_parcel_zoning(parcel_id: str) -> str:
+    """Async core of ``get_parcel_zoning``; usable directly from application code."""
+
+    snapshot = _get_snapshot()
+    if snapshot is not None:
+        zoning = snapshot.get(parcel_id)
+        if zoning:
+            SNAPSHOT_HIT.inc()
+            return zoning
+
+    cache_key = f"parcel:{parcel_id}"
+
+    def fetch() -> Awaitable[str]:
+        return _single_flight(cache_key, lambda: _with_redis_lock(cache_key, lambda: _fetch_parcel_zoning(parcel_id)))
+
+    entry = await _cache_get(cache_key)
+    if entry is None:
+        zoning = await fetch()
     else:
-        _local_cache[key] = (time.time(), value)
-    CACHE_MISS.inc()
+        zoning = entry.value
+        now = time.time()
+        refresh = zoning != _NOT_FOUND and cache_key not in _inflight
+        if refresh and entry.should_refresh(_policy_for(cache_key).beta, now):
+            if entry.is_stale(now):
+                CACHE_STALE_SERVED.inc()
+            _refresh_in_background("stale" if entry.is_stale(now) else "early", fetch)
+    if zoning == _NOT_FOUND:
+        raise ValueError(f"Parcel {parcel_id} not found or zoning unavailable")
+    return zoning
+
+
+async def _fetch_zoning_chunk(parcel_ids: list[str]) -> dict[str, str]:
+    params = {
+        "where": f"PARCEL_ID IN ({', '.join(_sql_quote(p) for p in parcel_ids)})",
+        "outFields": "PARCEL_ID,ZONING",
+        "f": "json",
+    }
+    resp = await _get_http_client().get(_gis_endpoint(), params=params)
+    resp.raise_for_status()
+    data: dict[str, Any] = resp.json()
+
+    found: dict[str, str] = {}
+    for feature in data.get("features", []):
+        attrs = feature.get("attributes", {})
+        zoning = attrs.get("ZONING")
+        if attrs.get("PARCEL_ID") is not None and zoning:
+            found[str(attrs["PARCEL_ID"])] = zoning.strip()
+    return found
+
+
+async def _fetch_and_cache_batch(parcel_ids: list[str]) -> dict[str, str | None]:
+    """Fetch ``parcel_ids`` in chunked ``IN`` queries and cache hits and negatives."""
+
+    chunks = [parcel_ids[i : i + _GIS_MAX_IDS_PER_QUERY] for i in range(0, len(parcel_ids), _GIS_MAX_IDS_PER_QUERY)]
+    started = time.perf_counter()
+    fetched: dict[str, str] = {}
+    for part in await asyncio.gather(*(_fetch_zoning_chunk(c) for c in chunks)):
+        fetched.update(part)
+    delta = time.perf_counter() - started
+
+    result: dict[str, str | None] = {}
+    to_cache: dict[str, tuple[str, CachePolicy]] = {}
+    for pid in parcel_ids:
+        zoning = fetched.get(pid)
+        result[pid] = zoning
+        key = f"parcel:{pid}"
+        to_cache[key] = (_NOT_FOUND, _NEGATIVE_POLICY) if zoning is None else (zoning, _policy_for(key))
+    await _cache_set_many(to_cache, delta)
+    return result
+
+
+async def lookup_parcel_zoning_batch(parcel_ids: list[str]) -> dict[str, str | None]:
+    """Resolve many parcels with one cache round-trip and one GIS query per chunk.
+
+    Returns ``{parcel_id: zoning}`` in input order; unknown parcels map to ``None``.
+    """
+
+    ids = list(dict.fromkeys(parcel_ids))
+    result: dict[str, str | None] = {}
+    pending = ids
+    snapshot = _get_snapshot()
+    if snapshot is not None:
+        result.update(snapshot.get_many(ids))
+        SNAPSHOT_HIT.inc(len(result))
+        pending = [pid for pid in ids if pid not in result]
+
+    cached = await _cache_get_many([f"parcel:{p}" for p in pending])
+    misses: list[str] = []
+    refresh: list[str] = []
+    now = time.time()
+    for pid in pending:
+        key = f"parcel:{pid}"
+        entry = cached.get(key)
+        if entry is None:
+            misses.append(pid)
+            continue
+        result[pid] = None if entry.value == _NOT_FOUND else entry.value
+        if result[pid] is not None and key not in _inflight and entry.should_refresh(_policy_for(key).beta, now):
+            if entry.is_stale(now):
+                CACHE_STALE_SERVED.inc()
+            refresh.append(pid)
+    if refresh:
+        _refresh_in_background("batch", lambda: _fetch_and_cache_batch(refresh))
+
+    # Join lookups already in flight for some of the misses instead of re-fetching them.
+    joined = {pid: _inflight[f"parcel:{pid}"] for pid in misses if f"parcel:{pid}" in _inflight}
+    if joined:
+        misses = [pid for pid in misses if pid not in joined]
+        for pid, value in zip(joined, await asyncio.gather(*(asyncio.shield(t) for t in joined.values()))):
+            result[pid] = None if value == _NOT_FOUND else value
+
+    if misses:
+        result.update(await _fetch_and_cache_batch(misses))
+
+    return {pid: result[pid] for pid in ids}
 
 
 # ---------------------------------------------------------------------------
@@ -80,63 +570,48 @@ def log_qa(domain: str, question: str, answer: str) -> None:  # noqa: D401
     """
 
     db_path = os.path.join(_RUN_LOGS_DIR, f"{domain}.sqlite3")
-    conn = sqlite3.connect(db_path)
-    conn.execute(
-        """
-        CREATE TABLE IF NOT EXISTS qa_log (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            question TEXT NOT NULL,
-            answer TEXT NOT NULL,
-            timestamp TEXT NOT NULL
-        )
-        """
-    )
-    conn.execute(
-        "INSERT INTO qa_log (question, answer, timestamp) VALUES (?, ?, ?)",
-        (question, answer, datetime.utcnow().isoformat()),
-    )
-    conn.commit()
-    conn.close()
+    timestamp = datetime.utcnow().isoformat()
+    try:
+        # Queued for the background writer, which batches rows into group commits.
+        get_qa_writer().submit(db_path, question, answer, timestamp)
+    except QueueFullError:
+        # Back-pressure: the writer is behind – write inline rather than drop the row.
+        QA_LOG_BACKPRESSURE.inc()
+        conn = connect_qa_log(db_path)
+        try:
+            write_qa_rows(conn, [(question, answer, timestamp)])
+        finally:
+            conn.close()
 
 
 @function_tool
-def get_parcel_zoning(parcel_id: str) -> str:  # noqa: D401
+async def get_parcel_zoning(parcel_id: str) -> str:  # noqa: D401
     """Look up zoning designation for a given East Baton Rouge parcel.
 
     This leverages the public EBR GIS REST service. Returns the zoning code string
     (e.g. "C2", "A1") or raises an error if not found.
     """
 
-    cache_key = f"parcel:{parcel_id}"
-    cached = _cache_get(cache_key)
-    if cached:
-        return cached
+    return await lookup_parcel_zoning(parcel_id)
 
-    # Example endpoint – replace with the authoritative API when available.
-    api = os.getenv(
-        "EBR_GIS_PARCEL_ENDPOINT",
-        "https://gis.brla.gov/server/rest/services/Parish_Boundary/MapServer/0/query",
-    )
-    params = {
-        "where": f"PARCEL_ID='{parcel_id}'",
-        "outFields": "ZONING",
-        "f": "json",
-    }
-    with httpx.Client(timeout=10) as client:
-        resp = client.get(api, params=params)
-        resp.raise_for_status()
-        data: dict[str, Any] = resp.json()
 
-    try:
-        zoning = data["features"][0]["attributes"]["ZONING"].strip()
-    except (KeyError, IndexError):
-        raise ValueError(f"Parcel {parcel_id} not found or zoning unavailable") from None
+@function_tool
+async def get_parcel_zoning_batch(parcel_ids: list[str]) -> dict[str, str | None]:  # noqa: D401
+    """Look up zoning designations for several East Baton Rouge parcels at once.
 
-    _cache_set(cache_key, zoning)
-    return zoning
+    Prefer this over repeated ``get_parcel_zoning`` calls when a question involves
+    more than one parcel (e.g. an assemblage). Returns a mapping of parcel ID to
+    zoning code; parcels that cannot be found map to null.
+    """
+
+    return await lookup_parcel_zoning_batch(parcel_ids)
 
 
 __all__ = [
     "log_qa",
     "get_parcel_zoning",
+    "get_parcel_zoning_batch",
+    "lookup_parcel_zoning",
+    "lookup_parcel_zoning_batch",
+    "aclose_clients",
 ] 
\ No newline at end of file
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Generic, Hashable, TypeVar
+
+V = TypeVar("V")
+
+# Returned by ``TTLCache.get`` on a miss so that falsy values can be cached.
+MISSING: Any = object()
+
+
+class TTLCache(Generic[V]):
+    """Thread-safe, size-bounded LRU whose entries each carry their own TTL.
+
+    Expired entries are dropped when read.  When the cache is full, the least
+    recently used entry is evicted, whether or not it has expired, so memory is
+    bounded by ``maxsize`` even if keys are never read again.  ``on_evict(reason)``
+    is called with ``"expired"`` for an entry past its TTL and ``"capacity"``
+    otherwise.
+    """
+
+    def __init__(self, maxsize: int, *, on_evict: Callable[[str], None] | None = None):
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+        self.maxsize = maxsize
+        self._on_evict = on_evict
+        self._data: OrderedDict[Hashable, tuple[float, V]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def _evicted(self, reason: str) -> None:
+        if self._on_evict is not None:
+            self._on_evict(reason)
+
+    def get(self, key: Hashable) -> V:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+                self._evicted("expired")
+            self.misses += 1
+            return MISSING
+
+    def set(self, key: Hashable, value: V, ttl: float) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._prune()
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def _prune(self) -> None:
+        now = time.monotonic()
+        while len(self._data) > self.maxsize:
+            _, (expires_at, _) = self._data.popitem(last=False)
+            self._evicted("expired" if expires_at <= now else "capacity")
+
+
+__all__ = ["MISSING", "TTLCache"]
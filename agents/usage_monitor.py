@@ -1,69 +1,115 @@
 from __future__ import annotations
 
+import asyncio
+import atexit
+import logging
 import os
-import sqlite3
-import time
 from contextlib import asynccontextmanager
-from datetime import datetime, timedelta
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, AsyncIterator, Callable, Tuple
+from typing import Any, AsyncIterator, Sequence
 
-from gpc_agents.src.agents import RunResult, Runner
+import redis
+from gpc_agents.src.agents import AgentsException, RunResult, RunResultStreaming, Runner
+
+from .budget_ledger import BudgetExceededError, RedisLedger, Reservation, SQLiteLedger, estimate_tokens
+from .config import DEFAULT_MODEL
+from .cost_attribution import UsageEvent
+from .spend_window import SpendWindow
+
+logger = logging.getLogger(__name__)
 
 DB_PATH = Path(os.path.dirname(__file__)) / "data" / "usage.sqlite3"
 DB_PATH.parent.mkdir(parents=True, exist_ok=True)
 
-# Cost per 1K tokens in USD – adapt as needed per model tier.
+# Flat cost per 1K tokens in USD – used for up-front estimates (deliberately above
+# the per-model rates in cost_attribution) and for models missing from that table.
 _COST_PER_1K_TOKENS = float(os.getenv("OPENAI_COST_PER_1K", "0.005"))
 _DAILY_BUDGET_USD = float(os.getenv("OPENAI_DAILY_BUDGET", "10.0"))
 
-
-class BudgetExceededError(RuntimeError):
-    """Raised when the daily OpenAI spend would exceed budget."""
+# "redis" shares the budget across hosts; defaults to it whenever REDIS_URL is set.
+REDIS_URL = os.getenv("REDIS_URL")
+_LEDGER_BACKEND = os.getenv("BUDGET_LEDGER", "redis" if REDIS_URL else "sqlite")
 
 
 # ---------------------------------------------------------------------------
-# SQLite helpers
+# Ledger – with SQLite, reservations are serialised across worker processes by
+# BEGIN IMMEDIATE and the rolling 24 h spend is kept in memory (SpendWindow);
+# with Redis, a Lua script does the same across hosts and usage.sqlite3 becomes
+# a write-behind audit log.
 # ---------------------------------------------------------------------------
 
+_ledger: SQLiteLedger | RedisLedger
+if _LEDGER_BACKEND == "redis":
+    if not REDIS_URL:
+        raise RuntimeError("BUDGET_LEDGER=redis requires REDIS_URL")
+    _ledger = RedisLedger(redis.Redis.from_url(REDIS_URL), _DAILY_BUDGET_USD, db_path=DB_PATH)
+else:
+    _ledger = SQLiteLedger(DB_PATH, _DAILY_BUDGET_USD, window=SpendWindow(window_seconds=86400, bucket_seconds=60))
 
-def _init_db() -> None:
-    conn = sqlite3.connect(DB_PATH)
-    conn.execute(
-        """
-        CREATE TABLE IF NOT EXISTS usage (
-            ts TEXT NOT NULL,
-            prompt_tokens INTEGER NOT NULL,
-            completion_tokens INTEGER NOT NULL,
-            cost_usd REAL NOT NULL
-        )
-        """
-    )
-    conn.commit()
-    conn.close()
 
+def _estimate_cost(input: Any, max_turns: int) -> float:
+    text = input if isinstance(input, str) else str(input)
+    return (estimate_tokens(text, max_turns) / 1000) * _COST_PER_1K_TOKENS
+
+
+def _item_id(raw: Any) -> str | None:
+    return raw.get("id") if isinstance(raw, dict) else getattr(raw, "id", None)
+
+
+def _model_name(agent: Any) -> str:
+    model = getattr(agent, "model", None)
+    return model if isinstance(model, str) else getattr(model, "model", None) or DEFAULT_MODEL
+
+
+def usage_events(result: RunResult) -> list[UsageEvent]:
+    """One priced event per model response, attributed to the agent that produced it.
+
+    Responses are matched to agents through the output items they generated; a
+    response with no matching item (e.g. the final message) goes to ``last_agent``.
+    """
+
+    agent_by_item = {}
+    for item in result.new_items:
+        item_id = _item_id(getattr(item, "raw_item", None))
+        if item_id:
+            agent_by_item[item_id] = item.agent
 
-_init_db()
+    events = []
+    for response in result.raw_responses:
+        agent = next(
+            (agent_by_item[i] for i in map(_item_id, getattr(response, "output", None) or []) if i in agent_by_item),
+            result.last_agent,
+        )
+        events.append(
+            UsageEvent.priced(
+                agent.name, _model_name(agent), response.prompt_tokens or 0, response.completion_tokens or 0
+            )
+        )
+    return events
 
 
-def _log_usage(prompt_tokens: int, completion_tokens: int) -> None:
-    cost = ((prompt_tokens + completion_tokens) / 1000) * _COST_PER_1K_TOKENS
-    conn = sqlite3.connect(DB_PATH)
-    conn.execute(
-        "INSERT INTO usage (ts, prompt_tokens, completion_tokens, cost_usd) VALUES (?, ?, ?, ?)",
-        (datetime.utcnow().isoformat(), prompt_tokens, completion_tokens, cost),
+def _commit_usage(reservation: Reservation | None, result: RunResult) -> None:
+    events = usage_events(result)
+    _ledger.commit(
+        reservation,
+        sum(e.prompt_tokens for e in events),
+        sum(e.completion_tokens for e in events),
+        sum(e.cost_usd for e in events),
+        events,
     )
-    conn.commit()
-    conn.close()
+
+
+def record_usage(result: RunResult) -> None:
+    """Log usage of a run made outside ``run_with_budget`` (e.g. the quality judge)."""
+
+    _commit_usage(None, result)
 
 
 def _spent_last_24h() -> float:
-    since = datetime.utcnow() - timedelta(days=1)
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.execute("SELECT SUM(cost_usd) FROM usage WHERE ts >= ?", (since.isoformat(),))
-    row = cur.fetchone()
-    conn.close()
-    return float(row[0] or 0.0)
+    """Spend over the trailing 24 h (all hosts when the Redis ledger is active)."""
+
+    return _ledger.spent()
 
 
 async def run_with_budget(
@@ -72,40 +118,157 @@ async def run_with_budget(
     input: str,
     context: Any | None = None,
     max_turns: int = 10,
+    reservation: Reservation | None = None,
 ) -> RunResult:
     """Run agent respecting daily budget + log usage.
 
-    Raises BudgetExceededError if projected spend would exceed _DAILY_BUDGET_USD.
+    The estimated cost is reserved before the run and settled against the actual
+    token usage afterwards, also when the run fails after spending tokens (a
+    guardrail tripwire, MaxTurnsExceeded). Raises BudgetExceededError if the
+    reservation would push the 24 h spend plus outstanding reservations over
+    _DAILY_BUDGET_USD.
+    A caller-held ``reservation`` (see ``batch_reservation``) is drawn down
+    instead and left for the caller to release.
     """
 
-    # Pre-budget check (rough approximate cost per run). If about to exceed, abort early.
-    if _spent_last_24h() >= _DAILY_BUDGET_USD:
-        raise BudgetExceededError("Daily OpenAI budget exceeded; aborting run.")
+    owned = reservation is None
+    if owned:
+        # BEGIN IMMEDIATE may wait on another worker's transaction – keep it off the loop.
+        reservation = await asyncio.to_thread(_ledger.reserve, _estimate_cost(input, max_turns))
+    try:
+        try:
+            result = await Runner.run(
+                starting_agent=starting_agent,
+                input=input,
+                context=context or {},
+                max_turns=max_turns,
+            )
+        except AgentsException as exc:
+            # Guardrail tripwires and MaxTurnsExceeded come after tokens were spent;
+            # the SDK attaches the run so far (responses, items, last agent).
+            if getattr(exc, "run_data", None) is not None:
+                try:
+                    await asyncio.to_thread(_commit_usage, reservation, exc.run_data)
+                except Exception:
+                    logger.exception("could not record usage of failed run")
+            raise
 
-    result = await Runner.run(
-        starting_agent=starting_agent,
-        input=input,
-        context=context or {},
-        max_turns=max_turns,
-    )
+        # SDK records token usage per response; price and attribute each one
+        await asyncio.to_thread(_commit_usage, reservation, result)
+    finally:
+        if owned:
+            await asyncio.to_thread(_ledger.release, reservation)
 
-    # SDK records token usage per response; sum over raw_responses
-    prompt_tokens = sum(r.prompt_tokens or 0 for r in result.raw_responses)
-    completion_tokens = sum(r.completion_tokens or 0 for r in result.raw_responses)
-    _log_usage(prompt_tokens, completion_tokens)
+    return result
 
-    if _spent_last_24h() > _DAILY_BUDGET_USD:
-        # Rollback last log to respect budget
-        conn = sqlite3.connect(DB_PATH)
-        conn.execute(
-            "DELETE FROM usage WHERE rowid = (SELECT MAX(rowid) FROM usage)")
-        conn.commit()
-        conn.close()
-        raise BudgetExceededError("Run would exceed daily budget; aborted post-factum and rolled back log.")
 
-    return result
+@asynccontextmanager
+async def batch_reservation(inputs: Sequence[str], max_turns: int = 10) -> AsyncIterator[Reservation | None]:
+    """Hold one reservation covering a batch of runs for their duration.
+
+    Yields None when the batch as a whole does not fit the budget; each run then
+    reserves for itself, so the ones that fit still go ahead.
+    """
+
+    amount = sum(_estimate_cost(i, max_turns) for i in inputs)
+    try:
+        reservation = await asyncio.to_thread(_ledger.reserve, amount)
+    except BudgetExceededError:
+        logger.info("batch of %d runs (estimate $%.4f) exceeds the budget; reserving per run", len(inputs), amount)
+        reservation = None
+    keepalive = asyncio.create_task(_keep_reserved(reservation)) if reservation is not None else None
+    try:
+        yield reservation
+    finally:
+        if keepalive is not None:
+            keepalive.cancel()
+        if reservation is not None:
+            await asyncio.to_thread(_ledger.release, reservation)
+
+
+async def _keep_reserved(reservation: Reservation) -> None:
+    """Extend a batch reservation while the batch runs, however long that takes.
+
+    A worker that dies stops extending it, so the hold still expires one TTL later.
+    """
+
+    while True:
+        await asyncio.sleep(_ledger.reservation_ttl / 3)
+        try:
+            held = await asyncio.to_thread(_ledger.extend, reservation)
+        except Exception:
+            logger.warning("could not extend batch reservation %s", reservation.id, exc_info=True)
+            continue
+        if not held:
+            logger.warning("batch reservation %s expired; its runs are no longer covered", reservation.id)
+            return
+
+
+@dataclass
+class BudgetedStream:
+    """A streamed run holding a budget reservation until ``settle`` is awaited."""
+
+    result: RunResultStreaming
+    reservation: Reservation
+    settled: bool = False
+
+    async def settle(self) -> None:
+        """Cancel the run if still going, commit its usage so far and release the reservation."""
+
+        if self.settled:
+            return
+        self.settled = True
+        if not self.result.is_complete:
+            self.result.cancel()
+        try:
+            await asyncio.to_thread(_commit_usage, self.reservation, self.result)
+        finally:
+            await asyncio.to_thread(_ledger.release, self.reservation)
+
+
+async def run_streamed_with_budget(
+    *,
+    starting_agent,
+    input: str,
+    context: Any | None = None,
+    max_turns: int = 10,
+) -> BudgetedStream:
+    """Start a streamed run under the daily budget.
+
+    Raises BudgetExceededError before anything is streamed.  The caller consumes
+    ``stream.result.stream_events()`` and must await ``stream.settle()`` when done
+    (also on error or client disconnect).
+    """
+
+    reservation = await asyncio.to_thread(_ledger.reserve, _estimate_cost(input, max_turns))
+    try:
+        result = Runner.run_streamed(
+            starting_agent=starting_agent,
+            input=input,
+            context=context or {},
+            max_turns=max_turns,
+        )
+    except BaseException:
+        await asyncio.to_thread(_ledger.release, reservation)
+        raise
+    return BudgetedStream(result, reservation)
+
+
+def close_ledger() -> None:
+    """Flush write-behind usage rows and close the ledger (app shutdown hook)."""
+
+    _ledger.close()
+
+
+atexit.register(close_ledger)
 
 __all__ = [
+    "BudgetedStream",
+    "batch_reservation",
+    "close_ledger",
+    "record_usage",
+    "run_streamed_with_budget",
     "run_with_budget",
+    "usage_events",
     "BudgetExceededError",
-] 
\ No newline at end of file
+]